@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+测试共用的 fixture：在临时目录里构造机器人（状态库、artifact 都写到 tmp_path），以及构造问题。
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_dir(tmp_path_factory):
+    """导入 zhihu_bot 时日志装在仓库的 logs/ 下；测试期间改写到临时目录，不往检出目录里追加日志"""
+    from zhihu_logging import setup_logging
+
+    path = tmp_path_factory.mktemp("logs")
+    setup_logging(path, console=False)
+    return path
+
+
+@pytest.fixture
+def make_bot(tmp_path, monkeypatch):
+    """返回构造函数：工作目录切到 tmp_path，每次调用新建一个机器人（用于模拟进程重启）"""
+    from zhihu_bot import ZhihuAutoAnswer
+
+    monkeypatch.chdir(tmp_path)
+
+    def _make(**kwargs):
+        return ZhihuAutoAnswer(config_path=str(ROOT / "config.yaml"), **kwargs)
+
+    return _make
+
+
+@pytest.fixture
+def bot(make_bot):
+    return make_bot()
+
+
+@pytest.fixture
+def question():
+    """返回构造函数：question("1") -> 标题 t1、链接指向对应问题页的 Question"""
+    from zhihu_bot import Question
+
+    def _question(qid: str) -> Question:
+        return Question(id=qid, title=f"t{qid}", url=f"https://www.zhihu.com/question/{qid}")
+
+    return _question
@@ -4,8 +4,12 @@
 """
 import asyncio
 import argparse
+import logging
 import sys
 from pathlib import Path
+from typing import Optional, Tuple
+
+import yaml
 
 # Optional: load secrets (e.g. CABINET_API_TOKEN) from .env
 try:
@@ -31,9 +35,28 @@ if hasattr(sys.stderr, "reconfigure"):
 sys.path.insert(0, str(Path(__file__).parent))
 
 from zhihu_bot import ZhihuAutoAnswer
+from zhihu_logging import log_tail
+from zhihu_metrics import BotMetrics, start_metrics_server
+from zhihu_pacer import Pacer
+from zhihu_probe import Probe, ProbeResult
+from zhihu_risk import RiskGuard, active_cooldown, cooldown_file_from_config, format_cooldown
+from zhihu_scheduler import InstanceLock, Scheduler, lock_file_from_config
+from zhihu_state import StateStore
+from zhihu_stats import QUERIES, RunStats, export_csv, format_table
 
+logger = logging.getLogger(__name__)
 
-async def main():
+
+def _read_config(path: str) -> dict:
+    """启动前的快速检查只读配置文件本身，不实例化机器人"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except Exception:
+        return {}
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description='知乎自动回答机器人',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -47,9 +70,32 @@ async def main():
   
   # 运行一次
   python main.py
+
+  # 进程中断后，从最近一次未完成运行的检查点继续（也可指定 run_id）
+  python main.py --resume
+  python main.py --resume 20261019_040000
   
   # 使用指定配置
   python main.py --config myconfig.yaml
+
+  # 查看选择器/输入策略命中统计
+  python main.py --selector-report
+
+  # 按保留策略清理/归档旧 artifact（--dry-run 只统计不删除）
+  python main.py --gc --dry-run
+
+  # 运行历史统计：每日吞吐 / 各阶段 p50,p95 / 失败分布，可导出 CSV
+  python main.py --stats stages --since 2026-10-01
+  python main.py --stats failures --csv artifacts/failures.csv
+
+  # 触发风控后的冷却期内照常运行（默认直接退出）
+  python main.py --ignore-cooldown
+
+  # 常驻调度：按 config.yaml schedule.rules 的 cron 规则 + 随机抖动循环运行
+  python main.py --schedule --headless
+
+  # 先用一次 HTTP 请求探测有没有新邀请，没有就不启动浏览器
+  python main.py --probe --headless
         """
     )
     parser.add_argument('--login', action='store_true', help='扫码登录并保存Cookie')
@@ -62,6 +108,11 @@ async def main():
         default=None,
         help='回答生成方式（覆盖 config.yaml answer_generator.type）',
     )
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='deep_research 流式模式：边取详情边生成，内存只保留精简记录（大批量积压时使用）'
+    )
     parser.add_argument('--flush-drafts-every', type=int, default=5, help='每累计多少个回答写入一次草稿箱（deep_research模式）')
     parser.add_argument(
         '--user-data-dir',
@@ -73,15 +124,217 @@ async def main():
         action='store_true',
         help='禁用持久化用户目录，仅使用临时浏览器+cookie文件'
     )
-    args = parser.parse_args()
-    
-    bot = ZhihuAutoAnswer(config_path=args.config)
-    
+    parser.add_argument(
+        '--selector-report',
+        action='store_true',
+        help='输出选择器/输入策略命中统计（标记已失效的选择器）后退出，不启动浏览器'
+    )
+    parser.add_argument(
+        '--session-status',
+        action='store_true',
+        help='根据 Cookie 备份和会话文件输出登录会话的到期预测后退出，不启动浏览器'
+    )
+    parser.add_argument('--gc', action='store_true', help='按 retention 配置清理/归档旧 artifact 后退出，不启动浏览器')
+    parser.add_argument('--dry-run', action='store_true', help='配合 --gc：只统计将要清理的内容，不实际删除')
+    parser.add_argument(
+        '--resume',
+        nargs='?',
+        const='latest',
+        default=None,
+        metavar='RUN_ID',
+        help='从检查点继续未完成的运行（不指定 run_id 时取最近一次未完成的运行）'
+    )
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='本次运行抓取 Playwright trace / HAR（忽略采样率），只保留失败或偏慢的 get_invitations / 草稿保存'
+    )
+    parser.add_argument(
+        '--trace-events',
+        action='store_true',
+        help='导出本次运行的 Chrome trace-event 时间线到 artifacts/runs/trace_{run_id}.json（Perfetto 可直接打开）'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='在本地端口暴露 Prometheus /metrics（覆盖 config.yaml metrics.port，0 表示不启动）'
+    )
+    parser.add_argument(
+        '--ignore-cooldown',
+        action='store_true',
+        help='忽略风控冷却（默认冷却期内的运行在启动浏览器前直接退出）'
+    )
+    parser.add_argument(
+        '--schedule',
+        action='store_true',
+        help='常驻调度模式：按 config.yaml schedule 段的 cron 规则循环运行，与其他实例互斥'
+    )
+    parser.add_argument(
+        '--probe',
+        action='store_true',
+        help='先不启动浏览器，用 Cookie 备份请求一次邀请接口，和同步游标比较，有新邀请才执行完整运行'
+    )
+    parser.add_argument('--stats', choices=QUERIES, default=None, help='查询运行历史统计后退出，不启动浏览器')
+    parser.add_argument('--since', default=None, help='配合 --stats：起始日期（YYYY-MM-DD）')
+    parser.add_argument('--csv', default=None, help='配合 --stats：把结果导出为 CSV')
+    return parser
+
+
+async def main():
+    args = build_parser().parse_args()
+    if args.schedule:
+        await run_schedule(args)
+    else:
+        await run_once(args)
+
+
+async def run_schedule(args: argparse.Namespace, max_cycles: Optional[int] = None) -> None:
+    """
+    常驻调度：每轮照常走 run_once（冷却检查、实例锁、通知都按轮进行）。
+    指标和 /metrics 端点在整个进程里只创建一次，传给每轮的机器人，计数跨轮累计
+    """
+    config = _read_config(args.config)
+    scheduler = Scheduler.from_config(config.get("schedule"))
+    metrics = BotMetrics()
+    server = start_metrics_server(metrics.registry, config.get("metrics"), args.metrics_port)
+    print(f"⏰ 调度已启动: {', '.join(rule.expr for rule in scheduler.rules)}（抖动 ≤ {scheduler.jitter_s / 60:g} 分钟）")
+
+    async def _cycle(rule) -> None:
+        unknown = sorted(set(rule.options) - set(vars(args)))
+        if unknown:
+            logger.warning(f"规则 {rule.expr} 含未知参数 {unknown}，已忽略")
+        options = {k: v for k, v in rule.options.items() if k not in unknown}
+        await run_once(argparse.Namespace(**{**vars(args), **options, "schedule": False}), metrics=metrics)
+
+    try:
+        await scheduler.run_forever(_cycle, max_cycles=max_cycles)
+    finally:
+        if server is not None:
+            server.stop()
+
+
+async def run_once(args: argparse.Namespace, metrics: Optional[BotMetrics] = None) -> None:
+    """执行一轮；调度模式传入共享的 metrics，冷却 / 实例锁 / 探测跳过的轮次也记入指标"""
+    read_only = bool(args.selector_report or args.session_status or args.stats)
+    config = {} if read_only else _read_config(args.config)
+
+    # 风控冷却期内直接退出：只读配置和一个小文件，不实例化机器人、不启动浏览器（登录是人工操作，不受限）
+    if not (read_only or args.login or args.gc or args.ignore_cooldown):
+        cooldown = active_cooldown(cooldown_file_from_config(config))
+        if cooldown:
+            print(f"⏸ {format_cooldown(cooldown)}，跳过本次运行（--ignore-cooldown 可强制运行）")
+            if metrics is not None:
+                metrics.cycles_skipped.inc(reason="cooldown")
+                metrics.risk_cooldown_until.set(cooldown["until"])
+            return
+
+    # 持久化浏览器目录和状态文件同一时间只允许一个进程使用（清理 artifact 也会改动状态）；上一轮还没结束时直接跳过
+    lock = None
+    if not read_only:
+        lock = InstanceLock(lock_file_from_config(config))
+        if not lock.acquire():
+            print(f"⏭ 另一个实例仍在运行（{lock.describe()}），跳过本次运行")
+            if metrics is not None:
+                metrics.cycles_skipped.inc(reason="locked")
+            return
+    try:
+        probe: Optional[Tuple[Probe, ProbeResult]] = None
+        if args.probe and not (args.login or args.gc or args.resume):
+            probe = await _run_probe(config)
+            if not probe[1].new_work:
+                print(f"💤 {probe[1].format()}")
+                probe[0].state.close()
+                if metrics is not None:
+                    metrics.cycles_skipped.inc(reason=f"probe_{probe[1].reason}")
+                return
+            print(f"🔔 {probe[1].format()}")
+        summary = await _run(args, metrics=metrics)
+        if probe is not None:
+            # 完整运行结束后推进同步游标，下次探测只关心之后出现的邀请
+            if summary is not None and not summary.get("risk_control"):
+                probe[0].commit(probe[1])
+            probe[0].state.close()
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+async def _run_probe(config: dict) -> Tuple[Probe, ProbeResult]:
+    """不实例化机器人：只打开状态库读写同步游标，requests 请求放在线程里"""
+    state = StateStore(Path((config.get("state", {}) or {}).get("path") or "zhihu_state.db"))
+    probe = Probe.from_config(
+        config.get("probe"),
+        state=state,
+        pacer=Pacer.from_config(config.get("pacing")),
+        risk=RiskGuard.from_config(config.get("risk")),
+    )
+    return probe, await asyncio.to_thread(probe.run)
+
+
+async def _run(args: argparse.Namespace, metrics: Optional[BotMetrics] = None) -> Optional[dict]:
+    """执行一次运行；完整处理了邀请时返回运行 summary，否则返回 None"""
+    bot = ZhihuAutoAnswer(config_path=args.config, metrics=metrics)
+
+    if args.selector_report:
+        print(bot.strategy_stats.report())
+        bot.state.close()
+        return
+
+    if args.session_status:
+        print((await bot.check_session_health(notify=False)).format())
+        await bot.close()
+        return
+
+    if args.stats:
+        stats = RunStats(bot.state.path)
+        try:
+            stats.ingest()
+            rows = stats.query(args.stats, args.since)
+        finally:
+            stats.close()
+        if args.csv:
+            export_csv(rows, Path(args.csv))
+            print(f"已导出 {len(rows)} 行到 {args.csv}")
+        else:
+            print(format_table(rows))
+        bot.state.close()
+        return
+
+    resume_run_id = None
+    if args.resume:
+        resume_run_id = bot.state.latest_unfinished_run() if args.resume == 'latest' else args.resume
+        if not resume_run_id:
+            print("没有可恢复的运行（所有运行都已完成）")
+            bot.state.close()
+            return
+
+    if args.gc:
+        print(bot.run_retention(dry_run=args.dry_run).format())
+        bot.artifact_writer.close()
+        bot.state.close()
+        return
+
+    summary: Optional[dict] = None
     try:
         # 允许 CLI 覆盖回答生成方式
         if args.answer_type:
             bot.config.setdefault('answer_generator', {})
             bot.config['answer_generator']['type'] = args.answer_type
+        if args.trace:
+            bot.config.setdefault('capture', {})
+            bot.config['capture'].update({'enabled': True, 'sample_rate': 1.0})
+        if args.trace_events:
+            bot.config.setdefault('tracing', {})
+            bot.config['tracing']['chrome_trace'] = True
+        if args.streaming:
+            bot.config.setdefault('answer_generator', {})
+            bot.config['answer_generator'].setdefault('deep_research', {})
+            bot.config['answer_generator']['deep_research']['streaming'] = True
+
+        # 调度模式的指标端点由 run_schedule 持有，跨轮不重启
+        if metrics is None:
+            bot.start_metrics_server(args.metrics_port)
 
         # 初始化浏览器
         user_data_dir = None if args.no_persistent_profile else args.user_data_dir
@@ -114,24 +367,24 @@ async def main():
             except Exception:
                 pass
             return
+
+        # 会话会在本轮运行中途过期时，不开始昂贵的生成流程（check_session_health 已发出提醒）
+        health = await bot.check_session_health()
+        if health.blocks_run:
+            print(f"\n❌ {health.format()}")
+            return
         
         # 处理邀请（返回 summary）
         summary = await bot.process_invitations(
             max_questions=args.max_questions,
             flush_drafts_every=args.flush_drafts_every,
+            resume_run_id=resume_run_id,
         )
 
         # 无论成功失败，都发一条相对详细的通知
         try:
-            # log tail
-            log_path = Path("logs") / "zhihu_bot.log"
-            tail = ""
-            if log_path.exists():
-                try:
-                    tail_lines = log_path.read_text(encoding="utf-8", errors="replace").splitlines()[-60:]
-                    tail = "\n".join(tail_lines)
-                except Exception:
-                    tail = ""
+            # log tail：取内存环形缓冲里本次运行的最后几十行，不再读整个日志文件
+            tail = log_tail(60)
 
             msg = []
             msg.append("🤖 知乎自动回答机器人")
@@ -146,6 +399,9 @@ async def main():
                     stage = item.get("stage") or ""
                     status = item.get("status")
                     msg.append(f"- [{stage}] {title[:60]} status={status}")
+            risk = summary.get("risk_control")
+            if risk:
+                msg.append(f"⚠️ 触发风控，已停止本次运行；{format_cooldown(risk)}")
             art = summary.get("artifacts") or {}
             if art:
                 msg.append(f"artifacts: {art}")
@@ -168,6 +424,7 @@ async def main():
             pass
     finally:
         await bot.close()
+    return summary
 
 
 if __name__ == '__main__':
@@ -13,34 +13,13 @@ import argparse
 import asyncio
 import json
 from pathlib import Path
-from typing import Any, Dict, List
 
 from playwright.async_api import async_playwright
 
+from zhihu_probe import normalize_invitations
 
-COOKIE_FILE = Path("zhihu_cookies.json")
-
-
-def _normalize_invitations(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """
-    兼容知乎 invitations 接口多种返回结构：
-    - {"data": [ ... ]}
-    - {"data": {"invitation": [ ... ]}}
-    - {"data": {"xxx": [ ... ]}}
-    """
-    data = payload.get("data")
-    if isinstance(data, list):
-        return [x for x in data if isinstance(x, dict)]
 
-    if isinstance(data, dict):
-        if isinstance(data.get("invitation"), list):
-            return [x for x in data["invitation"] if isinstance(x, dict)]
-
-        for _, value in data.items():
-            if isinstance(value, list):
-                return [x for x in value if isinstance(x, dict)]
-
-    return []
+COOKIE_FILE = Path("zhihu_cookies.json")
 
 
 async def _api_get_json(context, url: str):
@@ -115,7 +94,7 @@ async def main():
         print(f"   me.name={me_name}")
 
         print(f"   /api/v4/me/invitations -> status={inv_status}")
-        invitations = _normalize_invitations(inv_json or {})
+        invitations = normalize_invitations(inv_json or {})
         print(f"   invitations_parsed={len(invitations)}")
         if invitations:
             first = invitations[0]
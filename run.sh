@@ -1,6 +1,8 @@
 #!/bin/bash
 # 知乎自动回答机器人定时任务脚本
 # 添加到 crontab: 0 */12 * * * /path/to/run.sh
+# 也可以不用 crontab，常驻运行内置调度: python main.py --schedule --headless
+# 两种方式都会取实例锁（zhihu_bot.lock），上一次运行未结束时新的运行直接跳过
 
 cd "$(dirname "$0")"
 
@@ -9,5 +11,5 @@ if [ -d "venv" ]; then
     source venv/bin/activate
 fi
 
-# 运行主程序
-python main.py >> logs/zhihu_bot.log 2>&1
+# 运行主程序（日志由程序自己轮转写入 logs/zhihu_bot.log，这里只保留最近一次运行的控制台输出）
+python main.py > logs/run_stdout.log 2>&1
@@ -18,6 +18,7 @@ import asyncio
 from datetime import datetime
 
 from zhihu_bot import ZhihuAutoAnswer
+from zhihu_risk import is_verification_url
 
 
 async def wait_manual_verify(page, max_seconds: int) -> bool:
@@ -27,7 +28,7 @@ async def wait_manual_verify(page, max_seconds: int) -> bool:
         if page.is_closed():
             return False
         url = page.url or ""
-        if "account/unhuman" not in url:
+        if not is_verification_url(url):
             return True
         print(f"waiting_manual_verify... elapsed={elapsed}s url={url}")
         await page.wait_for_timeout(5000)
@@ -62,14 +63,15 @@ async def main():
             print("not_logged_in: please run `python main.py --login --user-data-dir ...` first")
             return 2
 
-        # 打开通知页，如果触发 unhuman，等用户手动过验证
-        await bot.page.goto("https://www.zhihu.com/notifications", wait_until="domcontentloaded")
-        if "account/unhuman" in (bot.page.url or ""):
-            passed = await wait_manual_verify(bot.page, args.verify_wait_seconds)
-            print(f"verify_passed={passed} url={bot.page.url}")
-            if not passed:
-                print("verify_timeout_or_page_closed")
-                return 1
+        # 打开通知页，如果触发 unhuman，等用户手动过验证（有人值守，不触发风控冷却）
+        with bot.risk.paused():
+            await bot.page.goto("https://www.zhihu.com/notifications", wait_until="domcontentloaded")
+            if is_verification_url(bot.page.url):
+                passed = await wait_manual_verify(bot.page, args.verify_wait_seconds)
+                print(f"verify_passed={passed} url={bot.page.url}")
+                if not passed:
+                    print("verify_timeout_or_page_closed")
+                    return 1
 
         invitations = await bot.get_invitations()
         print(f"invitations_found={len(invitations)}")
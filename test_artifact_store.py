@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+压缩、内容寻址回答存储的本地单元测试。
+"""
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, ".")
+
+from zhihu_artifact_store import ArtifactStore, project_fields
+
+
+def test_store_dedupes_and_round_trips(tmp_path):
+    store = ArtifactStore(tmp_path / "store", codec="gzip")
+    text = "回答正文" * 1000
+    h1 = store.put_text(text)
+    h2 = store.put_text(text)
+    assert h1 == h2 and store.disk_usage()["blobs"] == 1
+    assert store.disk_usage()["bytes"] < len(text.encode("utf-8"))
+    assert store.get_text(h1) == text
+    # 规范化 JSON：key 顺序不同也是同一份
+    assert store.put_json({"a": 1, "b": [2]}) == store.put_json({"b": [2], "a": 1})
+    assert store.get_text("0" * 64) is None
+
+
+def test_concurrent_puts_of_the_same_bytes(tmp_path):
+    store = ArtifactStore(tmp_path / "store", codec="gzip")
+    compress = store._compress
+    barrier = threading.Barrier(8)
+
+    def _compress(data):
+        # 让所有写入方同时进入写盘阶段
+        barrier.wait(timeout=5)
+        return compress(data)
+
+    store._compress = _compress
+    with ThreadPoolExecutor(8) as pool:
+        for i in range(20):
+            text = f"同样的短回答 {i}" * 2000
+            digests = set(pool.map(lambda _: store.put_text(text), range(8)))
+            assert len(digests) == 1 and store.get_text(digests.pop()) == text
+    assert store.disk_usage()["blobs"] == 20
+    assert not list(store.objects_dir.glob("*/*.tmp"))
+
+
+def test_project_fields():
+    raw = {"id": 1, "text_report": "big", "usage": {}}
+    assert project_fields(raw, exclude=["text_report"]) == {"id": 1, "usage": {}}
+    assert project_fields(raw, include=["id", "missing"]) == {"id": 1}
+    assert project_fields("not a dict") is None
+
+
+def test_bot_indexes_answers_and_imports_legacy(bot):
+    answer_hash = bot._store_answer_artifact(
+        "1", {"ok": True, "status": "completed", "answer_text": "答案", "raw": {"text_report": "答案", "id": "r"}}
+    )
+    row = bot.state.get_answer("1")
+    assert row["answer_hash"] == answer_hash and row["answer_len"] == 2
+    assert bot._load_answer_text("1") == "答案"
+    assert bot._load_answer_artifact("1")["raw"] == {"id": "r"}
+
+    legacy = bot._answer_artifact_path("2")
+    legacy.parent.mkdir(parents=True, exist_ok=True)
+    legacy.write_text(json.dumps({"ok": True, "answer_text": "旧答案"}), encoding="utf-8")
+    index = bot._answer_index(["1", "2", "3"])
+    assert set(index) == {"1", "2"}
+    assert not legacy.exists()
+    assert bot._load_answer_text("2") == "旧答案"
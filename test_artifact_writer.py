@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+后台 artifact 写入器的本地单元测试。
+"""
+import json
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from zhihu_artifact_writer import ArtifactWriter
+
+
+def test_updates_to_same_file_are_coalesced(tmp_path):
+    writer = ArtifactWriter(interval_s=0.2)
+    target = tmp_path / "invitations_x.json"
+    latest = tmp_path / "invitations_latest.json"
+    for i in range(20):
+        writer.submit(target, [{"i": i}], mirrors=[latest])
+    assert not target.exists()
+
+    time.sleep(0.5)
+    assert json.loads(target.read_text(encoding="utf-8")) == [{"i": 19}]
+    assert latest.read_text(encoding="utf-8") == target.read_text(encoding="utf-8")
+    assert writer.writes == 1 and writer.coalesced == 19
+    writer.close()
+
+
+def test_close_flushes_pending_writes(tmp_path):
+    writer = ArtifactWriter(interval_s=60)
+    writer.submit(tmp_path / "a.json", {"a": 1})
+    writer.submit(tmp_path / "b.json", {"b": 2}, mirrors=[tmp_path / "b_latest.json"])
+    writer.close()
+    assert json.loads((tmp_path / "a.json").read_text(encoding="utf-8")) == {"a": 1}
+    assert json.loads((tmp_path / "b.json").read_text(encoding="utf-8")) == {"b": 2}
+    assert (tmp_path / "b_latest.json").exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_flush_waits_for_write(tmp_path):
+    writer = ArtifactWriter(interval_s=60)
+    writer.submit(tmp_path / "run.json", {"ok": True})
+    assert writer.flush(timeout=5)
+    assert (tmp_path / "run.json").exists()
+    writer.close()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+UI 抓取采样 / 保留规则的本地单元测试（不启动浏览器）。
+"""
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, ".")
+
+from zhihu_capture import UiCapture
+
+
+class _FakeTracing:
+    def __init__(self):
+        self.calls = []
+
+    async def start(self, **kwargs):
+        self.calls.append("start")
+
+    async def start_chunk(self, title=None):
+        self.calls.append("start_chunk")
+
+    async def stop_chunk(self, path=None):
+        self.calls.append(("stop_chunk", path))
+        if path:
+            Path(path).write_bytes(b"x" * 1024)
+
+    async def stop(self):
+        self.calls.append("stop")
+
+
+class _FakeRequest:
+    method = "GET"
+    url = "https://www.zhihu.com/api/v4/me"
+    resource_type = "fetch"
+    failure = None
+    timing = {"startTime": 1700000000000.0, "requestStart": 1.0, "responseStart": 11.0, "responseEnd": 15.0}
+
+
+class _FakeResponse:
+    status = 200
+    status_text = "OK"
+    headers = {"content-type": "application/json"}
+    request = _FakeRequest()
+
+
+class _FakeContext:
+    def __init__(self):
+        self.tracing = _FakeTracing()
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+
+def _capture(tmp_path, **kwargs):
+    return UiCapture(enabled=True, sample_rate=1.0, directory=tmp_path / "captures", **kwargs)
+
+
+def test_capture_keeps_only_failed_windows(tmp_path):
+    capture = _capture(tmp_path)
+    context = _FakeContext()
+
+    async def _run():
+        assert await capture.attach(context)
+        async with capture.window("save_draft", qid="1", run_id="20240101_000000") as win:
+            resp = _FakeResponse()
+            context.handlers["response"](resp)
+            context.handlers["requestfinished"](resp.request)
+            win.ok = False
+        async with capture.window("save_draft", qid="2", run_id="20240101_000000") as win:
+            win.ok = True
+        await capture.detach()
+
+    asyncio.run(_run())
+    kept = capture.drain()
+    assert [k["qid"] for k in kept] == ["1"] and kept[0]["reason"] == "failed"
+    har = json.loads(Path(kept[0]["files"][1]).read_text(encoding="utf-8"))
+    entry = har["log"]["entries"][0]
+    assert entry["response"]["status"] == 200 and entry["timings"]["wait"] == 10.0
+    assert sorted(p.name for p in (tmp_path / "captures").iterdir()) == [
+        "20240101_000000_save_draft_1_1.har",
+        "20240101_000000_save_draft_1_1.trace.zip",
+    ]
+    assert ("stop_chunk", None) in context.tracing.calls and context.tracing.calls[-1] == "stop"
+
+
+def test_capture_keeps_slow_outliers_and_respects_size_cap(tmp_path):
+    capture = _capture(tmp_path, har=False, slow_ms={"save_draft": 0}, max_total_mb=1.5 / 1024)
+    context = _FakeContext()
+
+    async def _run():
+        await capture.attach(context)
+        for qid in ("1", "2"):
+            async with capture.window("save_draft", qid=qid) as win:
+                win.ok = True
+
+    asyncio.run(_run())
+    kept = capture.drain()
+    # 第二个窗口会超出 1.5KB 的上限，被丢弃
+    assert [k["qid"] for k in kept] == ["1"] and kept[0]["reason"].startswith("slow")
+    assert len(list((tmp_path / "captures").iterdir())) == 1
+
+
+def test_capture_not_sampled_is_a_noop(tmp_path):
+    capture = UiCapture(enabled=True, sample_rate=0.0, directory=tmp_path)
+    context = _FakeContext()
+
+    async def _run():
+        assert not await capture.attach(context, rng=random.Random(0))
+        with pytest.raises(RuntimeError):
+            async with capture.window("get_invitations"):
+                raise RuntimeError("boom")
+
+    asyncio.run(_run())
+    assert context.tracing.calls == [] and context.handlers == {} and capture.drain() == []
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+草稿接口写入的本地单元测试：使用本地 mock HTTP 服务模拟知乎草稿接口，不访问网络。
+"""
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+sys.path.insert(0, ".")
+
+from zhihu_draft_api import answer_to_html, save_draft_via_api
+
+
+class _DraftHandler(BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        _DraftHandler.received.append((self.path, dict(self.headers), body))
+        if "/questions/500/" in self.path:
+            self._reply(500, {"error": {"code": 500, "message": "boom"}})
+        elif "/questions/403/" in self.path:
+            self._reply(403, {"error": {"code": 10003, "message": "forbidden"}})
+        else:
+            self._reply(200, {"content": body.get("content"), "updated_time": 1})
+
+    def _reply(self, status, data):
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def mock_endpoint():
+    server = HTTPServer(("127.0.0.1", 0), _DraftHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _DraftHandler.received = []
+    yield f"http://127.0.0.1:{server.server_port}/api/v4/questions/{{qid}}/draft"
+    server.shutdown()
+
+
+def _run_with_request_context(coro_fn):
+    from playwright.async_api import async_playwright
+
+    async def _main():
+        async with async_playwright() as p:
+            request = await p.request.new_context()
+            try:
+                return await coro_fn(request)
+            finally:
+                await request.dispose()
+
+    return asyncio.run(_main())
+
+
+def test_answer_to_html_escapes_and_splits_paragraphs():
+    html = answer_to_html("第一段\n第二行 <b>\n\n第二段")
+    assert html == "<p>第一段<br>第二行 &lt;b&gt;</p><p>第二段</p>"
+
+
+def test_save_draft_via_api_success(mock_endpoint):
+    result = _run_with_request_context(
+        lambda request: save_draft_via_api(
+            request, "123", "回答正文", endpoint_template=mock_endpoint, headers={"x-xsrftoken": "t"}
+        )
+    )
+    assert result.ok and result.status == 200
+    path, headers, body = _DraftHandler.received[0]
+    assert path == "/api/v4/questions/123/draft"
+    assert headers.get("x-xsrftoken") == "t"
+    assert body["content"] == "<p>回答正文</p>"
+
+
+@pytest.mark.parametrize("qid", ["500", "403"])
+def test_save_draft_via_api_failure_is_reported(mock_endpoint, qid):
+    result = _run_with_request_context(
+        lambda request: save_draft_via_api(request, qid, "回答正文", endpoint_template=mock_endpoint)
+    )
+    assert not result.ok
+    assert result.status == int(qid)
+    assert "api error" in result.error or "status" in result.error
+
+
+def test_save_answer_to_draft_falls_back_to_ui(bot):
+    from zhihu_bot import Question
+
+    calls = []
+
+    async def _api(question, answer):
+        calls.append("api")
+        return False
+
+    async def _ui(question, answer):
+        calls.append("ui")
+        return True
+
+    bot._save_answer_to_draft_api = _api
+    bot._save_answer_to_draft_ui = _ui
+    q = Question(id="1", title="t", url="https://www.zhihu.com/question/1")
+    assert asyncio.run(bot.save_answer_to_draft(q, "a"))
+    assert calls == ["api", "ui"]
+    assert bot.last_draft_method == "ui"
+
+
+def test_save_answer_to_draft_skips_unchanged_content(make_bot):
+    from zhihu_bot import Question
+
+    bot = make_bot()
+    calls = []
+
+    async def _api(question, answer):
+        calls.append(answer)
+        return True
+
+    bot._save_answer_to_draft_api = _api
+    q = Question(id="7", title="t", url="https://www.zhihu.com/question/7")
+    assert asyncio.run(bot.save_answer_to_draft(q, "同样的回答\n"))
+    # 模拟崩溃重跑：新进程从状态库读取指纹记录，排版差异不影响判定
+    bot = make_bot()
+    bot._save_answer_to_draft_api = _api
+    assert asyncio.run(bot.save_answer_to_draft(q, "同样的回答"))
+    assert bot.last_draft_method == "skipped"
+    assert asyncio.run(bot.save_answer_to_draft(q, "修改后的回答"))
+    assert calls == ["同样的回答\n", "修改后的回答"]
+
+
+def test_html_to_text_matches_answer_fingerprint():
+    from zhihu_draft_api import content_fingerprint, html_to_text
+
+    answer = "第一段 a<b\n第二行\n\n第二段"
+    assert content_fingerprint(html_to_text(answer_to_html(answer))) == content_fingerprint(answer)
+
+
+def test_paragraph_break_changes_are_saved_again(bot, question):
+    calls = []
+
+    async def _api(question, answer):
+        calls.append(answer)
+        return True
+
+    bot._save_answer_to_draft_api = _api
+    q = question("8")
+    assert asyncio.run(bot.save_answer_to_draft(q, "第一段\n\n第二段"))
+    # 只合并了段落，文字没变：仍然要重新写草稿
+    assert asyncio.run(bot.save_answer_to_draft(q, "第一段 第二段"))
+    assert bot.last_draft_method == "api"
+    # 段内多余的空白 / 空行数量不同不算修改
+    assert asyncio.run(bot.save_answer_to_draft(q, "第一段  第二段\n"))
+    assert bot.last_draft_method == "skipped"
+    assert calls == ["第一段\n\n第二段", "第一段 第二段"]
+
+
+class _FakeRequest:
+    def __init__(self, url, method="POST", failure=None):
+        self.url = url
+        self.method = method
+        self.failure = failure
+
+
+class _FakeResponse:
+    def __init__(self, url, status, method="POST"):
+        self.url = url
+        self.status = status
+        self.request = _FakeRequest(url, method)
+
+
+class _FakePage:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, payload):
+        for handler in list(self.handlers.get(event, [])):
+            handler(payload)
+
+
+def test_draft_save_watcher_confirms_on_autosave_response():
+    from zhihu_draft_api import DraftSaveWatcher
+
+    async def _main():
+        page = _FakePage()
+        watcher = DraftSaveWatcher(page).start()
+        loop = asyncio.get_running_loop()
+        # 无关请求不应触发确认
+        loop.call_later(0.01, page.emit, "response", _FakeResponse("https://www.zhihu.com/api/v4/me", 200, "GET"))
+        loop.call_later(0.02, page.emit, "response", _FakeResponse("https://www.zhihu.com/api/v4/questions/1/draft", 200))
+        ok = await watcher.wait(2000)
+        watcher.stop()
+        return ok, watcher, page
+
+    ok, watcher, page = asyncio.run(_main())
+    assert ok and watcher.status == 200
+    assert not page.handlers["response"]
+
+
+def test_draft_save_watcher_reports_failure_and_timeout():
+    from zhihu_draft_api import DraftSaveWatcher
+
+    async def _main():
+        page = _FakePage()
+        watcher = DraftSaveWatcher(page).start()
+        asyncio.get_running_loop().call_later(
+            0.01, page.emit, "response", _FakeResponse("https://www.zhihu.com/api/v4/questions/1/draft", 500)
+        )
+        failed = await watcher.wait(2000)
+        error = watcher.error
+        timed_out = await watcher.wait(50)
+        return failed, error, timed_out
+
+    failed, error, timed_out = asyncio.run(_main())
+    assert failed is False and "500" in error
+    assert timed_out is False
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+增量流水线（deep_research 边生成边写草稿）的本地单元测试：生成和草稿写入都用假函数模拟，不访问网络。
+"""
+import asyncio
+import json
+import sys
+
+sys.path.insert(0, ".")
+
+
+def test_incremental_mode_streams_with_bounded_in_flight(bot, question, tmp_path):
+    from zhihu_bot import Invitation
+
+    bot._get_deep_research_config = lambda: {"endpoint": "http://x", "concurrency": 2}
+    bot._deep_research_token = lambda cfg: ""
+    active = {"now": 0, "peak": 0}
+    drafts = []
+    snapshots = []
+
+    async def _research(endpoint, token, title, content, timeout_s):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return {"ok": True, "status": 200, "body": {"text_report": f"答案-{title}", "big": "x" * 1000}}
+
+    async def _draft(question, answer):
+        drafts.append((question.id, answer))
+        return True
+
+    export = bot._export_records
+
+    def _export(records, path):
+        snapshots.append(len(records))
+        export(records, path)
+
+    bot._deep_research_one = _research
+    bot.save_answer_to_draft = _draft
+    bot._export_records = _export
+
+    async def _source():
+        for i in range(7):
+            yield Invitation(question=question(str(i)))
+
+    summary = asyncio.run(bot.process_invitations_deep_research_incremental(_source(), flush_drafts_every=3))
+    assert active["peak"] == 2
+    assert summary["draft_saved_ok"] == 7
+    assert sorted(drafts) == [(str(i), f"答案-t{i}") for i in range(7)]
+    # 快照只在每批草稿写完（3 + 3 + 1）和结束时各提交一次，而不是每个回答/草稿一次
+    assert len(snapshots) == 4
+    latest = json.loads((tmp_path / "artifacts" / "invitations_latest.json").read_text(encoding="utf-8"))
+    assert all(item["draft_saved"] and "content" not in item for item in latest)
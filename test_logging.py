@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+队列日志 / 环形缓冲 / 文件尾部读取的本地单元测试。
+"""
+import json
+import logging
+import sys
+
+sys.path.insert(0, ".")
+
+import zhihu_logging
+from zhihu_logging import log_tail, setup_logging, tail_file
+from zhihu_spans import Tracer
+
+
+def test_tail_file_reads_from_end(tmp_path):
+    path = tmp_path / "big.log"
+    path.write_text("".join(f"line {i}\n" for i in range(5000)), encoding="utf-8")
+    assert tail_file(path, 3, block_size=64) == ["line 4997", "line 4998", "line 4999"]
+    assert tail_file(path, 0) == [] and tail_file(tmp_path / "missing.log", 5) == []
+
+
+def test_queue_logging_writes_json_with_context_and_keeps_tail(tmp_path, log_dir):
+    tracer = Tracer()
+    try:
+        setup_logging(tmp_path, json_format=True, ring_lines=3, console=False)
+        log = logging.getLogger("test_logging")
+        tracer.set_run_id("r9")
+        with tracer.span("save_draft", qid="42"):
+            log.info("保存草稿")
+        tracer.set_run_id(None)
+        for i in range(3):
+            log.info(f"after {i}")
+        assert log_tail(10).splitlines()[-1].endswith("after 2")
+        assert len(log_tail(10).splitlines()) == 3
+        zhihu_logging.shutdown_logging()
+
+        records = [json.loads(line) for line in (tmp_path / "zhihu_bot.log").read_text(encoding="utf-8").splitlines()]
+        first = next(r for r in records if r["msg"] == "保存草稿")
+        assert first["run_id"] == "r9" and first["qid"] == "42" and first["level"] == "INFO"
+        assert "run_id" not in records[-1]
+    finally:
+        # 恢复为测试期间的临时日志目录，避免影响其他测试
+        zhihu_logging.shutdown_logging()
+        setup_logging(log_dir, console=False)
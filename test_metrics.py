@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Prometheus 指标的本地单元测试。
+"""
+import sys
+import urllib.request
+
+sys.path.insert(0, ".")
+
+from zhihu_metrics import BotMetrics, MetricsServer, Registry
+from zhihu_spans import Tracer
+
+
+def test_exposition_format_and_textfile(tmp_path):
+    registry = Registry()
+    c = registry.counter("jobs_total", "Jobs", ["stage"])
+    h = registry.histogram("job_seconds", "Job time", buckets=(1, 5))
+    c.inc(stage='say "hi"')
+    h.observe(0.5)
+    h.observe(3)
+    h.observe(10)
+    text = registry.render()
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{stage="say \\"hi\\""} 1' in text
+    assert 'job_seconds_bucket{le="1"} 1' in text
+    assert 'job_seconds_bucket{le="5"} 2' in text
+    assert 'job_seconds_bucket{le="+Inf"} 3' in text
+    assert 'job_seconds_sum 13.5' in text and 'job_seconds_count 3' in text
+
+    path = tmp_path / "textfile" / "zhihu_bot.prom"
+    registry.write_textfile(path)
+    assert path.read_text(encoding="utf-8") == text
+    assert not list(path.parent.glob("*.tmp"))
+
+
+def test_bot_metrics_follow_stage_spans_and_serve_http():
+    metrics = BotMetrics()
+    tracer = Tracer()
+    tracer.listeners.append(metrics.observe_span)
+    with tracer.span("deep_research", qid="1", kind="stage") as span:
+        span.ok = False
+    with tracer.span("save_draft", qid="2", kind="stage") as span:
+        span.set(method="api")
+    with tracer.span("save_draft", qid="3", kind="stage") as span:
+        span.set(method="skipped")
+    with tracer.span("draft.api"):
+        pass
+
+    assert metrics.answers_generated.value(result="failed") == 1
+    assert metrics.failures.value(stage="deep_research") == 1
+    assert metrics.drafts_saved.value(method="api") == 1
+    assert metrics.drafts_saved.value(method="skipped") == 0
+    assert metrics.drafts_skipped.value() == 1
+    assert metrics.stage_duration.count(stage="save_draft") == 2
+    assert metrics.stage_duration.count(stage="draft.api") == 0
+
+    server = MetricsServer(metrics.registry, 0).start()
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5).read().decode()
+    finally:
+        server.stop()
+    assert 'zhihu_drafts_saved_total{method="api"} 1' in body
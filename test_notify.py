@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+通知队列（摘要合并 / 限速 / 重试 / 慢渠道不阻塞）的本地单元测试。
+"""
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from zhihu_notify import Channel, Notifier
+
+
+class _RecordingChannel(Channel):
+    name = "fake"
+
+    def __init__(self, fail_times=0, delay=0.0, **kwargs):
+        super().__init__(backoff_s=0.01, **kwargs)
+        self.sent = []
+        self.attempts = 0
+        self.fail_times = fail_times
+        self.delay = delay
+
+    def _send(self, text):
+        self.attempts += 1
+        time.sleep(self.delay)
+        if self.attempts <= self.fail_times:
+            raise RuntimeError("boom")
+        self.sent.append((time.monotonic(), text))
+
+
+def test_messages_in_window_are_coalesced_into_one_digest():
+    channel = _RecordingChannel()
+    notifier = Notifier([channel], digest_window_s=0.1)
+
+    async def _run():
+        for i in range(3):
+            notifier.notify(f"msg {i}")
+        await notifier.flush(timeout=2)
+        notifier.notify("next cycle")
+        await notifier.close(timeout=2)
+
+    asyncio.run(_run())
+    texts = [t for _, t in channel.sent]
+    assert len(texts) == 2
+    assert texts[0].startswith("（合并 3 条通知）") and "msg 0" in texts[0] and "msg 2" in texts[0]
+    assert texts[1] == "next cycle"
+
+
+def test_retries_and_rate_limit_per_channel():
+    channel = _RecordingChannel(fail_times=1, retries=2, min_interval_s=0.2)
+    notifier = Notifier([channel], digest_window_s=0)
+
+    async def _run():
+        notifier.notify("a")
+        await notifier.flush(timeout=2)
+        notifier.notify("b")
+        await notifier.close(timeout=2)
+
+    asyncio.run(_run())
+    assert channel.attempts == 3 and [t for _, t in channel.sent] == ["a", "b"]
+    assert channel.sent[1][0] - channel.sent[0][0] >= 0.19
+
+
+def test_slow_channel_does_not_block_caller():
+    channel = _RecordingChannel(delay=0.3)
+    notifier = Notifier([channel], digest_window_s=0)
+
+    async def _run():
+        t0 = time.monotonic()
+        notifier.notify("slow")
+        await asyncio.sleep(0)
+        enqueue_s = time.monotonic() - t0
+        await notifier.close(timeout=2)
+        return enqueue_s
+
+    assert asyncio.run(_run()) < 0.05
+    assert [t for _, t in channel.sent] == ["slow"]
+
+
+def test_from_config_builds_configured_channels(monkeypatch):
+    monkeypatch.delenv("FEISHU_WEBHOOK_URL", raising=False)
+    monkeypatch.setenv("BARK_KEY", "abc")
+    notifier = Notifier.from_config({"email": {"smtp_server": "smtp.example.com", "username": "a@example.com"}})
+    assert [c.name for c in notifier.channels] == ["bark", "email"]
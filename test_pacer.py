@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+令牌桶节流的本地单元测试。
+"""
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from zhihu_pacer import Pacer, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_spaces_reservations():
+    clock = _Clock()
+    bucket = TokenBucket(per_minute=60, burst=2, clock=clock)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits == [0.0, 0.0, 1.0, 2.0]
+    clock.now += 10
+    # 空闲后最多回满 burst 个令牌
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 1.0]
+
+
+def test_bucket_min_interval_applies_even_with_tokens():
+    clock = _Clock()
+    bucket = TokenBucket(per_minute=600, burst=5, min_interval_ms=500, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.5, 1.0]
+
+
+def test_concurrent_tasks_share_one_budget():
+    pacer = Pacer({"api": TokenBucket(per_minute=1200, burst=1)})
+    done = []
+
+    async def _call(i):
+        await pacer.acquire("api")
+        done.append(time.monotonic())
+
+    async def _run():
+        t0 = time.monotonic()
+        await asyncio.gather(*(_call(i) for i in range(5)))
+        return t0
+
+    t0 = asyncio.run(_run())
+    # 20 次/秒、突发 1：5 个并发调用至少需要 4 个间隔
+    assert max(done) - t0 >= 0.19
+    assert pacer.waits["api"] == 4
+    assert Pacer.from_config({"enabled": False}).reserve("navigation") == 0.0
+    assert Pacer.from_config({}).reserve("unknown") == 0.0
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+变更探测的本地单元测试（HTTP 用假 session 模拟，不访问网络）。
+"""
+import sys
+
+sys.path.insert(0, ".")
+
+from zhihu_probe import INVITATIONS_API, UNREAD_API, Probe, invitation_qids
+from zhihu_risk import RiskGuard
+from zhihu_state import StateStore
+
+COOKIES = [{"name": "z_c0", "value": "token", "domain": ".zhihu.com", "path": "/"}]
+
+
+class _Resp:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self._body = body
+        self.headers = headers or {}
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("no json")
+        return self._body
+
+
+class _Session:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        return self.responses[url]
+
+
+def _invitations(*qids):
+    return {"data": [{"question": {"id": int(q), "title": f"q{q}"}} for q in qids]}
+
+
+def _probe(tmp_path, responses, **kwargs):
+    probe = Probe(cookies=COOKIES, state=StateStore(tmp_path / "state.db"), **kwargs)
+    probe._session = _Session(responses)
+    return probe
+
+
+def test_invitation_qids_handles_known_shapes():
+    assert invitation_qids(_invitations(1, 2, 1)) == ["1", "2"]
+    assert invitation_qids({"data": {"invitation": [{"question": {"id": "3"}}]}}) == ["3"]
+    assert invitation_qids({"error": {"code": 100}}) is None
+
+
+def test_idle_cycle_is_one_request_and_cursor_tracks_full_runs(tmp_path):
+    probe = _probe(tmp_path, {INVITATIONS_API: _Resp(200, _invitations(1, 2))})
+    now = 1_000_000.0
+
+    # 没有同步记录：第一次总是启动完整运行
+    first = probe.run(now=now)
+    assert first.new_work and first.new_qids == ["1", "2"]
+    probe.state.mark_discovered([{"qid": "1", "title": "q1", "url": ""}, {"qid": "2", "title": "q2", "url": ""}])
+    probe.state.mark_drafted("1")
+    probe.commit(first, now=now)
+    # 受 max_questions 限制没轮到的 2 仍算新任务
+    again = probe.run(now=now + 60)
+    assert again.new_work and again.new_qids == ["2"]
+
+    probe.state.mark_failed("2", "save_draft")
+    probe.commit(again, now=now + 60)
+    idle = probe.run(now=now + 120)
+    assert not idle.new_work and idle.reason == "no_new_invitations"
+    assert idle.requests == 1
+
+    probe._session.responses[INVITATIONS_API] = _Resp(200, _invitations(1, 2, 3))
+    assert probe.run(now=now + 180).new_qids == ["3"]
+
+    # 太久没有完整运行时即使没有新邀请也启动一次
+    probe._session.responses[INVITATIONS_API] = _Resp(200, _invitations(1, 2))
+    assert probe.run(now=now + 60 + 25 * 3600).reason == "max_idle"
+
+
+def test_falls_back_to_unread_count_then_to_full_run(tmp_path):
+    probe = _probe(
+        tmp_path,
+        {INVITATIONS_API: _Resp(404, {"error": {"code": 404}}), UNREAD_API: _Resp(200, {"default_notifications_count": 2})},
+    )
+    probe.state.set_meta("sync_cursor", '{"synced_at": 1000000.0, "unread": 2}')
+    quiet = probe.run(now=1_000_060.0)
+    assert not quiet.new_work and quiet.source == "unread" and quiet.requests == 2
+
+    probe._session.responses[UNREAD_API] = _Resp(200, {"default_notifications_count": 3})
+    assert probe.run(now=1_000_120.0).reason == "unread_increased"
+
+    probe._session.responses[UNREAD_API] = _Resp(502)
+    assert probe.run(now=1_000_180.0).reason == "inconclusive"
+
+
+def test_verification_redirect_trips_cooldown_without_full_run(tmp_path):
+    risk = RiskGuard(cooldown_file=tmp_path / "cooldown.json")
+    probe = _probe(
+        tmp_path,
+        {INVITATIONS_API: _Resp(302, headers={"location": "https://www.zhihu.com/account/unhuman?type=unhuman"})},
+        risk=risk,
+    )
+    result = probe.run()
+    assert not result.new_work and result.reason == "risk_control"
+    assert (tmp_path / "cooldown.json").exists()
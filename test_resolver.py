@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+选择器并发解析的本地单元测试（使用假页面对象，不启动浏览器）。
+"""
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from zhihu_resolver import race_selectors
+
+
+class _FakePage:
+    """selector -> 出现延迟（秒）；不在表里的选择器等到超时"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.cancelled = 0
+
+    async def wait_for_selector(self, selector, timeout, state="visible"):
+        delay = self.delays.get(selector)
+        try:
+            if delay is None or delay * 1000 > timeout:
+                await asyncio.sleep(timeout / 1000)
+                raise TimeoutError(f"timeout waiting for {selector}")
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"elem:{selector}"
+
+    async def query_selector(self, selector):
+        return f"elem:{selector}" if self.delays.get(selector) == 0 else None
+
+
+def test_race_returns_first_visible_match():
+    page = _FakePage({".late": 0.2, ".early": 0.05})
+    match = asyncio.run(race_selectors(page, [".missing", ".late", ".early"], timeout_ms=1000))
+    assert match.selector == ".early" and match.index == 2
+    assert match.element == "elem:.early"
+    # 其余等待在命中后被取消
+    assert page.cancelled == 2
+
+
+def test_race_worst_case_is_bounded_by_one_timeout():
+    page = _FakePage({})
+    start = time.monotonic()
+    match = asyncio.run(race_selectors(page, [f".s{i}" for i in range(10)], timeout_ms=200))
+    assert match is None
+    assert time.monotonic() - start < 1.0
+
+
+def test_probe_without_timeout_keeps_candidate_order():
+    page = _FakePage({".b": 0, ".c": 0})
+    match = asyncio.run(race_selectors(page, [".a", ".b", ".c"], timeout_ms=0, state="attached"))
+    assert match.selector == ".b"
+
+
+def test_strategy_stats_ranks_best_first_and_flags_stale(tmp_path):
+    from zhihu_strategy_stats import StrategyStats
+
+    path = tmp_path / "stats.json"
+    stats = StrategyStats(path, stale_after=3)
+    for _ in range(3):
+        stats.record("input", "editor", "fill", False)
+        stats.record("input", "editor", "keyboard", True, 40)
+    assert stats.rank("input", "editor", ["fill", "keyboard", "js"]) == ["keyboard", "js", "fill"]
+    # fill 从未命中过，不算“已失效”
+    assert stats.stale() == []
+
+    stats.record("selector", "editor", ".RichText-editable", True, 10)
+    for _ in range(3):
+        stats.record("selector", "editor", ".RichText-editable", False)
+    stats.save()
+
+    reloaded = StrategyStats(path, stale_after=3)
+    assert reloaded.best("input", "editor", ["fill", "keyboard"]) == "keyboard"
+    assert [s["option"] for s in reloaded.stale()] == [".RichText-editable"]
+    assert "可能已失效" in reloaded.report()
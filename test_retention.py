@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+artifact 保留策略的本地单元测试。
+"""
+import os
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from zhihu_artifact_store import ArtifactStore
+from zhihu_retention import Retention
+
+
+def _touch(path: Path, size: int = 10) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_budgets_archive_by_month_and_keep_latest(tmp_path):
+    runs = tmp_path / "artifacts" / "runs"
+    for ts in ["20260101_000000", "20260115_000000", "20260201_000000", "20260301_000000"]:
+        _touch(runs / f"run_{ts}.json")
+    _touch(runs / "run_latest.json")
+    config = {"classes": {"runs": {"max_age_days": 40, "max_count": None, "max_total_mb": None}}}
+    retention = Retention.from_config(config, base_dir=tmp_path)
+    now = datetime(2026, 3, 2)
+
+    report = retention.run(dry_run=True, now=now)
+    assert report.classes["runs"]["deleted"] == 2
+    assert len(list(runs.glob("run_2*.json"))) == 4
+
+    retention.run(now=now)
+    assert sorted(p.name for p in runs.iterdir()) == ["run_20260201_000000.json", "run_20260301_000000.json", "run_latest.json"]
+    with zipfile.ZipFile(tmp_path / "artifacts" / "archive" / "runs_202601.zip") as zf:
+        assert sorted(zf.namelist()) == ["run_20260101_000000.json", "run_20260115_000000.json"]
+
+    # 数量 / 大小预算，最新的一个始终保留
+    config = {"classes": {"logs": {"max_age_days": None, "max_count": 1, "archive": False}}}
+    _touch(tmp_path / "logs" / "scheduled_20260101_000000.log")
+    _touch(tmp_path / "logs" / "scheduled_20260102_000000.log")
+    Retention.from_config(config, base_dir=tmp_path).run(now=now)
+    assert [p.name for p in (tmp_path / "logs").iterdir()] == ["scheduled_20260102_000000.log"]
+
+
+def test_store_gc_only_removes_old_unreferenced_blobs(tmp_path):
+    store = ArtifactStore(tmp_path / "store", codec="gzip")
+    keep = store.put_text("keep")
+    drop = store.put_text("drop")
+    fresh = store.put_text("fresh")
+    old = time.time() - 48 * 3600
+    for digest in (keep, drop):
+        path = next(p for p in store.iter_blobs() if p.name.startswith(digest))
+        os.utime(path, (old, old))
+
+    retention = Retention([], archive_dir=tmp_path / "archive", store=store, referenced_hashes=lambda: {keep})
+    report = retention.run()
+    assert report.store["deleted"] == 1
+    assert store.exists(keep) and store.exists(fresh) and not store.exists(drop)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+风控检测与冷却的本地单元测试（不依赖 Playwright，浏览器事件用假对象模拟）。
+"""
+import asyncio
+import json
+import sys
+
+import pytest
+
+sys.path.insert(0, ".")
+
+from zhihu_risk import RiskControlTripped, RiskGuard, active_cooldown
+
+
+class _EventTarget:
+    def __init__(self):
+        self.handlers = {}
+        self.pages = []
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, arg):
+        for handler in list(self.handlers.get(event, [])):
+            handler(arg)
+
+
+class _Response:
+    def __init__(self, url, status=200, headers=None):
+        self.url = url
+        self.status = status
+        self.headers = headers or {}
+
+
+class _Frame:
+    def __init__(self, url):
+        self.url = url
+
+
+def test_trips_on_redirect_and_persists_cooldown(tmp_path):
+    guard = RiskGuard(cooldown_file=tmp_path / "cooldown.json", cooldown_minutes=60)
+    seen = []
+    guard.listeners.append(seen.append)
+    context = _EventTarget()
+    guard.attach(context)
+
+    context.emit("response", _Response("https://www.zhihu.com/notifications"))
+    assert guard.tripped is None
+
+    # 接口被 302 到验证页：响应 URL 是原接口，Location 指向验证页
+    context.emit(
+        "response",
+        _Response(
+            "https://www.zhihu.com/api/v4/me",
+            status=302,
+            headers={"location": "https://www.zhihu.com/account/unhuman?type=unhuman"},
+        ),
+    )
+    assert guard.tripped["source"] == "redirect"
+    assert len(seen) == 1
+    with pytest.raises(RiskControlTripped):
+        guard.raise_if_tripped()
+
+    data = json.loads((tmp_path / "cooldown.json").read_text(encoding="utf-8"))
+    assert active_cooldown(tmp_path / "cooldown.json") == data
+    assert active_cooldown(tmp_path / "cooldown.json", now=data["until"] + 1) is None
+
+
+def test_navigation_trips_unless_paused(tmp_path):
+    guard = RiskGuard(cooldown_file=tmp_path / "cooldown.json")
+    context = _EventTarget()
+    page = _EventTarget()
+    page.main_frame = _Frame("https://www.zhihu.com/account/unhuman")
+    guard.attach(context)
+    context.emit("page", page)
+
+    with guard.paused():
+        page.emit("framenavigated", page.main_frame)
+    assert guard.tripped is None and not (tmp_path / "cooldown.json").exists()
+
+    page.emit("framenavigated", _Frame("https://www.zhihu.com/account/unhuman"))  # 子框架不算
+    assert guard.tripped is None
+    page.emit("framenavigated", page.main_frame)
+    assert guard.tripped["source"] == "navigation"
+
+
+def test_consecutive_trips_escalate_until_clean_run(tmp_path):
+    path = tmp_path / "cooldown.json"
+    now = 1_000_000.0
+    durations = []
+    for _ in range(4):
+        guard = RiskGuard(cooldown_file=path, cooldown_minutes=60, max_cooldown_hours=3)
+        guard.trip("https://www.zhihu.com/account/unhuman", now=now)
+        durations.append(guard.tripped["until"] - now)
+        now = guard.tripped["until"] + 60
+    assert durations == [3600, 7200, 10800, 10800]
+
+    RiskGuard(cooldown_file=path).clear()
+    assert not path.exists()
+    guard = RiskGuard(cooldown_file=path, cooldown_minutes=60)
+    guard.trip("https://www.zhihu.com/account/unhuman", now=now)
+    assert guard.tripped["count"] == 1
+
+
+def test_tripped_bot_stops_zhihu_operations(bot):
+    bot.risk.trip("https://www.zhihu.com/account/unhuman")
+
+    with pytest.raises(RiskControlTripped):
+        asyncio.run(bot._pace("navigation"))
+    assert bot.metrics.risk_trips.value() == 1
+
+    summary = {"run_id": "r1", "mode": "none", "failures": []}
+    asyncio.run(bot._write_run_summary(summary))
+    assert summary["risk_control"]["count"] == 1
+    # 触发过风控的运行不清除冷却
+    assert active_cooldown(bot.risk.cooldown_file)
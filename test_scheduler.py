@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+内置调度与实例锁的本地单元测试。
+"""
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, ".")
+
+import zhihu_scheduler
+from zhihu_risk import RiskGuard
+from zhihu_scheduler import CronRule, InstanceLock, Scheduler
+
+
+def test_cron_rule_next_after():
+    daily = CronRule("0 4 * * *")
+    assert daily.next_after(datetime(2026, 10, 19, 3, 59, 30)) == datetime(2026, 10, 19, 4, 0)
+    assert daily.next_after(datetime(2026, 10, 19, 4, 0)) == datetime(2026, 10, 20, 4, 0)
+
+    # 2026-10-17 是周六：工作日规则跳到周一
+    workdays = CronRule("*/15 9-18 * * 1-5")
+    assert workdays.next_after(datetime(2026, 10, 17, 12, 0)) == datetime(2026, 10, 19, 9, 0)
+    assert workdays.next_after(datetime(2026, 10, 19, 9, 7)) == datetime(2026, 10, 19, 9, 15)
+
+    # 日和周都受限时满足其一即可；7 也表示周日
+    either = CronRule("30 2 1 * 7")
+    assert either.next_after(datetime(2026, 10, 19, 12, 0)) == datetime(2026, 10, 25, 2, 30)
+    assert either.next_after(datetime(2026, 10, 26, 0, 0)) == datetime(2026, 11, 1, 2, 30)
+
+    with pytest.raises(ValueError):
+        CronRule("0 25 * * *")
+    with pytest.raises(ValueError):
+        CronRule("0 4 * *")
+
+
+def test_jitter_only_delays_and_rule_options_are_kept():
+    scheduler = Scheduler.from_config(
+        {"rules": ["0 4 * * *", {"cron": "0 16 * * *", "max_questions": 3}], "jitter_minutes": 10}
+    )
+    scheduler.rng = random.Random(7)
+    base = datetime(2026, 10, 19, 12, 0)
+    for _ in range(20):
+        fire, rule = scheduler.next_fire(base)
+        assert datetime(2026, 10, 19, 16, 0) <= fire <= datetime(2026, 10, 19, 16, 10)
+        assert rule.options == {"max_questions": 3}
+
+
+def test_instance_lock_is_exclusive(tmp_path):
+    path = tmp_path / "bot.lock"
+    first = InstanceLock(path)
+    second = InstanceLock(path)
+    assert first.acquire()
+    assert not second.acquire()
+    assert second.holder()["pid"] > 0
+    first.release()
+    with second:
+        assert second.held
+    assert not second.held
+
+
+def test_run_forever_skips_fires_missed_during_a_long_cycle(monkeypatch):
+    clock = {"now": datetime(2026, 10, 19, 12, 1)}
+
+    async def _fake_wait_for(awaitable, timeout):
+        # 不真的等待：直接把时钟拨到超时时刻
+        awaitable.close()
+        clock["now"] += timedelta(seconds=timeout)
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(zhihu_scheduler.asyncio, "wait_for", _fake_wait_for)
+    scheduler = Scheduler([CronRule("*/10 * * * *")], now_fn=lambda: clock["now"])
+    started = []
+
+    async def _job(rule):
+        started.append(clock["now"])
+        # 第一轮跑了 25 分钟，12:20 和 12:30 两次触发被跳过
+        clock["now"] += timedelta(minutes=25 if len(started) == 1 else 1)
+
+    assert asyncio.run(scheduler.run_forever(_job, max_cycles=2)) == 2
+    assert started == [datetime(2026, 10, 19, 12, 10), datetime(2026, 10, 19, 12, 40)]
+    assert scheduler.missed_between(started[0], started[0] + timedelta(minutes=25)) == 2
+
+
+def test_run_once_skips_while_another_instance_holds_the_lock(tmp_path, monkeypatch, capsys):
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.yaml").write_text("schedule:\n  lock_file: busy.lock\n", encoding="utf-8")
+    holder = InstanceLock(tmp_path / "busy.lock")
+    assert holder.acquire()
+
+    async def _must_not_run(args):
+        raise AssertionError("run should have been skipped")
+
+    monkeypatch.setattr(main, "_run", _must_not_run)
+    args = main.build_parser().parse_args(["--config", "config.yaml"])
+    asyncio.run(main.run_once(args))
+    assert "另一个实例仍在运行" in capsys.readouterr().out
+    holder.release()
+
+
+def test_schedule_shares_metrics_across_cycles(make_bot, tmp_path, monkeypatch):
+    import main
+
+    (tmp_path / "config.yaml").write_text(
+        'schedule:\n  rules: ["* * * * *"]\n  jitter_minutes: 0\n  lock_file: bot.lock\n', encoding="utf-8"
+    )
+
+    async def _no_wait(awaitable, timeout):
+        awaitable.close()
+        raise asyncio.TimeoutError
+
+    seen = []
+
+    async def _fake_run(args, metrics=None):
+        bot = make_bot(metrics=metrics)
+        with bot.tracer.span("save_draft", qid=str(len(seen)), kind="stage") as span:
+            span.set(method="api")
+        await bot._write_run_summary({"run_id": f"r{len(seen)}", "mode": "deep_research", "failures": []})
+        await bot.close()
+        seen.append((bot.metrics, bot.metrics.runs.value(mode="deep_research")))
+        return None
+
+    monkeypatch.setattr(zhihu_scheduler.asyncio, "wait_for", _no_wait)
+    monkeypatch.setattr(main, "_run", _fake_run)
+    args = main.build_parser().parse_args(["--config", "config.yaml", "--schedule"])
+    asyncio.run(main.run_schedule(args, max_cycles=2))
+
+    # 两轮用的是同一份指标，计数跨轮累计而不是每轮从零开始
+    metrics = seen[0][0]
+    assert all(m is metrics for m, _ in seen)
+    assert [runs for _, runs in seen] == [1, 2]
+    assert metrics.drafts_saved.value(method="api") == 2
+
+    # 冷却期内被跳过的轮次也记入同一份指标
+    RiskGuard(cooldown_file=tmp_path / "zhihu_risk_cooldown.json").trip("https://www.zhihu.com/account/unhuman")
+    asyncio.run(main.run_once(main.build_parser().parse_args(["--config", "config.yaml"]), metrics=metrics))
+    assert metrics.cycles_skipped.value(reason="cooldown") == 1
+    assert len(seen) == 2
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+登录态快速校验（/api/v4/me + TTL 缓存）的本地单元测试，不访问网络。
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from zhihu_session import (
+    INCONCLUSIVE, INVALID, VALID, SessionCheck, SessionFile, cookie_fingerprint, forecast_session, probe_me,
+)
+
+
+class _FakeResponse:
+    def __init__(self, status, body=None):
+        self.status = status
+        self._body = body
+
+    async def json(self):
+        if self._body is None:
+            raise ValueError("not json")
+        return self._body
+
+
+class _FakeRequest:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def get(self, url, **kwargs):
+        self.calls += 1
+        item = self.responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class _FakeContext:
+    def __init__(self, request, z_c0="token"):
+        self.request = request
+        self._cookies = [{"name": "z_c0", "value": z_c0}] if z_c0 else []
+
+    async def cookies(self, *urls):
+        return list(self._cookies)
+
+
+def test_probe_me_classifies_responses():
+    async def _run(item):
+        return await probe_me(_FakeRequest(item))
+
+    assert asyncio.run(_run(_FakeResponse(200, {"id": "u1", "name": "me"}))).status == VALID
+    assert asyncio.run(_run(_FakeResponse(401, {"error": {}}))).status == INVALID
+    assert asyncio.run(_run(_FakeResponse(302))).status == INCONCLUSIVE
+    assert asyncio.run(_run(_FakeResponse(200))).status == INCONCLUSIVE
+    assert asyncio.run(_run(TimeoutError("slow"))).status == INCONCLUSIVE
+
+
+def test_session_cache_requires_same_cookie_and_fresh_ttl(tmp_path):
+    session = SessionFile(tmp_path / "zhihu_session.json")
+    fp = cookie_fingerprint([{"name": "z_c0", "value": "abc"}])
+    assert fp and "abc" not in fp
+    session.record_valid(fp, SessionCheck(VALID, "api", user={"name": "me"}), now=1000)
+    assert session.cached_valid(fp, 60, now=1030)["user"] == {"name": "me"}
+    assert session.cached_valid(fp, 60, now=1100) is None
+    assert session.cached_valid("other", 60, now=1030) is None
+
+
+def test_check_login_uses_one_request_then_cache(bot):
+    request = _FakeRequest(_FakeResponse(200, {"id": "u1", "name": "me"}))
+    bot.context = _FakeContext(request)
+    bot.page = None  # 快速路径不应打开页面
+
+    assert asyncio.run(bot.check_login()) is True
+    assert asyncio.run(bot.check_login()) is True
+    assert request.calls == 1
+    assert Path("zhihu_session.json").exists()
+
+    bot.context = _FakeContext(_FakeRequest(_FakeResponse(401, {"error": {}})), z_c0="changed")
+    assert asyncio.run(bot.check_login()) is False
+
+
+def test_forecast_prefers_context_cookies_and_blocks_short_sessions(tmp_path):
+    cookie_file = tmp_path / "zhihu_cookies.json"
+    cookie_file.write_text(json.dumps([{"name": "z_c0", "value": "x", "expires": 1000 + 30 * 86400}]), encoding="utf-8")
+    session = SessionFile(tmp_path / "zhihu_session.json")
+
+    from_file = forecast_session(context_cookies=[], cookie_file=cookie_file, session_file=session, now=1000)
+    assert from_file.source == "cookie_file" and not from_file.expiring_soon and not from_file.blocks_run
+
+    live = [{"name": "z_c0", "value": "y", "expires": 1000 + 3 * 3600}, {"name": "d_c0", "value": "z", "expires": 10}]
+    health = forecast_session(context_cookies=live, cookie_file=cookie_file, session_file=session, now=1000)
+    assert health.source == "context" and health.expiring_soon and health.blocks_run
+    assert "请重新登录" in health.format()
+
+    unknown = forecast_session(
+        context_cookies=[{"name": "z_c0", "value": "y", "expires": -1}],
+        cookie_file=tmp_path / "missing.json",
+        session_file=session,
+        now=1000,
+    )
+    assert unknown.expires_at is None and not unknown.blocks_run
+
+
+def test_session_health_warns_once_per_interval(bot):
+    Path("zhihu_cookies.json").write_text(
+        json.dumps([{"name": "z_c0", "value": "x", "expires": time.time() + 2 * 86400}]), encoding="utf-8"
+    )
+    sent = []
+
+    async def _notify(message):
+        sent.append(message)
+
+    bot.send_notification = _notify
+    # --session-status 只输出预测：不提醒，也不吞掉正式运行的那次提醒
+    status = asyncio.run(bot.check_session_health(notify=False))
+    assert status.expiring_soon and sent == [] and "warned_at" not in bot.session_file.load()
+    first = asyncio.run(bot.check_session_health())
+    second = asyncio.run(bot.check_session_health())
+    assert first.expiring_soon and not first.blocks_run and not second.blocks_run
+    assert len(sent) == 1
+    assert bot.session_file.load()["expiry_cookie"] == "z_c0"
+
+
+class _EventTarget:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, arg):
+        for handler in list(self.handlers.get(event, [])):
+            handler(arg)
+
+
+def test_wait_for_login_wakes_on_login_response_and_confirms_once(bot):
+    request = _FakeRequest(_FakeResponse(200, {"id": "u1"}))
+    context = _FakeContext(request, z_c0=None)
+    events = _EventTarget()
+    context.on, context.remove_listener = events.on, events.remove_listener
+    page = _EventTarget()
+    page.main_frame = object()
+    bot.context, bot.page = context, page
+
+    class _Resp:
+        url = "https://www.zhihu.com/api/v3/account/api/login/qrcode/abc/scan_info"
+
+    async def _run():
+        waiter = asyncio.create_task(bot._wait_for_login(timeout_ms=3000))
+        await asyncio.sleep(0.05)
+        context._cookies = [{"name": "z_c0", "value": "new"}]
+        t0 = time.monotonic()
+        events.emit("response", _Resp())
+        ok = await waiter
+        return ok, time.monotonic() - t0
+
+    ok, latency = asyncio.run(_run())
+    assert ok and latency < 0.5
+    assert request.calls == 1
+    assert events.handlers["response"] == [] and page.handlers["framenavigated"] == []
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+计时 span 的本地单元测试。
+"""
+import asyncio
+import json
+import sys
+
+import pytest
+
+sys.path.insert(0, ".")
+
+from zhihu_spans import Tracer, to_chrome_trace
+
+
+def test_spans_inherit_run_id_qid_and_parent_across_tasks():
+    tracer = Tracer()
+
+    async def _one(qid):
+        with tracer.span("deep_research", qid=qid, kind="stage") as stage:
+            await asyncio.sleep(0.01)
+            with tracer.span("store_answer"):
+                await asyncio.sleep(0)
+            stage.set(method="api")
+
+    async def _run():
+        tracer.reset("r1")
+        await asyncio.gather(_one("1"), _one("2"))
+
+    asyncio.run(_run())
+    by_name = {}
+    for s in tracer.spans:
+        by_name.setdefault(s.name, []).append(s)
+    assert {s.qid for s in by_name["store_answer"]} == {"1", "2"}
+    assert all(s.run_id == "r1" for s in tracer.spans)
+    parents = {s.span_id: s.qid for s in by_name["deep_research"]}
+    assert all(parents[s.parent_id] == s.qid for s in by_name["store_answer"])
+
+    events = tracer.stage_events()
+    assert len(events) == 2 and events[0]["method"] == "api" and events[0]["ms"] >= 10
+    assert set(tracer.per_qid()["1"]) == {"deep_research", "store_answer"}
+    assert tracer.percentiles()["deep_research"]["count"] == 2
+
+
+def test_failed_span_records_error():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("ui.input"):
+            raise ValueError("boom")
+    with tracer.span("ui.autosave_wait") as span:
+        span.ok = False
+    failed = tracer.percentiles()
+    assert failed["ui.input"]["failed"] == 1 and failed["ui.autosave_wait"]["failed"] == 1
+    assert tracer.spans[0].error == "ValueError: boom"
+
+
+def test_chrome_trace_puts_run_qids_and_writer_on_separate_lanes():
+    tracer = Tracer()
+    tracer.reset("r1")
+    with tracer.span("get_invitations", kind="stage"):
+        pass
+    with tracer.span("deep_research", qid="7", kind="stage"):
+        with tracer.span("store_answer"):
+            pass
+    tracer.record("file_write", start=tracer.spans[0].start + 0.5, duration_ms=12, lane="writer", path="a.json")
+
+    trace = to_chrome_trace(tracer.spans, run_id="r1")
+    meta = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    lanes = {e["args"]["name"]: e["tid"] for e in meta if e["name"] == "thread_name"}
+    assert set(lanes) == {"run", "qid 7", "writer"} and lanes["run"] == 0
+
+    events = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    assert events["get_invitations"]["tid"] == lanes["run"] and events["get_invitations"]["ts"] == 0
+    assert events["store_answer"]["tid"] == events["deep_research"]["tid"] == lanes["qid 7"]
+    write = events["file_write"]
+    assert write["tid"] == lanes["writer"] and write["dur"] == 12000 and write["ts"] >= 500000
+    assert write["args"] == {"path": "a.json"}
+    assert trace["otherData"]["run_id"] == "r1"
+
+
+def test_run_summary_carries_span_timings(bot, tmp_path):
+    bot.state.mark_discovered([{"qid": "1", "title": "t", "url": "u"}])
+    bot.config["tracing"] = {"chrome_trace": True}
+    bot.tracer.set_run_id("r1")
+    with bot.tracer.span("save_draft", qid="1", kind="stage"):
+        with bot.tracer.span("draft.api"):
+            pass
+    summary = {"run_id": "r1", "started_at": "", "ended_at": "", "failures": []}
+    asyncio.run(bot._write_run_summary(summary))
+
+    latest = json.loads((tmp_path / "artifacts" / "runs" / "run_latest.json").read_text(encoding="utf-8"))
+    assert set(latest["timings"]) == {"save_draft", "draft.api"}
+    assert latest["stage_events"][0]["stage"] == "save_draft"
+    assert set(bot.state.get_timings("1")["ms"]) == {"save_draft", "draft.api"}
+    assert bot.tracer.spans == []
+    trace = json.loads((tmp_path / "artifacts" / "runs" / "trace_r1.json").read_text(encoding="utf-8"))
+    assert {e["name"] for e in trace["traceEvents"] if e["ph"] == "X"} >= {"save_draft", "draft.api"}
+    assert latest["artifacts"]["chrome_trace"].endswith("trace_r1.json")
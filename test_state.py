@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+SQLite 状态存储的本地单元测试。
+"""
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, ".")
+
+from zhihu_state import StateStore
+
+
+def test_state_machine_only_moves_forward(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.mark_discovered([{"qid": "1", "title": "t", "url": "u"}])
+    assert store.get("1")["status"] == "discovered"
+    store.mark_detailed("1", "详情")
+    store.mark_generated("1", answer_len=10)
+    # 重新发现不会把状态回退，但会刷新标题
+    store.mark_discovered([{"qid": "1", "title": "新标题", "url": "u"}])
+    row = store.get("1")
+    assert row["status"] == "generated" and row["title"] == "新标题" and row["content"] == "详情"
+
+    store.mark_failed("1", "save_draft", "boom")
+    assert store.get("1")["failed_stage"] == "save_draft"
+    store.mark_drafted("1")
+    row = store.get("1")
+    assert row["status"] == "drafted" and row["failed_stage"] is None
+    # drafted 是终态
+    store.mark_failed("1", "save_draft")
+    assert store.get("1")["status"] == "drafted"
+    assert store.drafted_ids() == {"1"}
+
+
+def test_migrates_legacy_json_once(tmp_path):
+    artifact_dir = tmp_path / "artifacts"
+    (artifact_dir / "answers_by_qid").mkdir(parents=True)
+    (artifact_dir / "runs").mkdir()
+    (artifact_dir / "invitations_20260101_000000.json").write_text(
+        json.dumps([{"id": "1", "title": "a", "url": "u1"}, {"id": "2", "title": "b", "url": "u2", "content": "c"}]),
+        encoding="utf-8",
+    )
+    (artifact_dir / "answers_by_qid" / "2.json").write_text(
+        json.dumps({"question_id": "2", "ok": True, "answer_text": "answer", "generated_at": "g"}),
+        encoding="utf-8",
+    )
+    (artifact_dir / "runs" / "run_20260101_000000.json").write_text(
+        json.dumps({"run_id": "20260101_000000", "started_at": "s", "failures": [{}]}), encoding="utf-8"
+    )
+    processed = tmp_path / "processed_invitations.json"
+    processed.write_text(json.dumps({"processed_ids": ["1"]}), encoding="utf-8")
+    hashes = tmp_path / "draft_hashes.json"
+    hashes.write_text(json.dumps({"drafts": {"1": {"hash": "h1", "method": "api"}}}), encoding="utf-8")
+
+    store = StateStore(tmp_path / "state.db")
+    kwargs = dict(processed_file=processed, draft_hash_file=hashes, artifact_dir=artifact_dir)
+    assert store.migrate_legacy(**kwargs)
+    assert not store.migrate_legacy(**kwargs)
+
+    assert store.get("1")["status"] == "drafted"
+    assert store.get_draft_hash("1") == "h1"
+    assert store.get("2")["status"] == "generated" and store.get("2")["answer_len"] == 6
+    assert store.recent_runs()[0]["run_id"] == "20260101_000000"
+
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path):
+    path = tmp_path / "state.db"
+    StateStore(path).close()
+    errors = []
+
+    def _worker(prefix):
+        store = StateStore(path)
+        try:
+            for i in range(50):
+                store.mark_discovered([{"qid": f"{prefix}{i}", "title": "", "url": ""}])
+                store.mark_drafted(f"{prefix}{i}")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            store.close()
+
+    threads = [threading.Thread(target=_worker, args=(p,)) for p in "abcd"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert StateStore(path).count_by_status() == {"drafted": 200}
+
+
+def test_run_plan_checkpoints(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.mark_discovered([{"qid": q, "title": f"t{q}", "url": f"u{q}"} for q in ("3", "1", "2")])
+    store.save_run_plan("r1", ["3", "1", "2"], started_at="2026-10-19T04:00:00", options={"flush_drafts_every": 2})
+    store.mark_detailed("3", "详情")
+    store.checkpoint_stage("r1", "3", "generated")
+    # 阶段只前进
+    store.checkpoint_stage("r1", "3", "detailed")
+    assert store.latest_unfinished_run() == "r1"
+
+    plan = store.load_run_plan("r1")
+    assert [i["qid"] for i in plan["items"]] == ["3", "1", "2"]
+    assert plan["items"][0]["stage"] == "generated" and plan["items"][0]["content"] == "详情"
+    assert plan["options"] == {"flush_drafts_every": 2}
+
+    # 还有问题没到终态：运行保持未完成
+    assert store.finish_run_plan("r1") is False
+    assert store.latest_unfinished_run() == "r1"
+
+    store.mark_drafted("3")
+    store.checkpoint_stage("r1", "3", "drafted")
+    store.mark_drafted("1")
+    store.mark_failed("2", "save_draft")
+    assert store.finish_run_plan("r1") is True
+    assert store.latest_unfinished_run() is None
+    assert store.load_run_plan("missing") is None
+
+
+def test_resume_skips_finished_stages(bot, question):
+    bot._get_deep_research_config = lambda: None
+    bot.state.mark_discovered([{"qid": q, "title": f"t{q}", "url": f"https://www.zhihu.com/question/{q}"} for q in "123"])
+    bot.state.save_run_plan("r1", ["1", "2", "3"], started_at="2026-10-19T04:00:00")
+    # 1 已写入草稿；2 已生成回答；3 只完成了计划
+    bot.run_id = "r1"
+    bot._mark_processed("1")
+    bot._mark_detailed(question("2"))
+    bot._store_answer_artifact("2", {"ok": True, "answer_text": "旧回答"})
+    bot._mark_generated("2", 3)
+    bot.run_id = None
+
+    calls = {"detail": [], "generate": [], "draft": []}
+
+    async def _invitations():
+        raise AssertionError("resume must not rediscover invitations")
+
+    async def _detail(question):
+        calls["detail"].append(question.id)
+        question.content = "c"
+        bot._mark_detailed(question)
+
+    async def _generate(invitations):
+        calls["generate"].extend(inv.question.id for inv in invitations)
+        return {inv.question.id: "新回答" for inv in invitations}
+
+    async def _draft(question, answer):
+        calls["draft"].append((question.id, answer))
+        return True
+
+    bot.get_invitations = _invitations
+    bot.get_question_detail = _detail
+    bot.generate_answers_batch = _generate
+    bot.save_answer_to_draft = _draft
+
+    summary = asyncio.run(bot.process_invitations(resume_run_id="r1"))
+    assert summary["run_id"] == "r1" and summary["resumed"]
+    assert calls == {"detail": ["3"], "generate": ["3"], "draft": [("2", "旧回答"), ("3", "新回答")]}
+    assert bot.state.latest_unfinished_run() is None
+
+
+def test_resume_continues_a_run_stopped_by_risk_control(make_bot, question):
+    from zhihu_bot import Invitation
+
+    calls = {"detail": [], "generate": [], "draft": []}
+
+    def _patch(bot, trip_on=None):
+        bot._get_deep_research_config = lambda: None
+
+        async def _invitations():
+            return [Invitation(question=question(q)) for q in "123"]
+
+        async def _detail(question):
+            if question.id == trip_on:
+                bot.risk.trip("https://www.zhihu.com/account/unhuman")
+                return
+            calls["detail"].append(question.id)
+            question.content = "c"
+            bot._mark_detailed(question)
+
+        async def _generate(invitations):
+            calls["generate"].extend(inv.question.id for inv in invitations)
+            return {inv.question.id: f"回答{inv.question.id}" for inv in invitations}
+
+        async def _draft(question, answer):
+            calls["draft"].append(question.id)
+            return True
+
+        bot.get_invitations = _invitations
+        bot.get_question_detail = _detail
+        bot.generate_answers_batch = _generate
+        bot.save_answer_to_draft = _draft
+
+    # 第一次运行：获取 2 的详情时触发风控，之后的详情 / 生成 / 草稿都停止
+    bot = make_bot()
+    _patch(bot, trip_on="2")
+    summary = asyncio.run(bot.process_invitations())
+    asyncio.run(bot.close())
+    assert summary["risk_control"] and calls == {"detail": ["1"], "generate": [], "draft": []}
+    run_id = summary["run_id"]
+
+    # 冷却结束后 --resume 找到这次没有跑完的运行，按原计划继续
+    bot = make_bot()
+    _patch(bot)
+    assert bot.state.latest_unfinished_run() == run_id
+    resumed = asyncio.run(bot.process_invitations(resume_run_id=run_id))
+    assert resumed["run_id"] == run_id and resumed["draft_saved_ok"] == 3
+    assert calls == {"detail": ["1", "2", "3"], "generate": ["1", "2", "3"], "draft": ["1", "2", "3"]}
+    assert bot.state.latest_unfinished_run() is None
+    asyncio.run(bot.close())
+
+
+def test_bot_close_releases_state_connection(bot):
+    asyncio.run(bot.close())
+    with pytest.raises(sqlite3.ProgrammingError):
+        bot.state.get("1")
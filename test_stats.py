@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+运行历史统计的本地单元测试。
+"""
+import csv
+import sys
+
+sys.path.insert(0, ".")
+
+from zhihu_state import StateStore
+from zhihu_stats import RunStats, export_csv, percentile
+
+
+def _summary(run_id, day, events=None, failures=None):
+    summary = {
+        "run_id": run_id,
+        "started_at": f"{day}T04:00:00",
+        "ended_at": f"{day}T04:10:00",
+        "mode": "deep_research_incremental",
+        "selected": 3,
+        "draft_saved_ok": 2,
+        "failures": failures or [],
+    }
+    if events is not None:
+        summary["stage_events"] = events
+    return summary
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_ingest_is_incremental_and_queries_aggregate(tmp_path):
+    path = tmp_path / "state.db"
+    state = StateStore(path)
+    state.record_run(
+        _summary(
+            "20261001_040000",
+            "2026-10-01",
+            events=[
+                {"stage": "save_draft", "qid": "1", "ms": 100, "ok": True, "method": "api"},
+                {"stage": "save_draft", "qid": "2", "ms": 300, "ok": False, "method": "ui", "selector": "editor"},
+                {"stage": "deep_research", "qid": "1", "ms": 5000, "ok": True},
+            ],
+        )
+    )
+    # 旧版 summary：没有计时，只有 failures
+    state.record_run(_summary("20261002_040000", "2026-10-02", failures=[{"stage": "deep_research", "title": "t"}]))
+
+    stats = RunStats(path)
+    assert stats.ingest() == 2
+    assert stats.ingest() == 0
+
+    days = stats.throughput()
+    assert [d["day"] for d in days] == ["2026-10-01", "2026-10-02"]
+    assert days[0]["drafted"] == 2 and days[0]["duration_ms"] == 600000
+
+    stages = {r["stage"]: r for r in stats.stages()}
+    assert stages["save_draft"]["p50_ms"] == 100 and stages["save_draft"]["p95_ms"] == 300
+    assert stages["deep_research"]["failed"] == 1
+
+    failures = stats.failures(since="2026-10-01")
+    assert {(f["stage"], f["selector"]) for f in failures} == {("save_draft", "editor"), ("deep_research", "")}
+    assert stats.failures(since="2026-10-02")[0]["stage"] == "deep_research"
+
+    out = tmp_path / "stages.csv"
+    export_csv(stats.stages(), out)
+    with out.open(encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == 2
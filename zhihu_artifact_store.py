@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+压缩、内容寻址的回答产物存储
+回答正文和 deep_research 原始返回按内容 sha256 存成压缩 blob（zstd 可用时优先，否则 gzip），
+相同内容只存一份；qid -> 状态/长度/哈希 的索引放在状态库里，resume 检查无需打开 blob
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+try:
+    import zstandard  # 可选依赖：pip install zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_EXT = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def project_fields(
+    data: Optional[dict],
+    *,
+    include: Optional[Sequence[str]] = None,
+    exclude: Sequence[str] = (),
+) -> Optional[dict]:
+    """按配置裁剪 raw 字段：include 为 None 表示保留全部，再去掉 exclude 中的字段"""
+    if not isinstance(data, dict):
+        return None
+    keys = list(data) if include is None else [k for k in include if k in data]
+    return {k: data[k] for k in keys if k not in set(exclude)}
+
+
+class ArtifactStore:
+    """内容寻址的压缩 blob 存储：{root}/objects/{hash[:2]}/{hash}{.zst|.gz}"""
+
+    def __init__(self, root: Path, *, codec: str = "auto", level: Optional[int] = None):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        codec = (codec or "auto").strip().lower()
+        if codec == "auto":
+            codec = "zstd" if zstandard is not None else "gzip"
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("compression zstd requires the zstandard package (pip install zstandard)")
+        if codec not in CODEC_EXT:
+            raise ValueError(f"unknown compression codec: {codec}")
+        self.codec = codec
+        self.level = level
+
+    # ---- 编解码 ----
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level or 10).compress(data)
+        return gzip.compress(data, compresslevel=self.level or 6)
+
+    @staticmethod
+    def _decompress(path: Path) -> bytes:
+        raw = path.read_bytes()
+        if path.suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package")
+            return zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+        return gzip.decompress(raw)
+
+    # ---- 路径 ----
+    def _find(self, digest: str) -> Optional[Path]:
+        base = self.objects_dir / digest[:2]
+        for ext in CODEC_EXT.values():
+            path = base / f"{digest}{ext}"
+            if path.exists():
+                return path
+        return None
+
+    def exists(self, digest: str) -> bool:
+        return bool(digest) and self._find(digest) is not None
+
+    # ---- 写入 ----
+    def put_bytes(self, data: bytes) -> str:
+        """写入 blob，返回内容 sha256；已存在则直接复用"""
+        digest = hashlib.sha256(data).hexdigest()
+        if self._find(digest) is None:
+            path = self.objects_dir / digest[:2] / f"{digest}{CODEC_EXT[self.codec]}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 每个写入方用独立的临时文件：并发写入相同内容时不会互相覆盖/抢走对方的临时文件
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{digest}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self._compress(data))
+                os.replace(tmp, path)
+            except OSError:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                # 目标已由另一个写入方写好（内容相同）时同样算成功
+                if self._find(digest) is None:
+                    raise
+        return digest
+
+    def put_text(self, text: str) -> str:
+        return self.put_bytes((text or "").encode("utf-8"))
+
+    def put_json(self, data: Any) -> str:
+        # 规范化序列化（排序 key、紧凑分隔符），保证相同内容得到相同哈希
+        text = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return self.put_text(text)
+
+    # ---- 读取 ----
+    def get_bytes(self, digest: str) -> Optional[bytes]:
+        path = self._find(digest) if digest else None
+        if path is None:
+            return None
+        return self._decompress(path)
+
+    def get_text(self, digest: str) -> Optional[str]:
+        data = self.get_bytes(digest)
+        return data.decode("utf-8") if data is not None else None
+
+    def get_json(self, digest: str) -> Any:
+        text = self.get_text(digest)
+        return json.loads(text) if text is not None else None
+
+    # ---- 维护 ----
+    def iter_blobs(self) -> Iterator[Path]:
+        for path in self.objects_dir.glob("*/*"):
+            if path.suffix in CODEC_EXT.values():
+                yield path
+
+    def delete(self, digest: str) -> bool:
+        path = self._find(digest)
+        if path is None:
+            return False
+        path.unlink()
+        return True
+
+    def disk_usage(self) -> Dict[str, int]:
+        count = 0
+        size = 0
+        for path in self.iter_blobs():
+            count += 1
+            size += path.stat().st_size
+        return {"blobs": count, "bytes": size}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+后台 artifact 写入服务
+在独立线程里序列化并写入 JSON：同一目标文件的多次更新只保留最新一份（合并），
+按 interval 防抖后原子写入（临时文件 + replace），关闭时 flush 全部待写内容，
+避免大批量运行时在事件循环里反复做 JSON 序列化和同步写盘
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+class ArtifactWriter:
+    """防抖合并的后台 JSON 写入器"""
+
+    def __init__(self, interval_s: float = 2.0):
+        self.interval_s = max(0.0, float(interval_s))
+        self._cond = threading.Condition()
+        # path -> (data, mirrors, first_submitted_at)
+        self._pending: Dict[Path, Tuple[Any, Tuple[Path, ...], float]] = {}
+        self._writing = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.coalesced = 0
+        # 每次写入完成后的回调 (path, 开始时间, 耗时秒)，用于把写盘计入运行时间线
+        self.on_write: Optional[Callable[[Path, float, float], None]] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, path: Path, data: Any, *, mirrors: Iterable[Path] = ()) -> None:
+        """
+        提交一次写入。data 需是调用方不再修改的快照（序列化在后台线程进行）。
+        mirrors 中的文件写入同一份序列化结果（例如 *_latest.json）。
+        需要确认写盘完成时调用 flush（协程里放到线程中等待）。
+        """
+        path = Path(path)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("artifact writer is closed")
+            prev = self._pending.get(path)
+            if prev is not None:
+                self.coalesced += 1
+            first = prev[2] if prev is not None else time.monotonic()
+            self._pending[path] = (data, tuple(Path(m) for m in mirrors), first)
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def _take_due(self, force: bool) -> Dict[Path, Tuple[Any, Tuple[Path, ...], float]]:
+        now = time.monotonic()
+        due = {
+            p: v for p, v in self._pending.items()
+            if force or now - v[2] >= self.interval_s
+        }
+        for p in due:
+            del self._pending[p]
+        return due
+
+    def _write(self, path: Path, data: Any, mirrors: Tuple[Path, ...]) -> None:
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+            for target in (path,) + mirrors:
+                write_text_atomic(target, text)
+            self.writes += 1
+        except Exception as e:
+            logger.error(f"写入 artifact 失败: {path}: {e}")
+        if self.on_write is not None:
+            try:
+                self.on_write(path, started, time.perf_counter() - t0)
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._pending:
+                        return
+                    due = self._take_due(force=self._closed)
+                    if due:
+                        self._writing += 1
+                        break
+                    if self._pending:
+                        oldest = min(v[2] for v in self._pending.values())
+                        self._cond.wait(max(0.0, self.interval_s - (time.monotonic() - oldest)))
+                    else:
+                        self._cond.wait()
+            try:
+                for path, (data, mirrors, _) in due.items():
+                    self._write(path, data, mirrors)
+            finally:
+                with self._cond:
+                    self._writing -= 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即写出全部待写内容并等待完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            for path, (data, mirrors, _) in list(self._pending.items()):
+                # 把待写项标记为“已到期”，由后台线程立即写出
+                self._pending[path] = (data, mirrors, float("-inf"))
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        """flush 后停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
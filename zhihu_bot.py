@@ -13,7 +13,7 @@ import subprocess
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Iterable, Union
 
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
 import yaml
@@ -37,26 +37,40 @@ except ImportError:
     QUESTION_TITLE_SELECTORS = ['h1.QuestionHeader-title']
     QUESTION_CONTENT_SELECTORS = ['.QuestionRichText']
 
+from zhihu_artifact_store import ArtifactStore, project_fields
+from zhihu_artifact_writer import ArtifactWriter
+from zhihu_capture import UiCapture
+from zhihu_draft_api import (
+    DEFAULT_DRAFT_ENDPOINT, DraftSaveWatcher, content_fingerprint, fetch_draft_via_api,
+    html_to_text, save_draft_via_api,
+)
+from zhihu_logging import setup_logging, setup_logging_from_config
+from zhihu_metrics import BotMetrics, MetricsServer, start_metrics_server
+from zhihu_notify import Notifier
+from zhihu_pacer import Pacer
+from zhihu_resolver import SelectorMatch, race_selectors
+from zhihu_retention import Retention, RetentionReport
+from zhihu_risk import RiskGuard
+from zhihu_session import (
+    INVALID, LOGIN_RESPONSE_MARKERS, VALID, SessionCheck, SessionFile, SessionHealth, cookie_fingerprint, forecast_session, probe_me,
+)
+from zhihu_spans import Tracer, to_chrome_trace, traced
+from zhihu_state import StateStore
+from zhihu_strategy_stats import StrategyStats
 
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 ARTIFACT_DIR = Path("artifacts")
 ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+# 旧版按 qid 的明文回答产物目录（仅用于导入到压缩存储）
 ANSWERS_BY_QID_DIR = ARTIFACT_DIR / "answers_by_qid"
-ANSWERS_BY_QID_DIR.mkdir(parents=True, exist_ok=True)
+ANSWER_STORE_DIR = ARTIFACT_DIR / "store"
 RUNS_DIR = ARTIFACT_DIR / "runs"
 RUNS_DIR.mkdir(parents=True, exist_ok=True)
 
-# 配置日志（FileHandler 不会自动创建目录，因此必须提前 mkdir）
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_DIR / "zhihu_bot.log", encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
-)
+# 配置日志：先按默认参数安装队列日志（后台线程写轮转文件），实例化时再按 config.yaml 的 logging 段调整
+setup_logging(LOG_DIR)
 logger = logging.getLogger(__name__)
 
 
@@ -80,11 +94,61 @@ class Invitation:
     invited_at: str = ""
 
 
+class QuestionRecord:
+    """增量模式下每个问题的精简运行记录：不持有问题详情和回答正文（正文在回答存储里）"""
+
+    __slots__ = (
+        "qid", "title", "url", "answer_ok", "answer_status", "answer_hash",
+        "answer_len", "answer_generated_at", "draft_saved", "draft_saved_at",
+    )
+
+    def __init__(self, qid: str, title: str, url: str, draft_saved: bool = False):
+        self.qid = qid
+        self.title = title
+        self.url = url
+        self.answer_ok = False
+        self.answer_status: Optional[int] = None
+        self.answer_hash: Optional[str] = None
+        self.answer_len = 0
+        self.answer_generated_at: Optional[str] = None
+        self.draft_saved = draft_saved
+        self.draft_saved_at: Optional[str] = None
+
+    def question(self) -> Question:
+        return Question(id=self.qid, title=self.title, url=self.url)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.qid,
+            "title": self.title,
+            "url": self.url,
+            "answer_ok": self.answer_ok,
+            "answer_status": self.answer_status,
+            "answer_hash": self.answer_hash,
+            "answer_len": self.answer_len,
+            "answer_generated_at": self.answer_generated_at,
+            "draft_saved": self.draft_saved,
+            "draft_saved_at": self.draft_saved_at,
+        }
+
+
+async def _aiter(items: Union[Iterable[Invitation], AsyncIterator[Invitation]]) -> AsyncIterator[Invitation]:
+    """同步/异步可迭代对象统一按异步迭代消费"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
 class ZhihuAutoAnswer:
     """知乎自动回答机器人"""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", metrics: Optional[BotMetrics] = None):
         self.config = self._load_config(config_path)
+        # 日志目录按实例化时的工作目录解析：导入时按默认参数装好的日志会切换到这里（参数相同时不重装）
+        setup_logging_from_config(self.config.get("logging"), LOG_DIR.resolve())
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
@@ -92,9 +156,98 @@ class ZhihuAutoAnswer:
         self.use_persistent_profile = False
         self.user_data_dir: Optional[Path] = None
         self.cookie_file = Path("zhihu_cookies.json")
-        self.processed_file = Path("processed_invitations.json")
-        self.processed_ids = self._load_processed_ids()
+        # 与 Cookie 一起保存的会话元数据：最近一次成功的登录校验（TTL 缓存）
+        self.session_file = SessionFile(
+            Path((self.config.get("session", {}) or {}).get("file") or "zhihu_session.json")
+        )
+        # 运行状态统一存储在 SQLite（WAL），首次启动时迁移旧的 JSON 状态文件
+        state_cfg = self.config.get("state", {}) or {}
+        self.state = StateStore(Path(state_cfg.get("path") or "zhihu_state.db"))
+        try:
+            if self.state.migrate_legacy(
+                processed_file=Path("processed_invitations.json"),
+                draft_hash_file=Path("draft_hashes.json"),
+                artifact_dir=ARTIFACT_DIR,
+            ):
+                logger.info(f"已将旧的 JSON 状态迁移到 {self.state.path}")
+        except Exception as e:
+            logger.error(f"迁移旧状态失败: {e}")
+        # 已写入草稿的问题（内存缓存，真实状态在 self.state）
+        self.processed_ids = self.state.drafted_ids()
+        # 选择器 / 输入策略命中统计：优先尝试历史最好的选项
+        stats_cfg = self.config.get("strategy_stats", {}) or {}
+        self.strategy_stats = StrategyStats(
+            ARTIFACT_DIR / "strategy_stats.json",
+            stale_after=int(stats_cfg.get("stale_after") or 5),
+        )
+        # artifact JSON 由后台线程防抖合并写入，不阻塞浏览器事件循环
+        artifacts_cfg = self.config.get("artifacts", {}) or {}
+        self.artifact_writer = ArtifactWriter(
+            interval_s=float(artifacts_cfg.get("write_debounce_seconds", 2.0))
+        )
+        # 回答正文 / deep_research 原始返回：压缩 + 内容寻址存储，索引在状态库
+        self.artifact_store = ArtifactStore(
+            ANSWER_STORE_DIR, codec=str(artifacts_cfg.get("compression") or "auto")
+        )
+        raw_fields = artifacts_cfg.get("raw_fields")
+        self.raw_fields: Optional[List[str]] = list(raw_fields) if raw_fields else None
+        self.raw_exclude_fields: List[str] = list(artifacts_cfg.get("raw_exclude_fields", ["text_report"]) or [])
+        # 最近一次草稿写入走的路径：api / ui / skipped（记入草稿指纹和阶段事件）
+        self.last_draft_method: Optional[str] = None
+        # 最近一次未命中的选择器类别（page_type），用于失败归因
+        self.last_selector_miss: Optional[str] = None
+        # 当前运行 id：各阶段完成时写入该运行的检查点（用于 --resume）
+        self.run_id: Optional[str] = None
+        # 各阶段/子步骤计时 span：阶段事件和耗时分位数随 run summary 写入（python main.py --stats 查询）
+        self.tracer = Tracer()
+        # Prometheus 指标：由阶段 span 驱动；常驻模式走 HTTP 端点，一次性运行结束时写 textfile。
+        # 调度模式由调用方传入跨轮共享的 metrics（端点也由调用方持有），计数不会每轮清零
+        self.metrics = metrics or BotMetrics()
+        self.tracer.listeners.append(self.metrics.observe_span)
+        self.metrics.browser_pages.set_function(lambda: len(self.context.pages) if self.context else 0)
+        self.metrics_server: Optional[MetricsServer] = None
+        # 采样抓取 UI 流程的 Playwright trace / HAR（只保留失败或偏慢的窗口）
+        self.capture = UiCapture.from_config(self.config.get("capture"))
+        # 访问知乎的统一节流：页面导航 / 接口请求各一个令牌桶
+        self.pacer = Pacer.from_config(self.config.get("pacing"))
+        # 通知：异步队列 + 摘要合并，多渠道（飞书 / Bark / 邮件）
+        self.notifier = Notifier.from_config(self.config.get("notification"))
+        # 风控检测：任何页面跳到安全验证页即停止访问知乎，并写入冷却文件供后续定时运行提前退出
+        self.risk = RiskGuard.from_config(self.config.get("risk"))
+        self.risk.listeners.append(self._on_risk_tripped)
+        # 后台写盘也记入时间线（Chrome trace 的 writer 时间线）
+        self.artifact_writer.on_write = lambda path, start, seconds: self.tracer.record(
+            "file_write", start=start, duration_ms=int(seconds * 1000), lane="writer", path=Path(path).name
+        )
         
+    async def _pace(self, kind: str) -> None:
+        """发往知乎的操作前取令牌；等待过的时间记入时间线和指标。已触发风控时直接抛出 RiskControlTripped"""
+        self.risk.raise_if_tripped()
+        waited = await self.pacer.acquire(kind)
+        self.risk.raise_if_tripped()
+        if waited > 0:
+            self.metrics.pacer_wait.inc(waited, kind=kind)
+            self.tracer.record(
+                "pacer.wait", start=time.time() - waited, duration_ms=int(waited * 1000),
+                qid=self.tracer.current_qid(), kind=kind,
+            )
+
+    def _on_risk_tripped(self, info: dict) -> None:
+        self.metrics.risk_trips.inc()
+        self.metrics.risk_cooldown_until.set(info["until"])
+        try:
+            self.notifier.notify(
+                f"🤖 知乎自动回答机器人\n\n⚠️ 触发知乎安全验证，已停止本次运行的浏览器操作\n"
+                f"冷却至 {datetime.fromtimestamp(info['until']).strftime('%Y-%m-%d %H:%M')}（第 {info['count']} 次）\n"
+                f"页面: {info.get('url')}"
+            )
+        except RuntimeError:
+            pass
+
+    async def _goto(self, url: str, **kwargs):
+        await self._pace("navigation")
+        return await self.page.goto(url, **kwargs)
+
     def _load_config(self, path: str) -> dict:
         """加载配置文件"""
         try:
@@ -104,26 +257,73 @@ class ZhihuAutoAnswer:
             logger.error(f"加载配置文件失败: {e}")
             return {}
     
-    def _load_processed_ids(self) -> set:
-        """加载已处理的邀请ID"""
-        if self.processed_file.exists():
-            try:
-                data = json.loads(self.processed_file.read_text(encoding="utf-8"))
-                return set(data.get('processed_ids', []))
-            except:
-                pass
-        return set()
-    
-    def _save_processed_ids(self):
-        """保存已处理的邀请ID"""
+    def _mark_processed(self, question_id: str) -> None:
+        """草稿已保存：单行事务更新状态，不再整文件重写"""
+        self.processed_ids.add(question_id)
         try:
-            self.processed_file.write_text(json.dumps({
-                'processed_ids': list(self.processed_ids),
-                'updated_at': datetime.now().isoformat()
-            }, indent=2, ensure_ascii=False))
+            self.state.mark_drafted(question_id)
         except Exception as e:
             logger.error(f"保存处理记录失败: {e}")
-    
+        self._checkpoint(question_id, "drafted")
+
+    def _mark_detailed(self, question: Question) -> None:
+        try:
+            self.state.mark_detailed(question.id, question.content)
+        except Exception as e:
+            logger.error(f"保存详情状态失败: {e}")
+        self._checkpoint(question.id, "detailed")
+
+    def _mark_generated(self, question_id: str, answer_len: int, artifact: str = "", generated_at: str = "") -> None:
+        try:
+            self.state.mark_generated(
+                question_id, answer_len=answer_len, answer_artifact=artifact, generated_at=generated_at
+            )
+        except Exception as e:
+            logger.error(f"保存生成状态失败: {e}")
+        self._checkpoint(question_id, "generated")
+
+    def _checkpoint(self, question_id: str, stage: str) -> None:
+        """阶段完成后立刻写入当前运行的检查点"""
+        if not self.run_id:
+            return
+        try:
+            self.state.checkpoint_stage(self.run_id, question_id, stage)
+        except Exception as e:
+            logger.error(f"写入检查点失败: {e}")
+
+    def _mark_failed(self, question_id: str, stage: str, error: str = "") -> None:
+        try:
+            self.state.mark_failed(question_id, stage, error)
+        except Exception as e:
+            logger.error(f"保存失败状态失败: {e}")
+
+    def _record_draft_hash(self, question_id: str, answer: str) -> None:
+        """草稿确认保存后立刻记录指纹（先于 drafted 状态落盘，崩溃后重跑也能跳过）"""
+        try:
+            self.state.record_draft_hash(question_id, content_fingerprint(answer), self.last_draft_method)
+        except Exception as e:
+            logger.error(f"保存草稿指纹失败: {e}")
+
+    async def _draft_unchanged(self, question: Question, answer: str) -> bool:
+        """判断草稿是否已是同样内容：先比对本地指纹，可选再读一次线上草稿确认"""
+        stored_hash = self.state.get_draft_hash(question.id)
+        if not stored_hash or stored_hash != content_fingerprint(answer):
+            return False
+
+        cfg = self._get_draft_config()
+        if not cfg.get("verify_existing_draft"):
+            return True
+        if not self.context:
+            return False
+        await self._pace("api")
+        content = await fetch_draft_via_api(
+            self.context.request,
+            question.id,
+            endpoint_template=(cfg.get("api_endpoint") or DEFAULT_DRAFT_ENDPOINT).strip(),
+        )
+        return content is not None and content_fingerprint(html_to_text(content)) == stored_hash
+
+    @traced("init_browser", kind="stage")
     async def init_browser(self, headless: bool = False, user_data_dir: Optional[str] = None):
         """初始化浏览器"""
         logger.info("正在初始化浏览器...")
@@ -180,6 +380,8 @@ class ZhihuAutoAnswer:
             Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
             window.chrome = { runtime: {} };
         """)
+        await self.capture.attach(self.context)
+        self.risk.attach(self.context)
         
         logger.info("浏览器初始化完成")
     
@@ -203,13 +405,12 @@ class ZhihuAutoAnswer:
         if not self.page:
             return False
 
-        # 1) DOM 指示器
-        for selector in LOGIN_INDICATORS:
-            try:
-                if await self.page.query_selector(selector):
-                    return True
-            except Exception:
-                continue
+        # 1) DOM 指示器（并发检查当前 DOM，不等待）
+        try:
+            if await self._resolve_selector(LOGIN_INDICATORS, page_type="login", timeout_ms=0, state="attached"):
+                return True
+        except Exception:
+            pass
 
         # 2) Cookie（扫码成功后通常会先写入 z_c0）
         try:
@@ -221,6 +422,7 @@ class ZhihuAutoAnswer:
 
         # 3) API 校验（200 即认为登录成功）
         try:
+            await self._pace("api")
             result = await self.page.evaluate(
                 """async () => {
                     try {
@@ -242,40 +444,143 @@ class ZhihuAutoAnswer:
 
         return False
 
-    async def _wait_for_login(self, timeout_ms: int = 180000) -> bool:
-        """等待登录完成，并定期输出进度，避免“看起来卡住”。"""
-        start = time.monotonic()
-        last_log = 0.0
+    async def _auth_fingerprint(self) -> Optional[str]:
+        """读取本地 Cookie 罐里 z_c0 的指纹（浏览器进程内调用，不产生网络请求）"""
+        try:
+            return cookie_fingerprint(await self.context.cookies("https://www.zhihu.com"))
+        except Exception:
+            return None
 
-        while (time.monotonic() - start) * 1000 < timeout_ms:
-            # 安全验证页提示
+    async def _wait_for_login(self, timeout_ms: int = 180000) -> bool:
+        """
+        事件驱动地等待扫码登录：主框架跳转、登录相关接口的响应都会唤醒一次，
+        唤醒后只读本地 Cookie 罐；出现新的 z_c0 时才用一次 /api/v4/me 确认。
+        等待期间除页面自身的轮询外不产生额外请求；每 5 秒兜底检查一次 Cookie 并输出进度。
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout_ms / 1000
+        wake = asyncio.Event()
+        # 每个 z_c0 只确认一次：旧的失效 Cookie 不会在每次唤醒时重复请求
+        tried: set = set()
+
+        def _on_navigated(frame) -> None:
+            # 验证页的提示由风控检测器给出（扫码登录期间它处于暂停状态，只提示不触发冷却）
+            if frame == self.page.main_frame:
+                wake.set()
+
+        def _on_response(response) -> None:
+            if any(key in response.url for key in LOGIN_RESPONSE_MARKERS):
+                wake.set()
+
+        self.page.on("framenavigated", _on_navigated)
+        self.context.on("response", _on_response)
+        try:
+            while True:
+                fingerprint = await self._auth_fingerprint()
+                if fingerprint and fingerprint not in tried:
+                    tried.add(fingerprint)
+                    await self._pace("api")
+                    with self.tracer.span("session.api"):
+                        check = await probe_me(self.context.request)
+                    if check.valid:
+                        self.session_file.record_valid(fingerprint, check)
+                        logger.info(f"登录确认耗时 {loop.time() - start:.1f}s")
+                        return True
+                    if check.status != INVALID and await self._is_logged_in():
+                        return True
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(wake.wait(), min(remaining, 5))
+                except asyncio.TimeoutError:
+                    logger.info(f"等待扫码确认中... 已等待 {int(loop.time() - start)}s")
+                wake.clear()
+        finally:
+            self.page.remove_listener("framenavigated", _on_navigated)
+            self.context.remove_listener("response", _on_response)
+
+    def _session_config(self) -> dict:
+        return self.config.get("session", {}) or {}
+
+    async def _fast_session_check(self) -> SessionCheck:
+        """快速路径：TTL 内且 z_c0 未变 -> 直接用缓存；否则请求一次 /api/v4/me"""
+        cfg = self._session_config()
+        fingerprint = await self._auth_fingerprint()
+        ttl_s = float(cfg.get("cache_ttl_minutes", 30)) * 60
+        cached = self.session_file.cached_valid(fingerprint, ttl_s)
+        if cached:
+            return SessionCheck(VALID, "cache", user=cached.get("user") or {})
+
+        await self._pace("api")
+        with self.tracer.span("session.api") as span:
+            check = await probe_me(self.context.request, timeout_ms=int(cfg.get("api_timeout_ms", 8000)))
+            span.set(status=check.status, http_status=check.http_status)
+        if check.valid:
+            self.session_file.record_valid(fingerprint, check)
+        elif check.status == INVALID:
+            self.session_file.invalidate()
+        return check
+
+    async def check_session_health(self, notify: bool = True) -> SessionHealth:
+        """
+        预测登录会话何时过期并记入会话文件：临近过期时提醒（默认每天最多一次），
+        剩余时间不够跑完一轮时返回 blocks_run=True，由调用方拒绝开始运行。
+        notify=False 时只做预测（--session-status），不写会话文件也不发提醒，不影响正式运行的提醒节奏
+        """
+        cfg = self._session_config()
+        cookies: List[dict] = []
+        if self.context:
             try:
-                url = self.page.url or ""
-                if "unhuman" in url or "/account" in url:
-                    if time.monotonic() - last_log > 5:
-                        logger.warning("检测到安全验证/风控页面，请在打开的浏览器窗口完成验证后等待程序继续...")
-                        last_log = time.monotonic()
+                cookies = await self.context.cookies("https://www.zhihu.com")
+            except Exception:
+                cookies = []
+        health = forecast_session(
+            context_cookies=cookies, cookie_file=self.cookie_file, session_file=self.session_file, config=cfg
+        )
+        if not notify:
+            return health
+        try:
+            meta = self.session_file.update(
+                expires_at=health.expires_at, expiry_cookie=health.cookie, forecast_at=health.now
+            )
+        except Exception as e:
+            logger.warning(f"写入会话文件失败: {e}")
+            meta = {}
+        if health.expires_at is not None:
+            self.metrics.session_expiry.set(health.expires_at)
+        if not (health.expiring_soon or health.blocks_run):
+            return health
+
+        logger.warning(health.format())
+        warned_at = meta.get("warned_at")
+        interval_s = float(cfg.get("warn_interval_hours", 24)) * 3600
+        if health.blocks_run or not isinstance(warned_at, (int, float)) or health.now - warned_at >= interval_s:
+            await self.send_notification("🤖 知乎自动回答机器人\n\n" + health.format())
+            try:
+                self.session_file.update(warned_at=health.now)
             except Exception:
                 pass
+        return health
 
-            if await self._is_logged_in():
-                return True
-
-            # 每 5 秒打一条进度，避免用户以为无响应
-            if time.monotonic() - last_log > 5:
-                elapsed = int(time.monotonic() - start)
-                logger.info(f"等待扫码确认中... 已等待 {elapsed}s")
-                last_log = time.monotonic()
-
-            await asyncio.sleep(1)
-
-        return False
-    
+    @traced("check_login", kind="stage")
     async def check_login(self) -> bool:
-        """检查是否已登录"""
+        """检查是否已登录：一次 /api/v4/me（或 TTL 缓存）即可判定，结果不确定时才打开首页做 DOM 判定"""
         logger.info("检查登录状态...")
         try:
-            await self.page.goto("https://www.zhihu.com", wait_until='networkidle')
+            check = await self._fast_session_check()
+            if check.valid:
+                via = "缓存" if check.source == "cache" else "接口校验"
+                logger.info(f"✅ 已登录: {check.user.get('name') or check.user.get('url_token') or ''}（{via}）")
+                return True
+            if check.status == INVALID:
+                logger.warning(f"❌ 未登录（/api/v4/me 返回 {check.http_status}）")
+                return False
+            logger.info(f"登录态接口校验结果不确定（{check.error}），回退到页面判定")
+
+            await self._goto("https://www.zhihu.com", wait_until='networkidle')
             await self.page.wait_for_timeout(3000)
 
             if await self._is_logged_in():
@@ -291,7 +596,7 @@ class ZhihuAutoAnswer:
     async def login_by_qrcode(self):
         """扫码登录"""
         logger.info("启动扫码登录...")
-        await self.page.goto("https://www.zhihu.com/signin")
+        await self._goto("https://www.zhihu.com/signin")
         
         try:
             # 点击扫码登录
@@ -310,7 +615,9 @@ class ZhihuAutoAnswer:
         except:
             logger.warning("等待二维码失败，请手动操作")
 
-        ok = await self._wait_for_login(timeout_ms=180000)
+        # 扫码时有人值守，验证页只提示，不触发冷却
+        with self.risk.paused():
+            ok = await self._wait_for_login(timeout_ms=180000)
         if not ok:
             logger.error("❌ 登录超时（未检测到登录态）。可能原因：未在手机端确认、页面结构变更、或触发风控验证。")
             raise TimeoutError("login timeout")
@@ -319,27 +626,74 @@ class ZhihuAutoAnswer:
         await self.save_cookies()
     
     async def _try_selectors(self, selectors: List[str], timeout: int = 5000) -> Optional[Any]:
-        """尝试多个选择器，返回第一个成功的"""
-        for selector in selectors:
+        """并发尝试多个选择器，返回第一个成功的元素（最坏耗时为一次 timeout）"""
+        match = await self._resolve_selector(selectors, timeout_ms=timeout)
+        return match.element if match else None
+
+    async def _resolve_selector(
+        self,
+        selectors: List[str],
+        *,
+        page_type: Optional[str] = None,
+        timeout_ms: int = 5000,
+        state: str = "visible",
+    ) -> Optional[SelectorMatch]:
+        """
+        并发解析候选选择器，返回命中的元素及命中的选择器。
+        指定 page_type 时按历史命中统计排序：先立即检查历史最好的选择器，未命中再并发等待全部候选。
+        """
+        stats = self.strategy_stats if page_type else None
+        candidates = list(selectors)
+        best = None
+        match = None
+        with self.tracer.span(f"selector.{page_type or 'adhoc'}") as span:
             try:
-                elem = await self.page.wait_for_selector(selector, timeout=timeout)
-                if elem:
-                    return elem
-            except:
-                continue
-        return None
+                if stats:
+                    candidates = stats.rank("selector", page_type, candidates)
+                    best = stats.best("selector", page_type, candidates)
+                    if best and timeout_ms > 0:
+                        match = await race_selectors(self.page, [best], timeout_ms=0, state=state)
+                if not match:
+                    match = await race_selectors(self.page, candidates, timeout_ms=timeout_ms, state=state)
+            except Exception as e:
+                logger.debug(f"选择器解析失败: {e}")
+                match = None
+            span.ok = match is not None
+            if match:
+                span.set(selector=match.selector)
+
+        if stats:
+            if match:
+                stats.record("selector", page_type, match.selector, True, match.elapsed_ms)
+                if best and best != match.selector:
+                    stats.record("selector", page_type, best, False)
+            else:
+                for option in candidates:
+                    if stats.has_hits("selector", page_type, option):
+                        stats.record("selector", page_type, option, False)
+        if not match and page_type:
+            self.last_selector_miss = page_type
+        return match
     
     async def get_invitations(self) -> List[Invitation]:
-        """获取邀请回答列表"""
+        """获取邀请回答列表（采样运行里失败或偏慢时保存 UI 抓取）"""
+        async with self.capture.window("get_invitations", run_id=self.tracer.current_run_id()) as capture:
+            invitations = await self._get_invitations()
+            # 一条邀请都没拿到多半是被风控或选择器失效，同样值得保留现场
+            capture.ok = bool(invitations)
+        return invitations
+
+    async def _get_invitations(self) -> List[Invitation]:
         logger.info("正在获取邀请列表...")
         invitations: List[Invitation] = []
         
         try:
             # 访问通知页面
-            await self.page.goto("https://www.zhihu.com/notifications", wait_until='networkidle')
-            await self.page.wait_for_timeout(5000)
+            with self.tracer.span("invitations.goto"):
+                await self._goto("https://www.zhihu.com/notifications", wait_until='networkidle')
+                await self.page.wait_for_timeout(5000)
 
-            if "account/unhuman" in (self.page.url or ""):
+            if self.risk.check_url(self.page.url, source="invitations"):
                 logger.error(
                     "通知页被重定向到安全验证页面（/account/unhuman）。"
                     "请先在浏览器中完成验证后再重试。"
@@ -351,12 +705,14 @@ class ZhihuAutoAnswer:
             Path('debug_notifications.html').write_text(html, encoding='utf-8')
             
             # 尝试多种选择器获取通知列表
-            items = []
-            for selector in NOTIFICATION_SELECTORS:
-                items = await self.page.query_selector_all(selector)
-                if items:
-                    logger.info(f"使用选择器 '{selector}' 找到 {len(items)} 个通知")
-                    break
+            with self.tracer.span("invitations.list") as span:
+                items = []
+                for selector in NOTIFICATION_SELECTORS:
+                    items = await self.page.query_selector_all(selector)
+                    if items:
+                        logger.info(f"使用选择器 '{selector}' 找到 {len(items)} 个通知")
+                        span.set(selector=selector, items=len(items))
+                        break
             
             if not items:
                 logger.warning("未找到任何通知，可能是页面结构变化")
@@ -422,7 +778,17 @@ class ZhihuAutoAnswer:
                     
         except Exception as e:
             logger.error(f"获取邀请列表失败: {e}")
+
+        if invitations:
+            try:
+                self.state.mark_discovered(
+                    {"qid": inv.question.id, "title": inv.question.title, "url": inv.question.url}
+                    for inv in invitations
+                )
+            except Exception as e:
+                logger.error(f"记录邀请状态失败: {e}")
         
+        self.metrics.invitations_discovered.inc(len(invitations))
         logger.info(f"共发现 {len(invitations)} 个新邀请")
         return invitations
 
@@ -432,9 +798,16 @@ class ZhihuAutoAnswer:
         tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
         tmp.replace(path)
 
-    def _export_invitations(self, invitations: List[Invitation], extra_by_qid: Optional[Dict[str, Any]] = None) -> Path:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        path = ARTIFACT_DIR / f"invitations_{ts}.json"
+    def _export_invitations(
+        self,
+        invitations: List[Invitation],
+        extra_by_qid: Optional[Dict[str, Any]] = None,
+        path: Optional[Path] = None,
+    ) -> Path:
+        """导出邀请快照（同一次运行传入同一个 path，后台写入器会合并多次更新）"""
+        if path is None:
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = ARTIFACT_DIR / f"invitations_{ts}.json"
         data = []
         for inv in invitations:
             q = inv.question
@@ -450,9 +823,8 @@ class ZhihuAutoAnswer:
                 item.update(extra_by_qid[q.id])
             data.append(item)
 
-        self._safe_write_json(path, data)
-        self._safe_write_json(ARTIFACT_DIR / "invitations_latest.json", data)
-        logger.info(f"邀请已导出: {path}")
+        self.artifact_writer.submit(path, data, mirrors=[ARTIFACT_DIR / "invitations_latest.json"])
+        logger.debug(f"邀请导出已提交: {path}")
         return path
 
     def _get_deep_research_config(self) -> Optional[dict]:
@@ -482,7 +854,11 @@ class ZhihuAutoAnswer:
         def _call():
             return requests.post(endpoint, json=payload, timeout=timeout_s)
 
-        resp = await asyncio.to_thread(_call)
+        self.metrics.generations_in_flight.inc()
+        try:
+            resp = await asyncio.to_thread(_call)
+        finally:
+            self.metrics.generations_in_flight.dec()
         text = resp.text
         try:
             data = resp.json()
@@ -497,22 +873,77 @@ class ZhihuAutoAnswer:
         }
 
     def _answer_artifact_path(self, question_id: str) -> Path:
+        """旧版明文回答产物路径（answers_by_qid/{qid}.json）"""
         safe = re.sub(r"[^0-9A-Za-z_-]+", "_", question_id or "")
         return ANSWERS_BY_QID_DIR / f"{safe}.json"
 
-    def _load_answer_artifact(self, question_id: str) -> Optional[dict]:
+    def _store_answer_artifact(self, question_id: str, data: dict) -> Optional[str]:
+        """
+        回答正文和（按配置裁剪后的）raw 写入压缩存储，并更新状态库里的回答索引。
+        返回回答正文的哈希。压缩和写盘较重，异步流程里应通过 asyncio.to_thread 调用。
+        """
+        answer_text = (data.get("answer_text") or "").strip()
+        answer_hash = self.artifact_store.put_text(answer_text) if answer_text else None
+        raw = project_fields(data.get("raw"), include=self.raw_fields, exclude=self.raw_exclude_fields)
+        raw_hash = self.artifact_store.put_json(raw) if raw is not None else None
+        self.state.upsert_answer(
+            question_id,
+            ok=bool(data.get("ok")) and bool(answer_text),
+            status=data.get("status"),
+            answer_len=len(answer_text),
+            answer_hash=answer_hash,
+            raw_hash=raw_hash,
+            generated_at=data.get("generated_at"),
+            text_prefix=None if answer_text else (data.get("text_prefix") or "")[:800],
+        )
+        return answer_hash
+
+    def _import_legacy_answer_artifact(self, question_id: str) -> Optional[dict]:
+        """把旧版 answers_by_qid/{qid}.json 导入压缩存储，校验可读回后删除明文文件"""
         path = self._answer_artifact_path(question_id)
         if not path.exists():
             return None
         try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            answer_hash = self._store_answer_artifact(question_id, data)
+            expected = (data.get("answer_text") or "").strip()
+            if answer_hash is None or self.artifact_store.get_text(answer_hash) == expected:
+                path.unlink()
+        except Exception as e:
+            logger.warning(f"导入旧回答产物失败: {path}: {e}")
             return None
+        return self.state.get_answer(question_id)
+
+    def _answer_index(self, question_ids: List[str]) -> Dict[str, dict]:
+        """批量读取回答索引（不打开 blob），旧版明文产物按需导入"""
+        index = self.state.answers_for(question_ids)
+        for qid in question_ids:
+            if qid not in index:
+                row = self._import_legacy_answer_artifact(qid)
+                if row:
+                    index[qid] = row
+        return index
+
+    def _load_answer_text(self, question_id: str) -> str:
+        row = self.state.get_answer(question_id) or self._import_legacy_answer_artifact(question_id)
+        if not row or not row.get("ok") or not row.get("answer_hash"):
+            return ""
+        return (self.artifact_store.get_text(row["answer_hash"]) or "").strip()
 
-    def _write_answer_artifact(self, question_id: str, data: dict) -> Path:
-        path = self._answer_artifact_path(question_id)
-        self._safe_write_json(path, data)
-        return path
+    def _load_answer_artifact(self, question_id: str) -> Optional[dict]:
+        """读取完整回答产物（索引 + 正文 + raw），用于调试/导出"""
+        row = self.state.get_answer(question_id) or self._import_legacy_answer_artifact(question_id)
+        if not row:
+            return None
+        return {
+            "question_id": question_id,
+            "generated_at": row.get("generated_at"),
+            "ok": bool(row.get("ok")),
+            "status": row.get("status"),
+            "answer_text": self.artifact_store.get_text(row["answer_hash"]) if row.get("answer_hash") else "",
+            "raw": self.artifact_store.get_json(row["raw_hash"]) if row.get("raw_hash") else None,
+            "text_prefix": row.get("text_prefix"),
+        }
 
     async def generate_answers_batch(self, invitations: List[Invitation]) -> Dict[str, str]:
         """
@@ -527,6 +958,16 @@ class ZhihuAutoAnswer:
             for inv in invitations:
                 ans = await self.generate_answer(inv.question)
                 answers[inv.question.id] = ans
+                if ans:
+                    # 同样写入回答存储，崩溃后 --resume 不必重新生成
+                    answer_hash = await asyncio.to_thread(
+                        self._store_answer_artifact,
+                        inv.question.id,
+                        {"ok": True, "answer_text": ans, "generated_at": datetime.now().isoformat()},
+                    )
+                    self._mark_generated(inv.question.id, len(ans), answer_hash or "")
+                else:
+                    self._mark_failed(inv.question.id, "generate")
             return answers
 
         endpoint = (cfg.get("endpoint") or "").strip()
@@ -547,49 +988,80 @@ class ZhihuAutoAnswer:
 
         async def _run_one(inv: Invitation):
             q = inv.question
-            async with semaphore:
-                r = await self._deep_research_one(endpoint, token, q.title, q.content or "", timeout_s)
+            with self.tracer.span("deep_research.queue", qid=q.id):
+                await semaphore.acquire()
+            try:
+                with self.tracer.span("deep_research", qid=q.id, kind="stage") as span:
+                    r = await self._deep_research_one(endpoint, token, q.title, q.content or "", timeout_s)
+                    span.ok = bool(r.get("ok"))
+            finally:
+                semaphore.release()
             body = r.get("body")
             # 默认取 text_report 作为回答正文
             answer_text = ""
             if isinstance(body, dict):
                 answer_text = (body.get("text_report") or "").strip()
-            return {
+            item = {
                 "question_id": q.id,
                 "title": q.title,
                 "url": q.url,
+                "generated_at": datetime.now().isoformat(),
                 "ok": r.get("ok"),
                 "status": r.get("status"),
                 "answer_text": answer_text,
                 "raw": body if isinstance(body, dict) else None,
                 "text_prefix": r.get("text_prefix"),
             }
+            # raw 返回即写入压缩存储，不在内存里攒到整批结束；导出文件里只保留哈希引用
+            await asyncio.to_thread(self._store_answer_artifact, q.id, item)
+            row = self.state.get_answer(q.id) or {}
+            item["answer_hash"] = row.get("answer_hash")
+            item["raw_hash"] = row.get("raw_hash")
+            item.pop("raw", None)
+            return item
 
         results = await asyncio.gather(*[_run_one(inv) for inv in invitations])
 
-        out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
-        (ARTIFACT_DIR / "answers_latest.json").write_text(
-            json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        # 只序列化一次，同时写入 answers_{ts}.json 和 answers_latest.json
+        self.artifact_writer.submit(out_path, results, mirrors=[ARTIFACT_DIR / "answers_latest.json"])
         logger.info(f"回答已导出: {out_path}")
 
         answers: Dict[str, str] = {}
         for item in results:
             qid = item.get("question_id") or ""
             answers[qid] = (item.get("answer_text") or "").strip()
+            if answers[qid]:
+                self._mark_generated(qid, len(answers[qid]), item.get("answer_hash") or "", item.get("generated_at") or "")
+            else:
+                self._mark_failed(qid, "deep_research", f"status={item.get('status')}")
         return answers
 
+    def _streaming_enabled(self) -> bool:
+        cfg = self._get_deep_research_config() or {}
+        return bool(cfg.get("streaming", False))
+
+    def _has_answer(self, question_id: str) -> bool:
+        row = self.state.get_answer(question_id)
+        return bool(row and row.get("ok") and row.get("answer_len"))
+
+    def _export_records(self, records: Dict[str, QuestionRecord], path: Path) -> None:
+        """增量模式的进度快照：只包含精简记录（详情/回答正文在状态库和回答存储里）"""
+        data = [rec.to_dict() for rec in records.values()]
+        self.artifact_writer.submit(path, data, mirrors=[ARTIFACT_DIR / "invitations_latest.json"])
+
     async def process_invitations_deep_research_incremental(
         self,
-        invitations: List[Invitation],
+        invitations: Union[Iterable[Invitation], AsyncIterator[Invitation]],
         *,
         flush_drafts_every: int = 5,
     ) -> dict:
         """
-        deep_research 增量模式：
-        - deep_research 成功一个就立刻落盘（answers_by_qid/{qid}.json）并更新 invitations_latest.json
-        - 草稿箱写入按批处理（默认每 5 个写入一次）
-        - 重跑时如果 answers_by_qid 里已有成功结果，会跳过 deep_research，直接进入草稿写入阶段
+        deep_research 增量模式（内存有界）：
+        - 邀请按迭代器逐个消费（可以是边取详情边产出的异步迭代器），同时在途的 deep_research 不超过 concurrency 个
+        - deep_research 成功一个就立刻落盘（压缩存储 artifacts/store + 状态库索引）并更新 invitations_latest.json，
+          内存里每个问题只保留精简记录（QuestionRecord）
+        - 草稿箱写入按批处理（默认每 5 个写入一次），写入时再从回答存储读取正文
+        - 重跑时如果索引里已有成功结果，会跳过 deep_research，直接进入草稿写入阶段
         """
         cfg = self._get_deep_research_config()
         if not cfg:
@@ -602,87 +1074,65 @@ class ZhihuAutoAnswer:
         token = self._deep_research_token(cfg)
         timeout_s = int(cfg.get("timeout_seconds") or 650)
         concurrency = max(1, int(cfg.get("concurrency") or 2))
-        semaphore = asyncio.Semaphore(concurrency)
 
-        state_by_qid: Dict[str, Any] = {}
-        answers_map: Dict[str, str] = {}
+        records: Dict[str, QuestionRecord] = {}
         pending_drafts: List[str] = []
+        in_flight: set = set()
         failures: List[dict] = []
         initial_processed = set(self.processed_ids)
+        counts = {"resumed": 0, "generated": 0}
 
-        # 预加载已有回答产物（用于 resume）
-        for inv in invitations:
-            q = inv.question
-            artifact = self._load_answer_artifact(q.id)
-            if isinstance(artifact, dict) and artifact.get("ok") and (artifact.get("answer_text") or "").strip():
-                answers_map[q.id] = (artifact.get("answer_text") or "").strip()
-                state_by_qid[q.id] = {
-                    "answer_ok": True,
-                    "answer_status": artifact.get("status"),
-                    "answer_artifact": str(self._answer_artifact_path(q.id).as_posix()),
-                    "answer_len": len(answers_map[q.id]),
-                    "answer_generated_at": artifact.get("generated_at"),
-                    "draft_saved": q.id in self.processed_ids,
-                }
-                if q.id not in self.processed_ids:
-                    pending_drafts.append(q.id)
-            else:
-                state_by_qid[q.id] = {
-                    "answer_ok": False,
-                    "draft_saved": q.id in self.processed_ids,
-                }
-
-        # 初始导出（包含当前状态）
-        self._export_invitations(invitations, extra_by_qid=state_by_qid)
+        # 同一次运行固定导出到一个文件，后续更新由后台写入器防抖合并
+        export_path = ARTIFACT_DIR / f"invitations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
         async def _save_batch(qids: List[str]) -> None:
             for qid in qids:
-                inv = next((x for x in invitations if x.question.id == qid), None)
-                if not inv:
-                    continue
+                # 触发风控后不再写草稿，已生成的回答留给下次运行
+                if self.risk.tripped:
+                    break
+                rec = records[qid]
                 if qid in self.processed_ids:
-                    state_by_qid[qid]["draft_saved"] = True
+                    rec.draft_saved = True
                     continue
-                answer = (answers_map.get(qid) or "").strip()
+                answer = self._load_answer_text(qid)
                 if not answer:
                     continue
                 try:
-                    ok = await self.save_answer_to_draft(inv.question, answer)
+                    ok = await self.save_answer_to_draft(rec.question(), answer)
                 except Exception as e:
                     ok = False
                     failures.append(
                         {
                             "question_id": qid,
-                            "title": inv.question.title,
+                            "title": rec.title,
                             "stage": "save_draft",
                             "error": str(e),
                         }
                     )
-                state_by_qid[qid]["draft_saved"] = bool(ok)
-                state_by_qid[qid]["draft_saved_at"] = datetime.now().isoformat()
+                rec.draft_saved = bool(ok)
+                rec.draft_saved_at = datetime.now().isoformat()
                 if ok:
-                    self.processed_ids.add(qid)
-                    self._save_processed_ids()
-                # 每次写入草稿后也更新 invitations_latest，方便 resume/观察进度
-                self._export_invitations(invitations, extra_by_qid=state_by_qid)
-
-        # 先把“已有回答但未写草稿”的补写（按 flush_drafts_every 批量）
-        while len(pending_drafts) >= flush_drafts_every:
-            batch = pending_drafts[:flush_drafts_every]
-            pending_drafts = pending_drafts[flush_drafts_every:]
-            await _save_batch(batch)
-
-        # 生成缺失的回答（增量落盘）
-        to_generate = [inv for inv in invitations if inv.question.id not in self.processed_ids and inv.question.id not in answers_map]
-        logger.info(
-            f"deep_research 增量生成开始: total={len(invitations)} to_generate={len(to_generate)} "
-            f"already_answered={len(answers_map)} concurrency={concurrency}"
-        )
+                    self._mark_processed(qid)
+                else:
+                    self._mark_failed(qid, "save_draft")
 
-        async def _run_one(inv: Invitation) -> dict:
-            q = inv.question
-            async with semaphore:
+        async def _flush_drafts(force: bool = False) -> None:
+            # 每累计 flush_drafts_every 个成功回答，就批量写一次草稿箱
+            nonlocal pending_drafts
+            while len(pending_drafts) >= flush_drafts_every or (force and pending_drafts):
+                batch = pending_drafts[:flush_drafts_every]
+                pending_drafts = pending_drafts[flush_drafts_every:]
+                # 写草稿期间主循环不再调度新的生成，时间线上可以看到阻塞了多久
+                with self.tracer.span("draft_flush", batch=len(batch)):
+                    await _save_batch(batch)
+                # 进度快照只在每批草稿写完后提交一次（每条回答的进度已在状态库里），
+                # 避免每个回答/草稿都重建整份记录列表
+                self._export_records(records, export_path)
+
+        async def _run_one(q: Question) -> None:
+            with self.tracer.span("deep_research", qid=q.id, kind="stage") as span:
                 r = await self._deep_research_one(endpoint, token, q.title, q.content or "", timeout_s)
+                span.ok = bool(r.get("ok"))
 
             body = r.get("body")
             answer_text = ""
@@ -691,8 +1141,6 @@ class ZhihuAutoAnswer:
 
             artifact = {
                 "question_id": q.id,
-                "title": q.title,
-                "url": q.url,
                 "generated_at": datetime.now().isoformat(),
                 "ok": bool(r.get("ok")) and bool(answer_text),
                 "status": r.get("status"),
@@ -700,13 +1148,23 @@ class ZhihuAutoAnswer:
                 "raw": body if isinstance(body, dict) else None,
                 "text_prefix": r.get("text_prefix"),
             }
-            self._write_answer_artifact(q.id, artifact)
-
-            # 更新内存状态 + 立刻导出 invitations_latest（用户要求“成功一个就落盘并更新问题json”）
+            with self.tracer.span("store_answer", qid=q.id):
+                answer_hash = await asyncio.to_thread(self._store_answer_artifact, q.id, artifact)
+            # 详情已在状态库里，生成结束后不再持有
+            q.content = ""
+
+            rec = records[q.id]
+            rec.answer_ok = artifact["ok"]
+            rec.answer_status = artifact.get("status")
+            rec.answer_hash = answer_hash
+            rec.answer_len = len(answer_text)
+            rec.answer_generated_at = artifact["generated_at"]
             if artifact["ok"]:
-                answers_map[q.id] = answer_text
+                counts["generated"] += 1
                 pending_drafts.append(q.id)
+                self._mark_generated(q.id, len(answer_text), answer_hash or "", artifact["generated_at"])
             else:
+                self._mark_failed(q.id, "deep_research", f"status={artifact.get('status')}")
                 failures.append(
                     {
                         "question_id": q.id,
@@ -717,39 +1175,63 @@ class ZhihuAutoAnswer:
                     }
                 )
 
-            state_by_qid[q.id] = {
-                "answer_ok": artifact["ok"],
-                "answer_status": artifact.get("status"),
-                "answer_artifact": str(self._answer_artifact_path(q.id).as_posix()),
-                "answer_len": len(answer_text),
-                "answer_generated_at": artifact.get("generated_at"),
-                "draft_saved": q.id in self.processed_ids,
-            }
-            self._export_invitations(invitations, extra_by_qid=state_by_qid)
-            return artifact
-
-        tasks = [asyncio.create_task(_run_one(inv)) for inv in to_generate]
-        for fut in asyncio.as_completed(tasks):
-            _ = await fut
+        async def _wait_one() -> None:
+            with self.tracer.span("wait_generation", in_flight=len(in_flight)):
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.discard(task)
+                task.result()
+            await _flush_drafts()
 
-            # 每生成 flush_drafts_every 个成功回答，就批量写一次草稿箱
-            while len(pending_drafts) >= flush_drafts_every:
-                batch = pending_drafts[:flush_drafts_every]
-                pending_drafts = pending_drafts[flush_drafts_every:]
-                await _save_batch(batch)
+        logger.info(f"deep_research 增量生成开始: concurrency={concurrency} flush_drafts_every={flush_drafts_every}")
+        try:
+            async for inv in _aiter(invitations):
+                q = inv.question
+                rec = QuestionRecord(q.id, q.title, q.url, draft_saved=q.id in self.processed_ids)
+                records[q.id] = rec
+                if rec.draft_saved:
+                    continue
+                # 已有成功回答（resume）：只读索引，不打开回答正文
+                row = self.state.get_answer(q.id) or self._import_legacy_answer_artifact(q.id)
+                if row and row.get("ok") and row.get("answer_len"):
+                    rec.answer_ok = True
+                    rec.answer_status = row.get("status")
+                    rec.answer_hash = row.get("answer_hash")
+                    rec.answer_len = row.get("answer_len") or 0
+                    rec.answer_generated_at = row.get("generated_at")
+                    counts["resumed"] += 1
+                    pending_drafts.append(q.id)
+                    await _flush_drafts()
+                    continue
+                while len(in_flight) >= concurrency:
+                    await _wait_one()
+                in_flight.add(asyncio.create_task(_run_one(q)))
+
+            while in_flight:
+                await _wait_one()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
 
         # flush 剩余
-        if pending_drafts:
-            await _save_batch(pending_drafts)
-
+        await _flush_drafts(force=True)
+        self._export_records(records, export_path)
+        # 等待写盘放在线程里，事件循环不被整份快照的序列化阻塞
+        await asyncio.to_thread(self.artifact_writer.flush)
+        logger.info(
+            f"deep_research 增量生成结束: total={len(records)} generated={counts['generated']} "
+            f"already_answered={counts['resumed']}"
+        )
         new_processed = sorted(self.processed_ids - initial_processed)
         return {
             "mode": "deep_research_incremental",
-            "total": len(invitations),
+            "total": len(records),
             "draft_saved_ok": len(new_processed),
             "draft_saved_ok_ids": new_processed,
             "failures": failures,
-            "answers_by_qid_dir": str(ANSWERS_BY_QID_DIR.as_posix()),
+            "answer_store_dir": str(ANSWER_STORE_DIR.as_posix()),
             "invitations_latest": str((ARTIFACT_DIR / "invitations_latest.json").as_posix()),
         }
     
@@ -758,8 +1240,9 @@ class ZhihuAutoAnswer:
         logger.info(f"获取问题详情: {question.title[:50]}...")
         
         try:
-            await self.page.goto(question.url, wait_until='networkidle')
-            await self.page.wait_for_timeout(3000)
+            with self.tracer.span("detail.goto"):
+                await self._goto(question.url, wait_until='networkidle')
+                await self.page.wait_for_timeout(3000)
             
             # 尝试多种选择器获取问题描述
             for selector in QUESTION_CONTENT_SELECTORS:
@@ -768,9 +1251,11 @@ class ZhihuAutoAnswer:
                     content = await elem.text_content()
                     question.content = (content or "").strip()[:2000]
                     logger.info(f"✅ 获取到详情，长度: {len(question.content)}")
+                    self._mark_detailed(question)
                     return question.content
             
             logger.warning("未找到问题详情")
+            self._mark_detailed(question)
             return ""
             
         except Exception as e:
@@ -808,39 +1293,121 @@ class ZhihuAutoAnswer:
             logger.error(f"生成回答失败: {e}")
             return ""
     
+    def _get_draft_config(self) -> dict:
+        return self.config.get("draft", {}) or {}
+
+    async def _save_answer_to_draft_api(self, question: Question, answer: str) -> bool:
+        """通过草稿接口直接写入（共享浏览器 context 的登录态）"""
+        cfg = self._get_draft_config()
+        headers = {}
+        try:
+            cookies = await self.context.cookies("https://www.zhihu.com")
+            xsrf = next((c.get("value") for c in cookies if c.get("name") == "_xsrf"), "")
+            if xsrf:
+                headers["x-xsrftoken"] = xsrf
+        except Exception:
+            pass
+
+        await self._pace("api")
+        result = await save_draft_via_api(
+            self.context.request,
+            question.id,
+            answer,
+            endpoint_template=(cfg.get("api_endpoint") or DEFAULT_DRAFT_ENDPOINT).strip(),
+            method=(cfg.get("api_method") or "POST"),
+            headers=headers,
+            timeout_ms=int(cfg.get("api_timeout_ms") or 15000),
+        )
+        if result.ok:
+            logger.info(f"✅ 草稿接口写入成功: status={result.status} elapsed_ms={result.elapsed_ms}")
+        else:
+            logger.warning(f"草稿接口写入失败: status={result.status} error={result.error}")
+        return result.ok
+
     async def save_answer_to_draft(self, question: Question, answer: str) -> bool:
-        """保存回答到草稿箱"""
+        """保存回答到草稿箱：默认优先走草稿接口，失败时降级到编辑器 UI 流程"""
+        self.last_selector_miss = None
+        with self.tracer.span("save_draft", qid=question.id, kind="stage") as span:
+            async with self.capture.window("save_draft", qid=question.id, run_id=self.tracer.current_run_id()) as capture:
+                ok = await self._save_answer_to_draft(question, answer)
+                capture.ok = ok
+            span.ok = ok
+            span.set(method=self.last_draft_method)
+            if not ok:
+                span.set(selector=self.last_selector_miss)
+        return ok
+
+    async def _save_answer_to_draft(self, question: Question, answer: str) -> bool:
+        try:
+            with self.tracer.span("draft.hash_check"):
+                unchanged = await self._draft_unchanged(question, answer)
+            if unchanged:
+                self.last_draft_method = "skipped"
+                logger.info(f"草稿内容未变化，跳过写入: {question.title[:50]}...")
+                return True
+        except Exception as e:
+            logger.warning(f"草稿指纹比对失败，继续写入: {e}")
+
+        method = (self._get_draft_config().get("method") or "api").strip().lower()
+        ok = False
+        if method == "api":
+            logger.info(f"正在通过草稿接口保存: {question.title[:50]}...")
+            try:
+                with self.tracer.span("draft.api") as span:
+                    ok = await self._save_answer_to_draft_api(question, answer)
+                    span.ok = ok
+                self.last_draft_method = "api"
+            except Exception as e:
+                logger.warning(f"草稿接口异常: {e}")
+            if not ok:
+                logger.info("草稿接口不可用，降级到编辑器 UI 流程")
+
+        if not ok:
+            self.last_draft_method = "ui"
+            with self.tracer.span("draft.ui") as span:
+                ok = await self._save_answer_to_draft_ui(question, answer)
+                span.ok = ok
+            self._save_strategy_stats()
+
+        if ok:
+            self._record_draft_hash(question.id, answer)
+        return ok
+
+    async def _save_answer_to_draft_ui(self, question: Question, answer: str) -> bool:
+        """通过编辑器 UI 保存回答到草稿箱"""
         logger.info(f"正在保存到草稿箱: {question.title[:50]}...")
         
         try:
             # 访问问题页面
-            await self.page.goto(question.url, wait_until='networkidle')
-            await self.page.wait_for_timeout(3000)
+            with self.tracer.span("ui.goto_question"):
+                await self._goto(question.url, wait_until='networkidle')
             
-            # 点击"写回答"按钮
+            # 点击"写回答"按钮（并发等待所有候选，按钮渲染出来即返回）
             write_btn = None
-            for selector in WRITE_ANSWER_BUTTONS:
-                write_btn = await self.page.query_selector(selector)
-                if write_btn:
-                    logger.info(f"找到写回答按钮: {selector}")
-                    break
+            match = await self._resolve_selector(WRITE_ANSWER_BUTTONS, page_type="question", timeout_ms=5000)
+            if match:
+                write_btn = match.element
+                logger.info(f"找到写回答按钮: {match.selector} ({match.elapsed_ms}ms)")
             
-            write_url = f"https://www.zhihu.com/question/{question.id}/write"
-            opened_write_page = False
-            if write_btn:
-                try:
-                    await write_btn.scroll_into_view_if_needed()
-                    await self.page.wait_for_timeout(200)
-                    await write_btn.click(timeout=5000)
-                    await self.page.wait_for_timeout(1500)
-                    opened_write_page = "/write" in (self.page.url or "")
-                except Exception as e:
-                    logger.warning(f"点击写回答按钮失败，改用直达写回答页: {e}")
-
-            # 按钮点击可能被顶部 header 遮挡，统一降级到直达 /write 页面
-            if not opened_write_page:
-                await self.page.goto(write_url, wait_until='networkidle')
-                await self.page.wait_for_timeout(3000)
+            with self.tracer.span("ui.open_editor"):
+                write_url = f"https://www.zhihu.com/question/{question.id}/write"
+                opened_write_page = False
+                if write_btn:
+                    try:
+                        await write_btn.scroll_into_view_if_needed()
+                        await self.page.wait_for_timeout(200)
+                        # 点击会跳转到 /write，按一次页面导航计
+                        await self._pace("navigation")
+                        await write_btn.click(timeout=5000)
+                        await self.page.wait_for_timeout(1500)
+                        opened_write_page = "/write" in (self.page.url or "")
+                    except Exception as e:
+                        logger.warning(f"点击写回答按钮失败，改用直达写回答页: {e}")
+
+                # 按钮点击可能被顶部 header 遮挡，统一降级到直达 /write 页面
+                if not opened_write_page:
+                    await self._goto(write_url, wait_until='networkidle')
+                    await self.page.wait_for_timeout(3000)
             
             # 查找编辑器（使用 visible wait，避免拿到不可编辑容器）
             editor = None
@@ -850,243 +1417,384 @@ class ZhihuAutoAnswer:
                 ".RichText.ztext",
                 "[class*='RichText'] [contenteditable='true']",
             ]
-            for selector in selector_candidates:
-                try:
-                    editor = await self.page.wait_for_selector(
-                        selector, timeout=3000, state="visible"
-                    )
-                except Exception:
-                    editor = None
-                if editor:
-                    used_selector = selector
-                    logger.info(f"找到编辑器: {selector}")
-                    break
+            match = await self._resolve_selector(selector_candidates, page_type="editor", timeout_ms=5000)
+            if match:
+                editor = match.element
+                used_selector = match.selector
+                logger.info(f"找到编辑器: {match.selector} ({match.elapsed_ms}ms)")
             
             if not editor:
                 await self.page.screenshot(path="debug_editor_not_found.png", full_page=True)
                 logger.error("未找到编辑器")
                 return False
             
-            # 输入回答：fill -> keyboard -> JS 注入，多策略保证兼容 contenteditable 编辑器
-            await editor.click()
-            await self.page.wait_for_timeout(300)
-
-            input_ok = False
-            # 1) 优先尝试 fill（适用于 textarea/input 或部分可编辑元素）
+            # 输入前开始监听编辑器的草稿/自动保存请求，作为保存成功的判定依据
+            draft_cfg = self._get_draft_config()
+            watcher = DraftSaveWatcher(
+                self.page, url_patterns=draft_cfg.get("autosave_url_patterns")
+            ).start()
             try:
-                await editor.fill(answer)
-                input_ok = True
-                logger.info("编辑器填充成功: fill")
-            except Exception:
-                logger.info("fill 不适用，切换到键盘输入")
+                return await self._input_answer_and_confirm(editor, used_selector, answer, watcher)
+            finally:
+                watcher.stop()
 
-            # 2) 键盘输入（更通用）
-            if not input_ok:
-                try:
-                    await self.page.keyboard.press("Control+a")
-                    await self.page.wait_for_timeout(150)
-                    await self.page.keyboard.press("Backspace")
-                    await self.page.wait_for_timeout(150)
-                    await self.page.keyboard.insert_text(answer)
-                    input_ok = True
-                    logger.info("编辑器填充成功: keyboard.insert_text")
-                except Exception as e:
-                    logger.warning(f"键盘输入失败: {e}")
+        except Exception as e:
+            logger.error(f"保存回答失败: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return False
 
-            # 3) JS 注入（兜底）
-            if not input_ok:
+    async def _input_by_fill(self, editor, answer: str) -> None:
+        """fill：适用于 textarea/input 或部分可编辑元素"""
+        await editor.fill(answer)
+
+    async def _input_by_keyboard(self, editor, answer: str) -> None:
+        """键盘输入：清空后 insert_text（更通用）"""
+        await self.page.keyboard.press("Control+a")
+        await self.page.wait_for_timeout(150)
+        await self.page.keyboard.press("Backspace")
+        await self.page.wait_for_timeout(150)
+        await self.page.keyboard.insert_text(answer)
+
+    async def _input_by_js(self, editor, answer: str) -> None:
+        """JS 注入（兜底）"""
+        await editor.evaluate(
+            """(el, text) => {
+                const target =
+                    el.matches('textarea, input, [contenteditable=\"true\"]')
+                        ? el
+                        : el.querySelector('textarea, input, [contenteditable=\"true\"]');
+                if (!target) throw new Error('no editable target');
+
+                if ('value' in target) {
+                    target.focus();
+                    target.value = text;
+                    target.dispatchEvent(new Event('input', { bubbles: true }));
+                    target.dispatchEvent(new Event('change', { bubbles: true }));
+                } else {
+                    target.focus();
+                    const sel = window.getSelection();
+                    const range = document.createRange();
+                    range.selectNodeContents(target);
+                    sel.removeAllRanges();
+                    sel.addRange(range);
+                    document.execCommand('delete');
+                    document.execCommand('insertText', false, text);
+                    target.dispatchEvent(new InputEvent('input', { bubbles: true, data: text, inputType: 'insertText' }));
+                }
+            }""",
+            answer,
+        )
+
+    async def _input_answer_and_confirm(self, editor, used_selector: Optional[str], answer: str, watcher: DraftSaveWatcher) -> bool:
+        """向编辑器输入回答，并等待编辑器的草稿保存请求确认"""
+        draft_cfg = self._get_draft_config()
+        # 输入回答：fill / keyboard / JS 注入多策略兼容 contenteditable 编辑器，
+        # 按历史命中统计排序，常见路径第一次就能成功
+        await editor.click()
+        await self.page.wait_for_timeout(300)
+
+        strategies = {
+            "fill": self._input_by_fill,
+            "keyboard": self._input_by_keyboard,
+            "js": self._input_by_js,
+        }
+        with self.tracer.span("ui.input") as span:
+            input_ok = False
+            used_strategy = None
+            input_ms = 0
+            for name in self.strategy_stats.rank("input", "editor", list(strategies)):
+                t0 = time.monotonic()
                 try:
-                    await editor.evaluate(
-                        """(el, text) => {
-                            const target =
-                                el.matches('textarea, input, [contenteditable=\"true\"]')
-                                    ? el
-                                    : el.querySelector('textarea, input, [contenteditable=\"true\"]');
-                            if (!target) throw new Error('no editable target');
-
-                            if ('value' in target) {
-                                target.focus();
-                                target.value = text;
-                                target.dispatchEvent(new Event('input', { bubbles: true }));
-                                target.dispatchEvent(new Event('change', { bubbles: true }));
-                            } else {
-                                target.focus();
-                                const sel = window.getSelection();
-                                const range = document.createRange();
-                                range.selectNodeContents(target);
-                                sel.removeAllRanges();
-                                sel.addRange(range);
-                                document.execCommand('delete');
-                                document.execCommand('insertText', false, text);
-                                target.dispatchEvent(new InputEvent('input', { bubbles: true, data: text, inputType: 'insertText' }));
-                            }
-                        }""",
-                        answer,
-                    )
-                    input_ok = True
-                    logger.info("编辑器填充成功: js fallback")
+                    await strategies[name](editor, answer)
                 except Exception as e:
-                    logger.error(f"JS 注入失败: {e}")
+                    self.strategy_stats.record("input", "editor", name, False)
+                    logger.info(f"输入策略 {name} 不适用: {e}")
+                    continue
+                input_ok = True
+                used_strategy = name
+                input_ms = int((time.monotonic() - t0) * 1000)
+                logger.info(f"编辑器填充成功: {name}")
+                span.set(strategy=name)
+                break
+            span.ok = input_ok
+
+        if not input_ok:
+            await self.page.screenshot(path="debug_editor_input_failed.png", full_page=True)
+            logger.error(f"编辑器输入失败，selector={used_selector}")
+            return False
 
-            if not input_ok:
-                await self.page.screenshot(path="debug_editor_input_failed.png", full_page=True)
-                logger.error(f"编辑器输入失败，selector={used_selector}")
-                return False
+        # 校验是否真的写入了文本
+        text_len = 0
+        try:
+            text_len = await editor.evaluate(
+                """(el) => {
+                    const target =
+                        el.matches('textarea, input, [contenteditable=\"true\"]')
+                            ? el
+                            : el.querySelector('textarea, input, [contenteditable=\"true\"]');
+                    if (!target) return 0;
+                    const val = ('value' in target) ? target.value : (target.innerText || target.textContent || '');
+                    return (val || '').trim().length;
+                }"""
+            )
+        except Exception:
+            pass
+        logger.info(f"编辑器文本长度: {text_len}")
+        self.strategy_stats.record("input", "editor", used_strategy, text_len > 0, input_ms)
+        if text_len == 0:
+            await self.page.screenshot(path="debug_editor_text_empty.png", full_page=True)
+            logger.error("编辑器内容为空，判定写入失败")
+            return False
 
-            # 校验是否真的写入了文本
-            text_len = 0
-            try:
-                text_len = await editor.evaluate(
-                    """(el) => {
-                        const target =
-                            el.matches('textarea, input, [contenteditable=\"true\"]')
-                                ? el
-                                : el.querySelector('textarea, input, [contenteditable=\"true\"]');
-                        if (!target) return 0;
-                        const val = ('value' in target) ? target.value : (target.innerText || target.textContent || '');
-                        return (val || '').trim().length;
-                    }"""
+        # 等待编辑器自动保存；短时间内没有确认则点击“保存草稿”按钮再等
+        with self.tracer.span("ui.autosave_wait") as span:
+            timeout_ms = int(draft_cfg.get("autosave_timeout_ms") or 15000)
+            grace_ms = min(timeout_ms, int(draft_cfg.get("autosave_grace_ms") or 3000))
+            confirmed = await watcher.wait(grace_ms)
+            if not confirmed:
+                match = await self._resolve_selector(
+                    SAVE_DRAFT_BUTTONS, page_type="draft_button", timeout_ms=0, state="attached"
                 )
-            except Exception:
-                pass
-            logger.info(f"编辑器文本长度: {text_len}")
-            if text_len == 0:
-                await self.page.screenshot(path="debug_editor_text_empty.png", full_page=True)
-                logger.error("编辑器内容为空，判定写入失败")
-                return False
+                if match:
+                    await match.element.click()
+                    logger.info(f"点击保存草稿按钮: {match.selector}")
+                else:
+                    logger.info("等待自动保存...")
+                confirmed = await watcher.wait(timeout_ms - grace_ms)
+            span.ok = confirmed
 
-            await self.page.wait_for_timeout(2000)
-            
-            # 保存草稿
-            for selector in SAVE_DRAFT_BUTTONS:
-                draft_btn = await self.page.query_selector(selector)
-                if draft_btn:
-                    await draft_btn.click()
-                    logger.info("点击保存草稿按钮")
-                    await self.page.wait_for_timeout(3000)
-                    break
-            else:
-                # 知乎自动保存，等待一下
-                await self.page.wait_for_timeout(5000)
-                logger.info("等待自动保存...")
-            
-            logger.info("✅ 回答已保存到草稿箱")
-            return True
-            
-        except Exception as e:
-            logger.error(f"保存回答失败: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+        if not confirmed:
+            await self.page.screenshot(path="debug_draft_not_confirmed.png", full_page=True)
+            logger.error(f"未确认草稿已保存: {watcher.error} url={watcher.url} status={watcher.status}")
             return False
-    
-    def _get_feishu_webhook(self) -> str:
-        webhook = (self.config.get("notification", {}) or {}).get("feishu_webhook", "") or ""
-        webhook = webhook.strip()
-        if webhook:
-            return webhook
-        return (os.environ.get("FEISHU_WEBHOOK_URL", "") or "").strip()
 
+        logger.info(f"✅ 回答已保存到草稿箱（status={watcher.status}）")
+        return True
+    
     async def send_notification(self, message: str):
-        """发送通知（飞书）"""
-        webhook = self._get_feishu_webhook()
-        if not webhook:
-            logger.info("未配置飞书 webhook（config.yaml notification.feishu_webhook 或 env FEISHU_WEBHOOK_URL）")
+        """发送通知：放入通知队列后立即返回，由后台 worker 合并并发往各渠道"""
+        self.notifier.notify(message)
+
+    async def _write_run_summary(self, summary: dict) -> None:
+        """写入运行 summary：runs/run_{id}.json、run_latest.json，并记录到状态库"""
+        run_id = summary.get("run_id")
+        summary.setdefault("stage_events", self.tracer.stage_events())
+        summary.setdefault("timings", self.tracer.percentiles())
+        if self._tracing_config().get("chrome_trace"):
+            trace_path = RUNS_DIR / f"trace_{run_id}.json"
+            self.artifact_writer.submit(trace_path, to_chrome_trace(self.tracer.spans, run_id=run_id))
+            summary.setdefault("artifacts", {})["chrome_trace"] = trace_path.as_posix()
+        captures = self.capture.drain()
+        if captures:
+            summary.setdefault("artifacts", {})["captures"] = captures
+        if self.risk.tripped:
+            summary["risk_control"] = dict(self.risk.tripped)
+        else:
+            # 一次干净的运行结束，连续触发计数归零
+            self.risk.clear()
+        self.artifact_writer.submit(RUNS_DIR / f"run_{run_id}.json", summary, mirrors=[RUNS_DIR / "run_latest.json"])
+        await asyncio.to_thread(self.artifact_writer.flush)
+        try:
+            self.state.record_run(summary)
+            if not self.state.finish_run_plan(run_id):
+                logger.info(f"运行 {run_id} 还有未完成的问题，可用 python main.py --resume 继续")
+            # 每个问题的耗时拆解写入该问题的状态记录
+            self.state.record_timings(run_id, self.tracer.per_qid())
+        except Exception as e:
+            logger.error(f"记录运行 summary 失败: {e}")
+        self.run_id = None
+        self.tracer.reset()
+        self.metrics.observe_run(summary, time.time())
+        self._write_metrics_textfile()
+        if (self.config.get("retention", {}) or {}).get("auto", True):
+            try:
+                logger.info((await asyncio.to_thread(self.run_retention)).format())
+            except Exception as e:
+                logger.error(f"artifact 清理失败: {e}")
+
+    def _tracing_config(self) -> dict:
+        return self.config.get("tracing", {}) or {}
+
+    def _metrics_config(self) -> dict:
+        return self.config.get("metrics", {}) or {}
+
+    def _write_metrics_textfile(self) -> None:
+        path = (self._metrics_config().get("textfile") or "").strip()
+        if not path:
             return
-        
         try:
-            import requests
-            if "yy" not in message:
-                message = "yy\n" + message
-            response = requests.post(webhook, json={
-                "msg_type": "text",
-                "content": {"text": message}
-            }, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info("✅ 飞书通知已发送")
-            else:
-                logger.warning(f"飞书通知失败: {response.status_code}")
+            self.metrics.registry.write_textfile(Path(path))
         except Exception as e:
-            logger.error(f"发送通知失败: {e}")
-    
-    async def process_invitations(self, *, max_questions: Optional[int] = None, flush_drafts_every: int = 5) -> dict:
-        """处理所有邀请，返回 summary（用于通知/定时任务）。"""
-        run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        started_at = datetime.now().isoformat()
-        invitations = await self.get_invitations()
-        
-        if not invitations:
-            logger.info("📭 没有新的邀请")
-            summary = {
-                "run_id": run_id,
-                "started_at": started_at,
-                "ended_at": datetime.now().isoformat(),
-                "selected": 0,
-                "draft_saved_ok": 0,
-                "failures": [],
-                "mode": "none",
-            }
-            self._safe_write_json(RUNS_DIR / f"run_{run_id}.json", summary)
-            self._safe_write_json(RUNS_DIR / "run_latest.json", summary)
-            return summary
+            logger.error(f"写入指标 textfile 失败: {e}")
+
+    def start_metrics_server(self, port: Optional[int] = None) -> Optional[MetricsServer]:
+        """启动 /metrics 端点（端口为 0 或未配置时不启动）；由本实例启动的端点在 close() 时停止"""
+        if self.metrics_server is None:
+            self.metrics_server = start_metrics_server(self.metrics.registry, self._metrics_config(), port)
+        return self.metrics_server
+
+    def run_retention(self, *, dry_run: bool = False) -> RetentionReport:
+        """按 retention 配置清理/归档旧 artifact，并回收未被引用的回答 blob"""
+        self.artifact_writer.flush()
+        retention = Retention.from_config(
+            self.config.get("retention", {}) or {},
+            store=self.artifact_store,
+            referenced_hashes=self.state.referenced_hashes,
+        )
+        return retention.run(dry_run=dry_run)
+
+    async def process_invitations(
+        self,
+        *,
+        max_questions: Optional[int] = None,
+        flush_drafts_every: int = 5,
+        resume_run_id: Optional[str] = None,
+    ) -> dict:
+        """
+        处理所有邀请，返回 summary（用于通知/定时任务）。
+        发现阶段结束后记录运行计划，之后每个问题完成一个阶段就写入检查点；
+        指定 resume_run_id 时跳过发现阶段，按原计划和顺序从检查点继续。
+        """
+        detailed: set = set()
+        if resume_run_id:
+            plan = self.state.load_run_plan(resume_run_id)
+            if plan is None:
+                raise RuntimeError(f"run checkpoint not found: {resume_run_id}")
+            run_id = plan["run_id"]
+            self.tracer.set_run_id(run_id)
+            started_at = plan["started_at"]
+            flush_drafts_every = int(plan["options"].get("flush_drafts_every") or flush_drafts_every)
+            invitations = [
+                Invitation(
+                    question=Question(
+                        id=item["qid"],
+                        title=item.get("title") or "",
+                        url=item.get("url") or f"https://www.zhihu.com/question/{item['qid']}",
+                        content=item.get("content") or "",
+                    )
+                )
+                for item in plan["items"]
+                if item["qid"] not in self.processed_ids
+            ]
+            detailed = {item["qid"] for item in plan["items"] if item["stage"] != "planned"}
+            logger.info(
+                f"从检查点恢复运行 {run_id}: 计划 {len(plan['items'])} 个，剩余 {len(invitations)} 个"
+                f"（已获取详情 {len(detailed)} 个）"
+            )
+        else:
+            run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+            started_at = datetime.now().isoformat()
+            self.tracer.set_run_id(run_id)
+            with self.tracer.span("get_invitations", kind="stage"):
+                invitations = await self.get_invitations()
+
+            if not invitations:
+                logger.info("📭 没有新的邀请")
+                summary = {
+                    "run_id": run_id,
+                    "started_at": started_at,
+                    "ended_at": datetime.now().isoformat(),
+                    "selected": 0,
+                    "draft_saved_ok": 0,
+                    "failures": [],
+                    "mode": "none",
+                }
+                await self._write_run_summary(summary)
+                return summary
+
+            # 0) 过滤已处理（草稿已保存）的邀请
+            invitations = [inv for inv in invitations if inv.question.id not in self.processed_ids]
+            if not invitations:
+                logger.info("📭 没有新的邀请（都已处理过）")
+                summary = {
+                    "run_id": run_id,
+                    "started_at": started_at,
+                    "ended_at": datetime.now().isoformat(),
+                    "selected": 0,
+                    "draft_saved_ok": 0,
+                    "failures": [],
+                    "mode": "none",
+                }
+                await self._write_run_summary(summary)
+                return summary
+
+            if isinstance(max_questions, int) and max_questions > 0:
+                invitations = invitations[:max_questions]
 
+            self.state.save_run_plan(
+                run_id,
+                [inv.question.id for inv in invitations],
+                started_at=started_at,
+                options={"max_questions": max_questions, "flush_drafts_every": flush_drafts_every},
+            )
+
+        self.run_id = run_id
         processed = []
         failed = []
 
-        # 0) 过滤已处理（草稿已保存）的邀请
-        invitations = [inv for inv in invitations if inv.question.id not in self.processed_ids]
-        if not invitations:
-            logger.info("📭 没有新的邀请（都已处理过）")
-            summary = {
-                "run_id": run_id,
-                "started_at": started_at,
-                "ended_at": datetime.now().isoformat(),
-                "selected": 0,
-                "draft_saved_ok": 0,
-                "failures": [],
-                "mode": "none",
-            }
-            self._safe_write_json(RUNS_DIR / f"run_{run_id}.json", summary)
-            self._safe_write_json(RUNS_DIR / "run_latest.json", summary)
-            return summary
+        async def _fetch_detail(i: int, inv: Invitation) -> None:
+            logger.info(f"获取详情 {i}/{len(invitations)}: {inv.question.title[:60]}...")
+            with self.tracer.span("question_detail", qid=inv.question.id, kind="stage"):
+                await self.get_question_detail(inv.question)
 
-        if isinstance(max_questions, int) and max_questions > 0:
-            invitations = invitations[:max_questions]
+        # 流式模式：deep_research 增量模式下边取详情边生成，详情只在生成期间驻留内存
+        streaming = bool(self._get_deep_research_config()) and self._streaming_enabled()
 
         # 1) 获取每个问题的详情（用于回答生成的 context）
-        for i, inv in enumerate(invitations, 1):
-            logger.info(f"获取详情 {i}/{len(invitations)}: {inv.question.title[:60]}...")
-            await self.get_question_detail(inv.question)
-            await asyncio.sleep(1)
+        if not streaming:
+            for i, inv in enumerate(invitations, 1):
+                if self.risk.tripped:
+                    break
+                if inv.question.id not in detailed:
+                    await _fetch_detail(i, inv)
 
         # 2) deep_research 模式走“增量生成 + 批量写草稿”
         if self._get_deep_research_config():
+            source: Union[List[Invitation], AsyncIterator[Invitation]] = invitations
+            if streaming:
+                async def _with_details() -> AsyncIterator[Invitation]:
+                    for i, inv in enumerate(invitations, 1):
+                        if self.risk.tripped:
+                            return
+                        qid = inv.question.id
+                        if qid not in detailed and qid not in self.processed_ids and not self._has_answer(qid):
+                            await _fetch_detail(i, inv)
+                        yield inv
+
+                source = _with_details()
             dr_summary = await self.process_invitations_deep_research_incremental(
-                invitations, flush_drafts_every=flush_drafts_every
+                source, flush_drafts_every=flush_drafts_every
             )
             summary = {
                 "run_id": run_id,
                 "started_at": started_at,
                 "ended_at": datetime.now().isoformat(),
                 "selected": len(invitations),
+                "resumed": bool(resume_run_id),
                 "draft_saved_ok": dr_summary.get("draft_saved_ok", 0),
                 "failures": dr_summary.get("failures", []),
                 "mode": dr_summary.get("mode"),
                 "artifacts": {
                     "invitations_latest": dr_summary.get("invitations_latest"),
-                    "answers_by_qid_dir": dr_summary.get("answers_by_qid_dir"),
+                    "answer_store_dir": dr_summary.get("answer_store_dir"),
                 },
             }
-            self._safe_write_json(RUNS_DIR / f"run_{run_id}.json", summary)
-            self._safe_write_json(RUNS_DIR / "run_latest.json", summary)
+            await self._write_run_summary(summary)
             return summary
 
         # 3) legacy：批量生成回答（command）后逐个写入
-        answers_map = await self.generate_answers_batch(invitations)
+        # 恢复运行时，检查点之前已生成的回答直接从回答存储读取
+        index = self._answer_index([inv.question.id for inv in invitations]) if resume_run_id else {}
+        to_generate = [inv for inv in invitations if not (index.get(inv.question.id) or {}).get("ok")]
+        answers_map = await self.generate_answers_batch(to_generate) if to_generate and not self.risk.tripped else {}
         for i, invitation in enumerate(invitations, 1):
+            if self.risk.tripped:
+                break
             logger.info(f"\n处理第 {i}/{len(invitations)} 个邀请...")
             try:
-                answer = (answers_map.get(invitation.question.id) or "").strip()
+                qid = invitation.question.id
+                answer = (answers_map.get(qid) or (self._load_answer_text(qid) if qid in index else "")).strip()
                 if not answer:
                     failed.append(invitation.question.title)
                     logger.error("回答为空，跳过保存草稿")
@@ -1096,12 +1804,10 @@ class ZhihuAutoAnswer:
 
                 if success:
                     processed.append({"title": invitation.question.title, "url": invitation.question.url})
-                    self.processed_ids.add(invitation.question.id)
-                    self._save_processed_ids()
+                    self._mark_processed(invitation.question.id)
                 else:
                     failed.append(invitation.question.title)
-
-                await asyncio.sleep(5)
+                    self._mark_failed(invitation.question.id, "save_draft")
 
             except Exception as e:
                 logger.error(f"处理邀请失败: {e}")
@@ -1112,16 +1818,37 @@ class ZhihuAutoAnswer:
             "started_at": started_at,
             "ended_at": datetime.now().isoformat(),
             "selected": len(invitations),
+            "resumed": bool(resume_run_id),
             "draft_saved_ok": len(processed),
             "failures": [{"title": t, "stage": "legacy"} for t in failed],
             "mode": "command",
         }
-        self._safe_write_json(RUNS_DIR / f"run_{run_id}.json", summary)
-        self._safe_write_json(RUNS_DIR / "run_latest.json", summary)
+        await self._write_run_summary(summary)
         return summary
     
+    def _save_strategy_stats(self) -> None:
+        try:
+            self.strategy_stats.save()
+        except Exception as e:
+            logger.warning(f"保存选择器统计失败: {e}")
+
     async def close(self):
         """关闭浏览器"""
+        for item in self.strategy_stats.stale():
+            logger.warning(
+                f"选择器/输入策略可能已失效: [{item['kind']}] {item['page_type']} {item['option']} "
+                f"连续未命中 {item['consecutive_misses']} 次（上次命中 {item['last_hit_at']}）"
+            )
+        self._save_strategy_stats()
+        notification_cfg = self.config.get("notification", {}) or {}
+        await self.notifier.close(timeout=float(notification_cfg.get("close_timeout_seconds", 30)))
+        # 等待后台写盘线程退出（最多 30s）放在线程里，关闭期间事件循环不被阻塞
+        await asyncio.to_thread(self.artifact_writer.close)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+        await self.capture.detach()
         try:
             if self.context:
                 await self.context.close()
@@ -1137,3 +1864,5 @@ class ZhihuAutoAnswer:
         if self.playwright:
             await self.playwright.stop()
         logger.info("浏览器已关闭")
+        # 常驻调度每轮都会新建机器人，状态库连接（连同 WAL/SHM 句柄）要随之关闭
+        self.state.close()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+按需抓取 UI 流程的 Playwright trace / HAR
+按运行采样（sample_rate，--trace 强制开启）：采中的运行在 get_invitations / save_answer_to_draft 前后
+开一个 tracing chunk（截图 + DOM 快照 + 网络）并记录网络请求，只有失败或明显偏慢的窗口才落盘，
+其余直接丢弃；单次运行的抓取总量有上限。
+"""
+import json
+import logging
+import random
+import re
+import statistics
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPTURE_DIR = Path("artifacts/runs/captures")
+
+# 各窗口的慢阈值（毫秒）：超过即保留
+DEFAULT_SLOW_MS = {"get_invitations": 30000, "save_draft": 20000}
+
+
+@dataclass
+class CaptureWindow:
+    """一次抓取窗口；调用方结束前设置 ok"""
+    stage: str
+    qid: Optional[str]
+    ok: Optional[bool] = None
+    duration_ms: Optional[int] = None
+    kept: List[str] = field(default_factory=list)
+    reason: Optional[str] = None
+
+
+class UiCapture:
+    """Playwright tracing chunk + 轻量 HAR 的采样抓取"""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        sample_rate: float = 0.1,
+        tracing: bool = True,
+        har: bool = True,
+        directory: Path = DEFAULT_CAPTURE_DIR,
+        slow_ms: Optional[Dict[str, int]] = None,
+        slow_factor: float = 3.0,
+        max_total_mb: float = 100,
+    ):
+        self.enabled = enabled
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.tracing = tracing
+        self.har = har
+        self.directory = Path(directory)
+        self.slow_ms = {**DEFAULT_SLOW_MS, **(slow_ms or {})}
+        self.slow_factor = float(slow_factor)
+        self.max_bytes = int(float(max_total_mb) * 1024 * 1024)
+        self.active = False
+        self.kept: List[dict] = []
+        self._context = None
+        self._tracing_started = False
+        self._busy = False
+        self._bytes = 0
+        self._seq = 0
+        self._history: Dict[str, List[int]] = {}
+        self._entries: Optional[List[dict]] = None
+        self._statuses: Dict[Any, tuple] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "UiCapture":
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", False)),
+            sample_rate=float(config.get("sample_rate", 0.1)),
+            tracing=bool(config.get("tracing", True)),
+            har=bool(config.get("har", True)),
+            directory=Path(config.get("dir") or DEFAULT_CAPTURE_DIR),
+            slow_ms=config.get("slow_ms") or None,
+            slow_factor=float(config.get("slow_factor", 3.0)),
+            max_total_mb=float(config.get("max_total_mb", 100)),
+        )
+
+    # ---- 生命周期 ----
+    async def attach(self, context, *, rng: Optional[random.Random] = None) -> bool:
+        """浏览器上下文创建后调用：决定本次运行是否抓取，采中时开启 tracing 和网络监听"""
+        self._context = context
+        self.active = False
+        if not self.enabled or context is None:
+            return False
+        roll = (rng or random).random()
+        if roll >= self.sample_rate:
+            logger.info(f"本次运行未采样 UI 抓取（sample_rate={self.sample_rate}）")
+            return False
+        if self.tracing:
+            try:
+                await context.tracing.start(screenshots=True, snapshots=True)
+                self._tracing_started = True
+            except Exception as e:
+                logger.warning(f"开启 Playwright tracing 失败，仅记录 HAR: {e}")
+        if self.har:
+            context.on("response", self._on_response)
+            context.on("requestfinished", self._on_request_done)
+            context.on("requestfailed", self._on_request_done)
+        self.active = self._tracing_started or self.har
+        if self.active:
+            logger.info(f"已开启 UI 抓取（失败或慢的窗口保存到 {self.directory}）")
+        return self.active
+
+    async def detach(self) -> None:
+        if self._tracing_started and self._context is not None:
+            try:
+                await self._context.tracing.stop()
+            except Exception as e:
+                logger.debug(f"停止 tracing 失败: {e}")
+        self._tracing_started = False
+        self.active = False
+
+    def drain(self) -> List[dict]:
+        """取出本次运行保留的抓取，并重置大小预算"""
+        kept, self.kept = self.kept, []
+        self._bytes = 0
+        return kept
+
+    # ---- 网络记录（HAR 1.2 的精简版：不含响应体）----
+    def _on_response(self, response) -> None:
+        if self._entries is None:
+            return
+        try:
+            self._statuses[response.request] = (response.status, response.status_text, response.headers)
+        except Exception:
+            pass
+
+    def _on_request_done(self, request) -> None:
+        if self._entries is None:
+            return
+        try:
+            self._entries.append(self._har_entry(request, self._statuses.pop(request, None)))
+        except Exception as e:
+            logger.debug(f"记录网络请求失败: {e}")
+
+    @staticmethod
+    def _har_entry(request, status: Optional[tuple]) -> dict:
+        timing = request.timing or {}
+        start_ms = float(timing.get("startTime") or time.time() * 1000)
+
+        def _phase(begin: str, end: str) -> float:
+            a, b = timing.get(begin, -1), timing.get(end, -1)
+            return round(b - a, 3) if a is not None and b is not None and a >= 0 and b >= 0 else -1
+
+        phases = {
+            "blocked": -1,
+            "dns": _phase("domainLookupStart", "domainLookupEnd"),
+            "connect": _phase("connectStart", "connectEnd"),
+            "ssl": _phase("secureConnectionStart", "connectEnd"),
+            "send": 0,
+            "wait": _phase("requestStart", "responseStart"),
+            "receive": _phase("responseStart", "responseEnd"),
+        }
+        total = timing.get("responseEnd", -1)
+        code, text, headers = status or (0, "", {})
+        failure = request.failure
+        return {
+            "startedDateTime": datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).isoformat(),
+            "time": round(total, 3) if total and total > 0 else sum(v for v in phases.values() if v > 0),
+            "request": {
+                "method": request.method,
+                "url": request.url,
+                "httpVersion": "",
+                "headers": [],
+                "queryString": [],
+                "cookies": [],
+                "headersSize": -1,
+                "bodySize": -1,
+            },
+            "response": {
+                "status": code,
+                "statusText": text,
+                "httpVersion": "",
+                "headers": [{"name": k, "value": v} for k, v in (headers or {}).items()],
+                "cookies": [],
+                "content": {"size": -1, "mimeType": (headers or {}).get("content-type", "")},
+                "redirectURL": "",
+                "headersSize": -1,
+                "bodySize": -1,
+            },
+            "cache": {},
+            "timings": phases,
+            "_resourceType": request.resource_type,
+            **({"_failure": str(failure)} if failure else {}),
+        }
+
+    # ---- 抓取窗口 ----
+    def _slow_reason(self, stage: str, duration_ms: int) -> Optional[str]:
+        """超过固定阈值，或（样本足够时）超过本次运行同类窗口中位数的 slow_factor 倍"""
+        threshold = self.slow_ms.get(stage)
+        if threshold is not None and duration_ms >= int(threshold):
+            return f"slow>{int(threshold)}ms"
+        history = self._history.get(stage) or []
+        if len(history) >= 5 and self.slow_factor > 0:
+            median = statistics.median(history)
+            if median > 0 and duration_ms >= median * self.slow_factor:
+                return f"slow>{self.slow_factor:g}x median"
+        return None
+
+    @asynccontextmanager
+    async def window(self, stage: str, *, qid: Optional[str] = None, run_id: Optional[str] = None) -> AsyncIterator[CaptureWindow]:
+        """
+        包住一段 UI 流程。未采样、已有窗口在抓取（不嵌套）时不做任何事；
+        异常视为失败并继续抛出
+        """
+        win = CaptureWindow(stage=stage, qid=qid)
+        if not self.active or self._busy or self._context is None:
+            yield win
+            return
+        self._busy = True
+        chunk = False
+        if self._tracing_started:
+            try:
+                await self._context.tracing.start_chunk(title=f"{stage} {qid or ''}".strip())
+                chunk = True
+            except Exception as e:
+                logger.debug(f"开启 tracing chunk 失败: {e}")
+        self._entries = [] if self.har else None
+        self._statuses = {}
+        t0 = time.perf_counter()
+        try:
+            yield win
+        except BaseException:
+            win.ok = False
+            raise
+        finally:
+            win.duration_ms = int((time.perf_counter() - t0) * 1000)
+            entries, self._entries = self._entries, None
+            self._statuses = {}
+            try:
+                await self._finish(win, run_id, chunk, entries or [])
+            finally:
+                self._history.setdefault(stage, []).append(win.duration_ms)
+                self._busy = False
+
+    async def _finish(self, win: CaptureWindow, run_id: Optional[str], chunk: bool, entries: List[dict]) -> None:
+        if win.ok is False:
+            win.reason = "failed"
+        else:
+            win.reason = self._slow_reason(win.stage, win.duration_ms or 0)
+        keep = win.reason is not None and self._bytes < self.max_bytes
+        if win.reason and not keep:
+            logger.warning(f"UI 抓取已达本次运行上限（{self.max_bytes // 1024 // 1024}MB），不再保存")
+
+        self._seq += 1
+        stem = "_".join(
+            re.sub(r"[^\w.-]", "_", str(p))
+            for p in (run_id or datetime.now().strftime("%Y%m%d_%H%M%S"), win.stage, win.qid or "run", self._seq)
+        )
+        if chunk:
+            try:
+                if keep:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    path = self.directory / f"{stem}.trace.zip"
+                    await self._context.tracing.stop_chunk(path=str(path))
+                    win.kept.append(path.as_posix())
+                else:
+                    await self._context.tracing.stop_chunk()
+            except Exception as e:
+                logger.warning(f"保存 tracing chunk 失败: {e}")
+        if keep and self.har:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{stem}.har"
+            har = {
+                "log": {
+                    "version": "1.2",
+                    "creator": {"name": "zhihu-auto-answer", "version": "1"},
+                    "pages": [],
+                    "entries": sorted(entries, key=lambda e: e["startedDateTime"]),
+                }
+            }
+            path.write_text(json.dumps(har, ensure_ascii=False), encoding="utf-8")
+            win.kept.append(path.as_posix())
+        if not win.kept:
+            return
+
+        size = 0
+        for p in win.kept:
+            try:
+                size += Path(p).stat().st_size
+            except OSError:
+                pass
+        if self._bytes + size > self.max_bytes:
+            # 单个抓取就超出剩余预算：删掉，避免一次异常把磁盘写满
+            for p in win.kept:
+                Path(p).unlink(missing_ok=True)
+            logger.warning(f"UI 抓取 {stem} 超出本次运行上限，已丢弃（{size / 1024 / 1024:.1f}MB）")
+            self._bytes = self.max_bytes
+            win.kept = []
+            return
+        self._bytes += size
+        self.kept.append(
+            {
+                "stage": win.stage,
+                "qid": win.qid,
+                "reason": win.reason,
+                "ms": win.duration_ms,
+                "files": list(win.kept),
+                "bytes": size,
+            }
+        )
+        logger.info(f"已保存 UI 抓取（{win.reason}）: {', '.join(win.kept)}")
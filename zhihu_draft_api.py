@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+知乎草稿 API 写入
+直接通过已登录浏览器 context 的 request API 调用草稿接口，避免打开编辑器页面
+"""
+import asyncio
+import hashlib
+import html
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# 知乎回答草稿接口（{qid} 为问题 ID）
+DEFAULT_DRAFT_ENDPOINT = "https://www.zhihu.com/api/v4/questions/{qid}/draft"
+# 编辑器自动保存/保存草稿时发出的请求 URL 特征
+DEFAULT_AUTOSAVE_URL_PATTERNS = ["/draft"]
+
+
+@dataclass
+class DraftApiResult:
+    """草稿 API 调用结果"""
+    ok: bool
+    status: Optional[int] = None
+    error: str = ""
+    elapsed_ms: int = 0
+
+
+def answer_to_html(answer: str) -> str:
+    """纯文本回答转换为知乎编辑器使用的 HTML（空行分段，单换行转 <br>）"""
+    text = (answer or "").replace("\r\n", "\n").strip()
+    paragraphs = [p for p in text.split("\n\n") if p.strip()]
+    parts = []
+    for p in paragraphs:
+        lines = [html.escape(line) for line in p.strip().split("\n")]
+        parts.append("<p>" + "<br>".join(lines) + "</p>")
+    return "".join(parts)
+
+
+def html_to_text(content: str) -> str:
+    """草稿 HTML 转纯文本（仅用于内容比对）：段落之间空一行，<br> 转单换行"""
+    text = re.sub(r"(?i)</p>", "\n\n", content or "")
+    text = re.sub(r"(?i)<br\s*/?>", "\n", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    return html.unescape(text)
+
+
+def content_fingerprint(text: str) -> str:
+    """
+    回答内容指纹：按空行分段，段内折叠空白后取 sha256。
+    段内的换行/缩进差异不影响指纹，但拆分或合并段落会改变指纹
+    """
+    paragraphs = re.split(r"\n\s*\n", (text or "").replace("\r\n", "\n"))
+    normalized = "\n\n".join(" ".join(p.split()) for p in paragraphs if p.strip())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def build_draft_payload(answer: str) -> Dict[str, Any]:
+    return {"content": answer_to_html(answer), "delta_time": 0}
+
+
+def _verify_draft_response(status: int, body: Any) -> str:
+    """校验草稿接口返回，返回错误描述（空字符串表示校验通过）"""
+    if status < 200 or status >= 300:
+        return f"http status {status}"
+    if body is None:
+        # 部分接口成功时返回 204/空 body
+        return "" if status == 204 else "response is not json"
+    if not isinstance(body, dict):
+        return "unexpected response body"
+    if "error" in body:
+        err = body.get("error")
+        if isinstance(err, dict):
+            return f"api error: {err.get('code')} {err.get('message')}"
+        return f"api error: {err}"
+    if "content" in body and not (body.get("content") or "").strip():
+        return "draft content is empty in response"
+    return ""
+
+
+async def save_draft_via_api(
+    request,
+    question_id: str,
+    answer: str,
+    *,
+    endpoint_template: str = DEFAULT_DRAFT_ENDPOINT,
+    method: str = "POST",
+    headers: Optional[Dict[str, str]] = None,
+    timeout_ms: int = 15000,
+) -> DraftApiResult:
+    """
+    通过 Playwright APIRequestContext（通常为 context.request，共享登录 Cookie）写入草稿。
+    只有接口返回 2xx 且 body 校验通过才视为成功。
+    """
+    start = time.monotonic()
+    url = endpoint_template.format(qid=question_id)
+    req_headers = {
+        "Accept": "application/json, text/plain, */*",
+        "Content-Type": "application/json",
+        "X-Requested-With": "fetch",
+        "Referer": f"https://www.zhihu.com/question/{question_id}/write",
+    }
+    if headers:
+        req_headers.update(headers)
+
+    try:
+        resp = await request.fetch(
+            url,
+            method=method.upper(),
+            headers=req_headers,
+            data=json.dumps(build_draft_payload(answer), ensure_ascii=False),
+            timeout=timeout_ms,
+        )
+        status = resp.status
+        text = await resp.text()
+    except Exception as e:
+        return DraftApiResult(
+            ok=False,
+            error=f"{type(e).__name__}: {e}",
+            elapsed_ms=int((time.monotonic() - start) * 1000),
+        )
+
+    body = None
+    if text.strip():
+        try:
+            body = json.loads(text)
+        except Exception:
+            body = None
+
+    error = _verify_draft_response(status, body)
+    return DraftApiResult(
+        ok=not error,
+        status=status,
+        error=error,
+        elapsed_ms=int((time.monotonic() - start) * 1000),
+    )
+
+
+async def fetch_draft_via_api(
+    request,
+    question_id: str,
+    *,
+    endpoint_template: str = DEFAULT_DRAFT_ENDPOINT,
+    timeout_ms: int = 10000,
+) -> Optional[str]:
+    """读取已有草稿内容（HTML）；没有草稿或读取失败返回 None"""
+    url = endpoint_template.format(qid=question_id)
+    try:
+        resp = await request.get(
+            url,
+            headers={"Accept": "application/json, text/plain, */*", "X-Requested-With": "fetch"},
+            timeout=timeout_ms,
+        )
+        if resp.status != 200:
+            return None
+        body = json.loads(await resp.text())
+    except Exception:
+        return None
+    if not isinstance(body, dict):
+        return None
+    content = body.get("content")
+    return content if isinstance(content, str) else None
+
+
+class DraftSaveWatcher:
+    """
+    监听编辑器自身发出的草稿/自动保存请求，用请求完成及其状态码作为“草稿已保存”的信号。
+    需要在输入回答之前 start()，这样输入过程中触发的自动保存也能被捕获。
+    """
+
+    def __init__(self, page, *, url_patterns: Optional[List[str]] = None):
+        self.page = page
+        self.url_patterns = list(url_patterns or DEFAULT_AUTOSAVE_URL_PATTERNS)
+        self.confirmed = False
+        self.status: Optional[int] = None
+        self.url = ""
+        self.error = ""
+        self._done = asyncio.Event()
+
+    def _matches(self, request) -> bool:
+        try:
+            if (request.method or "").upper() not in ("POST", "PUT", "PATCH"):
+                return False
+            url = request.url or ""
+        except Exception:
+            return False
+        return any(p in url for p in self.url_patterns)
+
+    def _on_response(self, response) -> None:
+        if not self._matches(response.request):
+            return
+        self.status = response.status
+        self.url = response.url
+        if 200 <= response.status < 300:
+            self.confirmed = True
+            self.error = ""
+        else:
+            self.error = f"http status {response.status}"
+        self._done.set()
+
+    def _on_request_failed(self, request) -> None:
+        if not self._matches(request):
+            return
+        self.url = request.url
+        self.error = f"request failed: {request.failure}"
+        self._done.set()
+
+    def start(self) -> "DraftSaveWatcher":
+        self.page.on("response", self._on_response)
+        self.page.on("requestfailed", self._on_request_failed)
+        return self
+
+    def stop(self) -> None:
+        for event, handler in (("response", self._on_response), ("requestfailed", self._on_request_failed)):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass
+
+    async def wait(self, timeout_ms: int) -> bool:
+        """
+        等待草稿请求完成，最多 timeout_ms。
+        成功立即返回 True；失败的保存请求会记录 error 并返回 False（编辑器可能稍后重试，可再次 wait）。
+        """
+        if self.confirmed:
+            return True
+        self._done.clear()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=max(0, timeout_ms) / 1000)
+        except asyncio.TimeoutError:
+            if not self.error:
+                self.error = f"no draft request confirmed within {timeout_ms}ms"
+        return self.confirmed
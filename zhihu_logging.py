@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+日志配置
+业务代码里的 logger 调用只把记录放进队列（QueueHandler），由后台线程（QueueListener）
+写入按大小轮转的日志文件和控制台，不在事件循环上做同步文件 I/O。
+每条记录带上当前的 run_id / qid（来自 span 上下文），可选输出为 JSON 行；
+最近的若干行同时同步写入内存环形缓冲（只是 deque 追加），通知里的日志尾部直接从这里取。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from zhihu_spans import Tracer
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_ring: Optional["RingBufferHandler"] = None
+_log_file: Optional[Path] = None
+_options: Optional[tuple] = None
+
+
+class ContextFilter(logging.Filter):
+    """在产生日志的线程/任务里补上 run_id / qid（必须挂在 QueueHandler 上，后台线程拿不到上下文）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "run_id"):
+            record.run_id = Tracer.current_run_id()
+        if not hasattr(record, "qid"):
+            record.qid = Tracer.current_qid()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("run_id", "qid"):
+            value = getattr(record, key, None)
+            if value:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    """保留最近 capacity 行格式化后的日志（多行记录按行计）"""
+
+    def __init__(self, capacity: int = 200):
+        super().__init__()
+        self._lines: deque = deque(maxlen=max(1, int(capacity)))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self._lines.extend(text.splitlines() or [""])
+
+    def seed(self, lines: List[str]) -> None:
+        with self.lock:
+            self._lines.extend(lines)
+
+    def tail(self, n: int) -> List[str]:
+        with self.lock:
+            lines = list(self._lines)
+        return lines[-n:] if n > 0 else []
+
+
+def tail_file(path: Path, n: int, *, block_size: int = 8192) -> List[str]:
+    """从文件末尾按块向前读取最后 n 行（不读入整个文件）"""
+    path = Path(path)
+    if n <= 0 or not path.exists():
+        return []
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    return data.decode("utf-8", errors="replace").splitlines()[-n:]
+
+
+def setup_logging(
+    log_dir: Path = Path("logs"),
+    *,
+    level: str = "INFO",
+    filename: str = "zhihu_bot.log",
+    max_mb: float = 20,
+    backup_count: int = 5,
+    json_format: bool = False,
+    ring_lines: int = 200,
+    console: bool = True,
+) -> None:
+    """
+    安装（或按新参数重装）根 logger 的队列日志。参数不变时重复调用不做任何事
+    """
+    global _listener, _queue_handler, _ring, _log_file, _options
+    options = (str(log_dir), str(level).upper(), filename, float(max_mb), int(backup_count),
+               bool(json_format), int(ring_lines), bool(console))
+    with _lock:
+        if _options == options:
+            return
+        previous = _ring.tail(int(ring_lines)) if _ring is not None else []
+        _shutdown_locked()
+
+        log_dir = Path(log_dir)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        _log_file = log_dir / filename
+        formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            _log_file,
+            maxBytes=int(float(max_mb) * 1024 * 1024),
+            backupCount=int(backup_count),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(formatter)
+        # 通知里的尾部始终用文本格式；环形缓冲直接挂在根 logger 上，取尾部时不用等队列
+        _ring = RingBufferHandler(ring_lines)
+        _ring.seed(previous)
+        _ring.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers: List[logging.Handler] = [file_handler]
+        if console:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            handlers.append(stream_handler)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _queue_handler.addFilter(ContextFilter())
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.addHandler(_ring)
+        root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        _options = options
+
+
+def _shutdown_locked() -> None:
+    global _listener, _queue_handler, _options
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _ring is not None:
+        root.removeHandler(_ring)
+    if _listener is not None:
+        # stop() 会先写完队列里剩余的记录
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    _options = None
+
+
+def shutdown_logging() -> None:
+    with _lock:
+        _shutdown_locked()
+
+
+def setup_logging_from_config(config: Optional[dict], log_dir: Path = Path("logs")) -> None:
+    config = config or {}
+    setup_logging(
+        log_dir,
+        level=str(config.get("level") or "INFO"),
+        filename=str(config.get("file") or "zhihu_bot.log"),
+        max_mb=float(config.get("max_mb", 20)),
+        backup_count=int(config.get("backup_count", 5)),
+        json_format=bool(config.get("json", False)),
+        ring_lines=int(config.get("ring_lines", 200)),
+        console=bool(config.get("console", True)),
+    )
+
+
+def log_tail(n: int = 60) -> str:
+    """最近 n 行日志：优先取内存环形缓冲，未初始化时从日志文件末尾读取"""
+    if _ring is not None:
+        lines = _ring.tail(n)
+        if lines:
+            return "\n".join(lines)
+    if _log_file is not None:
+        try:
+            return "\n".join(tail_file(_log_file, n))
+        except OSError:
+            return ""
+    return ""
+
+
+atexit.register(shutdown_logging)
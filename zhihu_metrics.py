@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Prometheus 指标
+内置一个很小的指标注册表（Counter / Gauge / Histogram，文本格式 0.0.4），不依赖 prometheus_client：
+常驻模式通过本地 HTTP 端点 /metrics 暴露，一次性运行结束时原子写入 node_exporter textfile
+"""
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from zhihu_artifact_writer import write_text_atomic
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 阶段耗时的桶（秒）：覆盖从毫秒级接口调用到十分钟级 deep_research
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 900)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = lock or threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("counter can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """抓取时再计算取值（只用于无标签的 gauge）"""
+        self._function = fn
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        if self._function is not None:
+            try:
+                items = [((), float(self._function()))]
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (float("inf"),)
+        # key -> (每个桶的计数（非累计）, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, n + 1)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines = self._header()
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class Registry:
+    """指标注册表：按注册顺序输出"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"duplicate metric: {metric.name}")
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """原子写入 node_exporter textfile（同目录临时文件 + replace，避免被读到半个文件）"""
+        write_text_atomic(Path(path), self.render())
+
+
+class MetricsServer:
+    """后台线程里的 /metrics HTTP 端点"""
+
+    def __init__(self, registry: Registry, port: int, host: str = "127.0.0.1"):
+        registry_ref = registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, int(port)), _Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info(f"Prometheus 指标端点: http://{self._server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_metrics_server(
+    registry: Registry, config: Optional[dict], port: Optional[int] = None
+) -> Optional[MetricsServer]:
+    """按 metrics 配置启动 /metrics 端点（port 覆盖配置；端口为 0 或未配置时不启动，端口被占用时记录错误）"""
+    config = config or {}
+    port = int(port if port is not None else config.get("port") or 0)
+    if port <= 0:
+        return None
+    try:
+        return MetricsServer(registry, port, host=str(config.get("bind") or "127.0.0.1")).start()
+    except OSError as e:
+        logger.error(f"启动指标端点失败: {e}")
+        return None
+
+
+class BotMetrics:
+    """机器人的业务指标；observe_span 挂到 Tracer 上，由阶段 span 驱动计数和耗时"""
+
+    def __init__(self):
+        self.registry = Registry()
+        r = self.registry
+        self.invitations_discovered = r.counter(
+            "zhihu_invitations_discovered_total", "Invitations discovered on the notifications page"
+        )
+        self.answers_generated = r.counter(
+            "zhihu_answers_generated_total", "Answer generation attempts by result", ["result"]
+        )
+        self.drafts_saved = r.counter("zhihu_drafts_saved_total", "Drafts saved by method (api / ui)", ["method"])
+        self.drafts_skipped = r.counter(
+            "zhihu_drafts_skipped_total", "Draft saves skipped because the content was unchanged"
+        )
+        self.failures = r.counter("zhihu_failures_total", "Failed stage executions", ["stage"])
+        self.stage_duration = r.histogram(
+            "zhihu_stage_duration_seconds", "Duration of top-level stages", ["stage"]
+        )
+        self.generations_in_flight = r.gauge(
+            "zhihu_generations_in_flight", "Answer generation requests currently in flight"
+        )
+        self.browser_pages = r.gauge("zhihu_browser_pages", "Open pages in the browser context")
+        self.runs = r.counter("zhihu_runs_total", "Finished runs by mode", ["mode"])
+        self.last_run_timestamp = r.gauge(
+            "zhihu_last_run_timestamp_seconds", "Unix time when the last run finished"
+        )
+        self.last_run_drafts = r.gauge("zhihu_last_run_drafts_saved", "Drafts saved by the last run")
+        self.last_run_failures = r.gauge("zhihu_last_run_failures", "Failures in the last run")
+        self.pacer_wait = r.counter(
+            "zhihu_pacer_wait_seconds_total", "Time spent waiting for the request pacer", ["kind"]
+        )
+        self.session_expiry = r.gauge(
+            "zhihu_session_expiry_timestamp_seconds", "Unix time when the login cookie (z_c0) expires"
+        )
+        self.risk_trips = r.counter("zhihu_risk_control_trips_total", "Redirects to the verification page")
+        self.risk_cooldown_until = r.gauge(
+            "zhihu_risk_cooldown_until_timestamp_seconds", "Unix time when the risk-control cooldown ends"
+        )
+        self.cycles_skipped = r.counter(
+            "zhihu_cycles_skipped_total", "Scheduled cycles skipped before starting the browser", ["reason"]
+        )
+
+    def observe_span(self, span) -> None:
+        if span.kind != "stage" or span.duration_ms is None:
+            return
+        self.stage_duration.observe(span.duration_ms / 1000.0, stage=span.name)
+        if not span.ok:
+            self.failures.inc(stage=span.name)
+        if span.name == "deep_research":
+            self.answers_generated.inc(result="ok" if span.ok else "failed")
+        elif span.name == "save_draft" and span.ok:
+            method = str(span.attrs.get("method") or "unknown")
+            # 内容没变而跳过的草稿没有真正写入，单独计数
+            if method == "skipped":
+                self.drafts_skipped.inc()
+            else:
+                self.drafts_saved.inc(method=method)
+
+    def observe_run(self, summary: dict, finished_at: float) -> None:
+        self.runs.inc(mode=str(summary.get("mode") or "unknown"))
+        self.last_run_timestamp.set(finished_at)
+        self.last_run_drafts.set(float(summary.get("draft_saved_ok") or 0))
+        self.last_run_failures.set(float(len(summary.get("failures") or [])))
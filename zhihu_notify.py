@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+异步通知
+send_notification 只把消息放进队列立即返回；后台 worker 把一个时间窗内的消息合并成一条摘要，
+并发发往各个渠道（飞书 webhook / Bark / SMTP 邮件）。每个渠道有自己的超时、重试和最小发送间隔，
+阻塞的 HTTP / SMTP 调用放在线程里执行，慢渠道不会拖住运行本身。
+"""
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from email.header import Header
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SEPARATOR = "\n\n————————\n\n"
+
+
+class Channel:
+    """通知渠道基类：子类实现同步的 _send（失败时抛异常）"""
+
+    name = "channel"
+    max_chars: Optional[int] = None
+
+    def __init__(self, *, timeout_s: float = 10, retries: int = 2, backoff_s: float = 2, min_interval_s: float = 0):
+        self.timeout_s = float(timeout_s)
+        self.retries = max(0, int(retries))
+        self.backoff_s = float(backoff_s)
+        self.min_interval_s = float(min_interval_s)
+        self._last_sent = 0.0
+
+    def _send(self, text: str) -> None:
+        raise NotImplementedError
+
+    def _truncate(self, text: str) -> str:
+        if self.max_chars and len(text) > self.max_chars:
+            return text[: self.max_chars - 20] + "\n…（内容过长已截断）"
+        return text
+
+    async def send(self, text: str) -> bool:
+        """按最小间隔限速，失败按指数退避重试"""
+        text = self._truncate(text)
+        wait = self._last_sent + self.min_interval_s - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        for attempt in range(self.retries + 1):
+            try:
+                # 线程里的请求本身带超时；外层再加一层，防止底层库忽略超时
+                await asyncio.wait_for(asyncio.to_thread(self._send, text), self.timeout_s * 2 + 1)
+                self._last_sent = time.monotonic()
+                logger.info(f"✅ {self.name} 通知已发送")
+                return True
+            except Exception as e:
+                self._last_sent = time.monotonic()
+                if attempt >= self.retries:
+                    logger.warning(f"{self.name} 通知失败（已重试 {self.retries} 次）: {type(e).__name__}: {e}")
+                    return False
+                await asyncio.sleep(self.backoff_s * (2 ** attempt))
+        return False
+
+
+class FeishuChannel(Channel):
+    name = "feishu"
+    max_chars = 20000
+
+    def __init__(self, webhook: str, *, keyword: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.webhook = webhook
+        # 飞书自定义机器人开启“关键词”安全设置时，消息里必须带上关键词
+        self.keyword = keyword
+
+    def _send(self, text: str) -> None:
+        import requests
+
+        if self.keyword and self.keyword not in text:
+            text = f"{self.keyword}\n{text}"
+        resp = requests.post(self.webhook, json={"msg_type": "text", "content": {"text": text}}, timeout=self.timeout_s)
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}")
+        try:
+            code = (resp.json() or {}).get("code", 0)
+        except ValueError:
+            code = 0
+        if code not in (0, None):
+            raise RuntimeError(f"feishu code={code}: {resp.text[:200]}")
+
+
+class BarkChannel(Channel):
+    name = "bark"
+    max_chars = 3000
+
+    def __init__(self, key: str, *, server: str = "https://api.day.app", title: str = "知乎自动回答", **kwargs):
+        super().__init__(**kwargs)
+        self.key = key
+        self.server = server.rstrip("/")
+        self.title = title
+
+    def _send(self, text: str) -> None:
+        import requests
+
+        # 允许直接填完整推送地址
+        url = self.key if self.key.startswith("http") else f"{self.server}/{self.key}"
+        resp = requests.post(
+            url, json={"title": self.title, "body": text, "group": "zhihu"}, timeout=self.timeout_s
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}")
+
+
+class EmailChannel(Channel):
+    name = "email"
+
+    def __init__(
+        self,
+        *,
+        smtp_server: str,
+        smtp_port: int = 587,
+        username: str = "",
+        password: str = "",
+        to_email: str = "",
+        subject: str = "知乎自动回答机器人",
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.smtp_server = smtp_server
+        self.smtp_port = int(smtp_port)
+        self.username = username
+        self.password = password
+        self.to_email = to_email or username
+        self.subject = subject
+
+    def _send(self, text: str) -> None:
+        msg = MIMEText(text, "plain", "utf-8")
+        msg["Subject"] = str(Header(self.subject, "utf-8"))
+        msg["From"] = self.username
+        msg["To"] = self.to_email
+        if self.smtp_port == 465:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=self.timeout_s)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout_s)
+        try:
+            if self.smtp_port != 465:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            server.sendmail(self.username, [a.strip() for a in self.to_email.split(",") if a.strip()], msg.as_string())
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+
+class _Flush:
+    """队列里的控制标记：立即发出当前摘要；stop=True 时随后退出 worker"""
+
+    def __init__(self, stop: bool = False):
+        self.stop = stop
+        self.done = asyncio.Event()
+
+
+class Notifier:
+    """通知队列 + 后台 worker：一个时间窗内的消息合并为一条摘要，发往所有渠道"""
+
+    def __init__(self, channels: List[Channel], *, digest_window_s: float = 30):
+        self.channels = channels
+        self.digest_window_s = float(digest_window_s)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.sent_digests = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "Notifier":
+        config = config or {}
+        common = {
+            "timeout_s": float(config.get("timeout_seconds", 10)),
+            "retries": int(config.get("retries", 2)),
+        }
+        intervals = config.get("min_interval_seconds", {}) or {}
+        channels: List[Channel] = []
+        webhook = (config.get("feishu_webhook") or os.environ.get("FEISHU_WEBHOOK_URL") or "").strip()
+        if webhook:
+            channels.append(
+                FeishuChannel(
+                    webhook,
+                    keyword=str(config.get("feishu_keyword", "yy") or ""),
+                    min_interval_s=float(intervals.get("feishu", 1)),
+                    **common,
+                )
+            )
+        bark_key = (config.get("bark_key") or os.environ.get("BARK_KEY") or "").strip()
+        if bark_key:
+            channels.append(
+                BarkChannel(
+                    bark_key,
+                    server=str(config.get("bark_server") or "https://api.day.app"),
+                    min_interval_s=float(intervals.get("bark", 1)),
+                    **common,
+                )
+            )
+        email = config.get("email") or {}
+        if email.get("smtp_server"):
+            channels.append(
+                EmailChannel(
+                    smtp_server=email["smtp_server"],
+                    smtp_port=int(email.get("smtp_port") or 587),
+                    username=str(email.get("username") or ""),
+                    password=str(email.get("password") or os.environ.get("SMTP_PASSWORD") or ""),
+                    to_email=str(email.get("to_email") or ""),
+                    min_interval_s=float(intervals.get("email", 60)),
+                    **common,
+                )
+            )
+        return cls(channels, digest_window_s=float(config.get("digest_window_seconds", 30)))
+
+    # ---- 对外接口 ----
+    def notify(self, message: str) -> None:
+        """放入队列立即返回（需要在事件循环里调用）"""
+        if not self.channels:
+            logger.info("未配置通知渠道（notification.feishu_webhook / bark_key / email），跳过通知")
+            return
+        self._ensure_worker()
+        self._queue.put_nowait(message)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即发出已排队的消息并等待发送完成（常驻模式每轮结束调用一次）"""
+        return await self._signal(_Flush(), timeout)
+
+    async def close(self, timeout: Optional[float] = 30) -> None:
+        """发出剩余消息后停止 worker；超时则放弃未发送的消息"""
+        if self._worker is None or self._worker.done():
+            return
+        if not await self._signal(_Flush(stop=True), timeout):
+            logger.warning(f"通知在 {timeout}s 内未发送完，放弃剩余 {self._queue.qsize()} 条")
+            self._worker.cancel()
+        self._worker = None
+
+    # ---- worker ----
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(), name="notifier")
+
+    async def _signal(self, marker: _Flush, timeout: Optional[float]) -> bool:
+        if self._worker is None or self._worker.done():
+            return True
+        self._queue.put_nowait(marker)
+        try:
+            await asyncio.wait_for(marker.done.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if isinstance(first, _Flush):
+                first.done.set()
+                if first.stop:
+                    return
+                continue
+            batch = [first]
+            marker: Optional[_Flush] = None
+            deadline = loop.time() + self.digest_window_s
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(item, _Flush):
+                    marker = item
+                    break
+                batch.append(item)
+            try:
+                await self._dispatch(batch)
+            except Exception as e:
+                logger.error(f"发送通知失败: {e}")
+            if marker is not None:
+                marker.done.set()
+                if marker.stop:
+                    return
+
+    @staticmethod
+    def format_digest(messages: List[str]) -> str:
+        if len(messages) == 1:
+            return messages[0]
+        return f"（合并 {len(messages)} 条通知）{DIGEST_SEPARATOR}" + DIGEST_SEPARATOR.join(messages)
+
+    async def _dispatch(self, messages: List[str]) -> None:
+        text = self.format_digest(messages)
+        await asyncio.gather(*(channel.send(text) for channel in self.channels))
+        self.sent_digests += 1
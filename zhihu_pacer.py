@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+访问节流
+所有发往知乎的操作按类别（页面导航 navigation / 接口请求 api）各自走一个令牌桶：
+平均速率 + 允许的突发 + 可选的最小间隔。令牌在调用时同步预约（中间没有 await），
+并发的任务按预约顺序依次放行，提高并发度不会突破总的访问速率。
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# 类别 -> 默认预算（每分钟次数 / 突发 / 最小间隔毫秒）
+DEFAULT_BUDGETS: Dict[str, Dict[str, float]] = {
+    "navigation": {"per_minute": 20, "burst": 3, "min_interval_ms": 1000},
+    "api": {"per_minute": 60, "burst": 5, "min_interval_ms": 200},
+}
+
+
+class TokenBucket:
+    """令牌桶：tokens 可以为负，表示已经预约出去、尚未到期的令牌"""
+
+    def __init__(self, per_minute: float, burst: float = 1, min_interval_ms: float = 0, clock: Callable[[], float] = time.monotonic):
+        self.rate = max(float(per_minute), 1e-6) / 60.0
+        self.burst = max(float(burst), 1.0)
+        self.min_interval_s = max(float(min_interval_ms), 0.0) / 1000.0
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._next_allowed = 0.0
+
+    def reserve(self, cost: float = 1) -> float:
+        """预约 cost 个令牌，返回需要等待的秒数（同步执行，调用方随后 sleep）"""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= cost
+        wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        start = max(now + wait, self._next_allowed)
+        self._next_allowed = start + self.min_interval_s
+        return start - now
+
+
+class Pacer:
+    """按类别节流；未配置的类别不限速"""
+
+    def __init__(self, buckets: Dict[str, TokenBucket], *, enabled: bool = True):
+        self.buckets = buckets
+        self.enabled = enabled
+        self.waits: Dict[str, int] = {}
+        self.waited_s: Dict[str, float] = {}
+        # 预约本身不 await；加锁只是为了线程里的同步调用
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "Pacer":
+        config = config or {}
+        buckets = {}
+        for kind, defaults in DEFAULT_BUDGETS.items():
+            merged = {**defaults, **(config.get(kind, {}) or {})}
+            buckets[kind] = TokenBucket(
+                per_minute=float(merged["per_minute"]),
+                burst=float(merged["burst"]),
+                min_interval_ms=float(merged.get("min_interval_ms") or 0),
+            )
+        return cls(buckets, enabled=bool(config.get("enabled", True)))
+
+    def reserve(self, kind: str, cost: float = 1) -> float:
+        bucket = self.buckets.get(kind)
+        if not self.enabled or bucket is None:
+            return 0.0
+        with self._lock:
+            wait = bucket.reserve(cost)
+            if wait > 0:
+                self.waits[kind] = self.waits.get(kind, 0) + 1
+                self.waited_s[kind] = self.waited_s.get(kind, 0.0) + wait
+        return wait
+
+    async def acquire(self, kind: str, cost: float = 1) -> float:
+        """等到本次操作可以发出，返回实际等待的秒数"""
+        wait = self.reserve(kind, cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_blocking(self, kind: str, cost: float = 1) -> float:
+        """同步代码（线程里的 requests 调用等）使用的版本"""
+        wait = self.reserve(kind, cost)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
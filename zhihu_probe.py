@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+变更探测
+不启动浏览器，用 Cookie 备份（zhihu_cookies.json）和 requests 请求一次邀请接口，
+与状态库里的同步游标（上一次完整运行时已经看到的邀请）比较，只有出现新的待处理邀请时才启动完整流程。
+邀请接口结果不确定时再请求一次未读通知数作为后备；仍然判断不了（网络错误、Cookie 缺失等）时按有新任务处理，
+退化为原来的每轮完整运行。超过 max_idle_hours 没有完整运行时也直接启动一次，失败待重试的问题不会被一直搁置。
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from zhihu_session import ME_API, load_cookie_file
+from zhihu_state import STATUS_DISCOVERED
+
+logger = logging.getLogger(__name__)
+
+INVITATIONS_API = "https://www.zhihu.com/api/v4/me/invitations?limit=20&offset=0"
+UNREAD_API = f"{ME_API}?include=default_notifications_count"
+CURSOR_KEY = "sync_cursor"
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def normalize_invitations(payload: Any) -> List[Dict[str, Any]]:
+    """
+    兼容知乎 invitations 接口多种返回结构：
+    - {"data": [ ... ]}
+    - {"data": {"invitation": [ ... ]}}
+    - {"data": {"xxx": [ ... ]}}
+    """
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if isinstance(data, list):
+        return [x for x in data if isinstance(x, dict)]
+
+    if isinstance(data, dict):
+        if isinstance(data.get("invitation"), list):
+            return [x for x in data["invitation"] if isinstance(x, dict)]
+
+        for _, value in data.items():
+            if isinstance(value, list):
+                return [x for x in value if isinstance(x, dict)]
+
+    return []
+
+
+def invitation_qids(payload: Any) -> Optional[List[str]]:
+    """邀请里的问题 id（保持接口顺序）；返回结构不认识时返回 None"""
+    if not isinstance(payload, dict) or "data" not in payload:
+        return None
+    qids: List[str] = []
+    for item in normalize_invitations(payload):
+        question = item.get("question") if isinstance(item.get("question"), dict) else item
+        qid = question.get("id")
+        if qid is not None and str(qid) not in qids:
+            qids.append(str(qid))
+    return qids
+
+
+@dataclass
+class ProbeResult:
+    """一次探测的结论：new_work 为 True 时应启动完整流程"""
+    new_work: bool
+    reason: str
+    source: str = "none"
+    qids: List[str] = field(default_factory=list)
+    new_qids: List[str] = field(default_factory=list)
+    unread: Optional[int] = None
+    http_status: Optional[int] = None
+    requests: int = 0
+    elapsed_ms: int = 0
+
+    def format(self) -> str:
+        verdict = "有新任务，启动完整运行" if self.new_work else "没有新任务，跳过本轮"
+        parts = [f"探测: {verdict}（{self.reason}）", f"请求 {self.requests} 次，耗时 {self.elapsed_ms}ms"]
+        if self.source == "invitations":
+            parts.append(f"邀请 {len(self.qids)} 个，新增 {len(self.new_qids)} 个")
+        if self.unread is not None:
+            parts.append(f"未读通知 {self.unread}")
+        return "，".join(parts)
+
+
+class Probe:
+    """探测器：读取同步游标、请求接口、给出结论；完整运行结束后由调用方 commit 推进游标"""
+
+    def __init__(
+        self,
+        *,
+        cookies: List[dict],
+        state,
+        timeout_s: float = 10,
+        max_idle_hours: float = 24,
+        pacer=None,
+        risk=None,
+    ):
+        self.cookies = cookies
+        self.state = state
+        self.timeout_s = float(timeout_s)
+        self.max_idle_s = float(max_idle_hours) * 3600
+        self.pacer = pacer
+        self.risk = risk
+        self._session = None
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], *, state, pacer=None, risk=None) -> "Probe":
+        config = config or {}
+        return cls(
+            cookies=load_cookie_file(Path(config.get("cookie_file") or "zhihu_cookies.json")),
+            state=state,
+            timeout_s=float(config.get("timeout_seconds", 10)),
+            max_idle_hours=float(config.get("max_idle_hours", 24)),
+            pacer=pacer,
+            risk=risk,
+        )
+
+    # ---- 同步游标 ----
+    def load_cursor(self) -> dict:
+        try:
+            return json.loads(self.state.get_meta(CURSOR_KEY) or "{}")
+        except ValueError:
+            return {}
+
+    def _save_cursor(self, **fields: Any) -> None:
+        cursor = self.load_cursor()
+        cursor.update(fields)
+        self.state.set_meta(CURSOR_KEY, json.dumps(cursor, ensure_ascii=False))
+
+    def commit(self, result: ProbeResult, now: Optional[float] = None) -> None:
+        """
+        完整运行结束后推进游标，记下本轮探测到的邀请；
+        完整运行发现了但受 max_questions 限制没轮到的（状态仍是 discovered）不记，下次探测仍算新任务
+        """
+        now = time.time() if now is None else now
+        fields: Dict[str, Any] = {"synced_at": now}
+        if result.source == "invitations":
+            fields["qids"] = [
+                qid for qid in result.qids if (self.state.get(qid) or {}).get("status") != STATUS_DISCOVERED
+            ]
+        if result.unread is not None:
+            fields["unread"] = result.unread
+        self._save_cursor(**fields)
+
+    # ---- HTTP ----
+    def _client(self):
+        if self._session is None:
+            import requests
+
+            session = requests.Session()
+            session.headers.update(
+                {"User-Agent": USER_AGENT, "Accept": "application/json", "X-Requested-With": "fetch"}
+            )
+            for c in self.cookies:
+                if c.get("name") and c.get("value") is not None:
+                    session.cookies.set(
+                        c["name"], str(c["value"]), domain=c.get("domain") or ".zhihu.com", path=c.get("path") or "/"
+                    )
+            self._session = session
+        return self._session
+
+    def _get_json(self, url: str, result: ProbeResult) -> Tuple[Optional[int], Any]:
+        if self.pacer is not None:
+            self.pacer.acquire_blocking("api")
+        result.requests += 1
+        try:
+            resp = self._client().get(url, timeout=self.timeout_s, allow_redirects=False)
+        except Exception as e:
+            logger.warning(f"探测请求失败: {type(e).__name__}: {e}")
+            return None, None
+        result.http_status = resp.status_code
+        if 300 <= resp.status_code < 400 and self.risk is not None:
+            self.risk.check_url(resp.headers.get("location"), source="probe")
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, None
+
+    # ---- 判定 ----
+    def run(self, now: Optional[float] = None) -> ProbeResult:
+        t0 = time.monotonic()
+        now = time.time() if now is None else now
+        cursor = self.load_cursor()
+        result = self._decide(cursor)
+        # 太久没有完整运行：照常请求（游标需要这次的邀请列表），但结论改为启动完整运行
+        synced_at = cursor.get("synced_at")
+        overdue = not isinstance(synced_at, (int, float)) or now - synced_at >= self.max_idle_s
+        if overdue and not result.new_work and not self._tripped():
+            result.new_work, result.reason = True, "max_idle"
+        result.elapsed_ms = int((time.monotonic() - t0) * 1000)
+        logger.info(result.format())
+        return result
+
+    def _decide(self, cursor: dict) -> ProbeResult:
+        if not any(c.get("name") == "z_c0" and c.get("value") for c in self.cookies):
+            return ProbeResult(True, "no_cookie")
+
+        result = ProbeResult(False, "")
+        status, data = self._get_json(INVITATIONS_API, result)
+        if self._tripped():
+            result.reason = "risk_control"
+            return result
+        if status in (401, 403):
+            # 会话失效交给完整运行：检查登录后会发出“未登录”通知
+            result.new_work, result.reason = True, "session_invalid"
+            return result
+        qids = invitation_qids(data) if status == 200 else None
+        if qids is not None:
+            done = self.state.drafted_ids()
+            seen = set(cursor.get("qids") or [])
+            result.source = "invitations"
+            result.qids = qids
+            result.new_qids = [qid for qid in qids if qid not in done and qid not in seen]
+            result.new_work = bool(result.new_qids)
+            result.reason = "new_invitations" if result.new_work else "no_new_invitations"
+            return result
+
+        # 后备：未读通知数比上次多才算有新任务
+        status, data = self._get_json(UNREAD_API, result)
+        if self._tripped():
+            result.reason = "risk_control"
+            return result
+        unread = data.get("default_notifications_count") if status == 200 and isinstance(data, dict) else None
+        if isinstance(unread, int):
+            previous = cursor.get("unread")
+            result.source = "unread"
+            result.unread = unread
+            result.new_work = unread > 0 and (not isinstance(previous, int) or unread > previous)
+            result.reason = "unread_increased" if result.new_work else "no_new_notifications"
+            if not result.new_work:
+                # 用户读过通知后未读数会变小，记下当前值，之后的增加才能被发现
+                self._save_cursor(unread=unread)
+            return result
+        result.new_work, result.reason = True, "inconclusive"
+        return result
+
+    def _tripped(self) -> bool:
+        return self.risk is not None and self.risk.tripped is not None
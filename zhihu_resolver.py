@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+选择器并发解析
+同时等待所有候选选择器，返回第一个命中的元素及命中的选择器，
+最坏耗时为一次 timeout，而不是 N 次 timeout 累加
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+
+@dataclass
+class SelectorMatch:
+    """选择器命中结果"""
+    selector: str
+    element: Any
+    index: int
+    elapsed_ms: int
+
+
+async def _probe(page, selectors: Sequence[str], start: float, state: str) -> Optional[SelectorMatch]:
+    """不等待，只检查当前 DOM：并发 query_selector，按候选顺序取第一个命中的"""
+
+    async def _query(sel: str):
+        elem = await page.query_selector(sel)
+        if elem is not None and state == "visible" and not await elem.is_visible():
+            return None
+        return elem
+
+    results = await asyncio.gather(*[_query(sel) for sel in selectors], return_exceptions=True)
+    for i, (sel, elem) in enumerate(zip(selectors, results)):
+        if elem is not None and not isinstance(elem, BaseException):
+            return SelectorMatch(sel, elem, i, int((time.monotonic() - start) * 1000))
+    return None
+
+
+async def race_selectors(
+    page,
+    selectors: Sequence[str],
+    *,
+    timeout_ms: int = 5000,
+    state: str = "visible",
+) -> Optional[SelectorMatch]:
+    """
+    并发等待所有候选选择器，返回最先命中的一个（同时命中时取候选列表中靠前的）。
+    timeout_ms <= 0 时只检查当前 DOM，不做等待。
+    全部未命中返回 None。
+    """
+    start = time.monotonic()
+    selectors = [s for s in selectors if s]
+    if not selectors:
+        return None
+    if timeout_ms <= 0:
+        return await _probe(page, selectors, start, state)
+
+    tasks = {
+        asyncio.ensure_future(page.wait_for_selector(sel, timeout=timeout_ms, state=state)): (i, sel)
+        for i, sel in enumerate(selectors)
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winners: List[SelectorMatch] = []
+            for task in done:
+                if task.cancelled() or task.exception() is not None:
+                    continue
+                elem = task.result()
+                if elem is None:
+                    continue
+                i, sel = tasks[task]
+                winners.append(SelectorMatch(sel, elem, i, int((time.monotonic() - start) * 1000)))
+            if winners:
+                return min(winners, key=lambda m: m.index)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return None
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+artifact 保留策略与垃圾回收
+按类别（invitations_* / answers_* / runs/run_* / runs/trace_* / runs/captures/* / logs/scheduled_*）执行 年龄、数量、总大小 三种预算：
+超出预算的旧文件按月压缩进 archive/{类别}_{YYYYMM}.zip（可按类别关闭归档直接删除），
+回答存储中不再被索引引用的 blob 在宽限期后删除。最新的文件始终保留。
+"""
+import logging
+import re
+import time
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+# 类别 -> (相对目录, 文件名正则（第一个分组为时间戳）, 默认预算)
+DEFAULT_CLASSES: Dict[str, Dict[str, Any]] = {
+    "invitations": {
+        "dir": "artifacts", "pattern": r"^invitations_(\d{8}_\d{6})\.json$",
+        "max_age_days": 30, "max_count": 60, "max_total_mb": 200, "archive": True,
+    },
+    "answers": {
+        # 回答正文已在压缩存储里，批量导出文件默认直接删除
+        "dir": "artifacts", "pattern": r"^answers_(\d{8}_\d{6})\.json$",
+        "max_age_days": 30, "max_count": 60, "max_total_mb": 200, "archive": False,
+    },
+    "runs": {
+        "dir": "artifacts/runs", "pattern": r"^run_(\d{8}_\d{6})\.json$",
+        "max_age_days": 90, "max_count": 200, "max_total_mb": 50, "archive": True,
+    },
+    "traces": {
+        "dir": "artifacts/runs", "pattern": r"^trace_(\d{8}_\d{6})\.json$",
+        "max_age_days": 14, "max_count": 30, "max_total_mb": 200, "archive": False,
+    },
+    "captures": {
+        "dir": "artifacts/runs/captures", "pattern": r"^(\d{8}_\d{6})_.+\.(?:trace\.zip|har)$",
+        "max_age_days": 14, "max_count": 200, "max_total_mb": 500, "archive": False,
+    },
+    "logs": {
+        "dir": "logs", "pattern": r"^scheduled_(\d{8}_\d{6})\.log$",
+        "max_age_days": 30, "max_count": 60, "max_total_mb": 200, "archive": True,
+    },
+}
+
+
+@dataclass
+class RetentionClass:
+    """一类 artifact 的保留预算（None 表示不限制）"""
+    name: str
+    directory: Path
+    pattern: str
+    max_age_days: Optional[float] = None
+    max_count: Optional[int] = None
+    max_total_mb: Optional[float] = None
+    archive: bool = True
+
+    def scan(self) -> List[dict]:
+        """列出匹配的文件，按时间从新到旧排序"""
+        regex = re.compile(self.pattern)
+        items = []
+        if not self.directory.exists():
+            return items
+        for path in self.directory.iterdir():
+            m = regex.match(path.name)
+            if not m or not path.is_file():
+                continue
+            stat = path.stat()
+            try:
+                ts = datetime.strptime(m.group(1), TS_FORMAT)
+            except ValueError:
+                ts = datetime.fromtimestamp(stat.st_mtime)
+            items.append({"path": path, "ts": ts, "size": stat.st_size})
+        items.sort(key=lambda x: x["ts"], reverse=True)
+        return items
+
+    def select_expired(self, items: List[dict], now: datetime) -> List[dict]:
+        """按 年龄 / 数量 / 总大小 选出需要清理的文件；最新的一个始终保留"""
+        expired = []
+        total = 0
+        for i, item in enumerate(items):
+            total += item["size"]
+            if i == 0:
+                continue
+            too_old = (
+                self.max_age_days is not None
+                and (now - item["ts"]).total_seconds() > float(self.max_age_days) * 86400
+            )
+            too_many = self.max_count is not None and i >= int(self.max_count)
+            too_big = self.max_total_mb is not None and total > float(self.max_total_mb) * 1024 * 1024
+            if too_old or too_many or too_big:
+                expired.append(item)
+        return expired
+
+
+@dataclass
+class RetentionReport:
+    dry_run: bool
+    classes: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    store: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {"dry_run": self.dry_run, "classes": self.classes, "store": self.store}
+
+    def format(self) -> str:
+        lines = [f"artifact 清理{'（dry-run）' if self.dry_run else ''}:"]
+        for name, c in self.classes.items():
+            lines.append(
+                f"  {name}: files={c['files']} archived={c['archived']} deleted={c['deleted']} "
+                f"freed={c['freed_bytes'] / 1024 / 1024:.1f}MB"
+            )
+        if self.store:
+            lines.append(
+                f"  store: blobs={self.store.get('blobs', 0)} unreferenced={self.store.get('deleted', 0)} "
+                f"freed={self.store.get('freed_bytes', 0) / 1024 / 1024:.1f}MB"
+            )
+        return "\n".join(lines)
+
+
+class Retention:
+    """执行各类别的保留预算、月度归档和回答存储的垃圾回收"""
+
+    def __init__(
+        self,
+        classes: List[RetentionClass],
+        *,
+        archive_dir: Path,
+        store=None,
+        referenced_hashes=None,
+        store_grace_hours: float = 24,
+    ):
+        self.classes = classes
+        self.archive_dir = Path(archive_dir)
+        self.store = store
+        # 返回当前仍被引用的 blob 哈希集合的回调（通常是 StateStore.referenced_hashes）
+        self.referenced_hashes = referenced_hashes
+        self.store_grace_hours = float(store_grace_hours)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], *, base_dir: Path = Path("."), store=None, referenced_hashes=None):
+        config = config or {}
+        overrides = config.get("classes", {}) or {}
+        classes = []
+        for name, defaults in DEFAULT_CLASSES.items():
+            merged = {**defaults, **(overrides.get(name, {}) or {})}
+            classes.append(
+                RetentionClass(
+                    name=name,
+                    directory=Path(base_dir) / merged["dir"],
+                    pattern=merged["pattern"],
+                    max_age_days=merged.get("max_age_days"),
+                    max_count=merged.get("max_count"),
+                    max_total_mb=merged.get("max_total_mb"),
+                    archive=bool(merged.get("archive", True)),
+                )
+            )
+        return cls(
+            classes,
+            archive_dir=Path(base_dir) / str(config.get("archive_dir") or "artifacts/archive"),
+            store=store,
+            referenced_hashes=referenced_hashes,
+            store_grace_hours=float(config.get("store_gc_grace_hours", 24)),
+        )
+
+    def _archive(self, rc: RetentionClass, items: List[dict]) -> None:
+        """按月追加进 zip：同名成员已存在时跳过（重复执行幂等）"""
+        by_month: Dict[str, List[dict]] = {}
+        for item in items:
+            by_month.setdefault(item["ts"].strftime("%Y%m"), []).append(item)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        for month, month_items in by_month.items():
+            zip_path = self.archive_dir / f"{rc.name}_{month}.zip"
+            with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+                existing = set(zf.namelist())
+                for item in month_items:
+                    name = item["path"].name
+                    if name not in existing:
+                        zf.write(item["path"], arcname=name)
+
+    def _collect_store(self, dry_run: bool) -> Dict[str, int]:
+        """删除宽限期之前写入、且不再被回答索引引用的 blob"""
+        if self.store is None or self.referenced_hashes is None:
+            return {}
+        referenced: Set[str] = set(self.referenced_hashes())
+        cutoff = time.time() - self.store_grace_hours * 3600
+        stats = {"blobs": 0, "deleted": 0, "freed_bytes": 0}
+        for path in list(self.store.iter_blobs()):
+            stats["blobs"] += 1
+            digest = path.name.split(".", 1)[0]
+            if digest in referenced:
+                continue
+            stat = path.stat()
+            if stat.st_mtime > cutoff:
+                continue
+            stats["deleted"] += 1
+            stats["freed_bytes"] += stat.st_size
+            if not dry_run:
+                path.unlink()
+        return stats
+
+    def run(self, *, dry_run: bool = False, now: Optional[datetime] = None) -> RetentionReport:
+        now = now or datetime.now()
+        report = RetentionReport(dry_run=dry_run)
+        for rc in self.classes:
+            items = rc.scan()
+            expired = rc.select_expired(items, now)
+            stats = {
+                "files": len(items),
+                "archived": len(expired) if rc.archive else 0,
+                "deleted": len(expired),
+                "freed_bytes": sum(i["size"] for i in expired),
+            }
+            report.classes[rc.name] = stats
+            if dry_run or not expired:
+                continue
+            try:
+                if rc.archive:
+                    self._archive(rc, expired)
+                for item in expired:
+                    item["path"].unlink()
+            except Exception as e:
+                logger.error(f"清理 {rc.name} 失败: {e}")
+        report.store = self._collect_store(dry_run)
+        return report
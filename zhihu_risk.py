@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+风控检测与冷却
+监听浏览器上下文的响应和每个页面的主框架导航，一旦跳转到安全验证页（/account/unhuman 等）立即触发：
+之后所有发往知乎的操作直接抛出 RiskControlTripped（排队中的浏览器操作随之取消），
+并把冷却截止时间写入文件；冷却期内的定时运行在启动浏览器之前就退出。
+连续触发时冷却时间按倍数增长（有上限），一次干净的运行后清零。
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COOLDOWN_FILE = Path("zhihu_risk_cooldown.json")
+
+# 安全验证页的路径特征
+VERIFICATION_MARKERS = ("/account/unhuman",)
+
+
+class RiskControlTripped(RuntimeError):
+    """本次运行已触发风控，不再访问知乎"""
+
+
+def is_verification_url(url: Optional[str]) -> bool:
+    url = url or ""
+    return any(marker in url for marker in VERIFICATION_MARKERS)
+
+
+def cooldown_file_from_config(config: Optional[dict]) -> Path:
+    return Path(((config or {}).get("risk", {}) or {}).get("cooldown_file") or DEFAULT_COOLDOWN_FILE)
+
+
+def _load(path: Path) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")) or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def active_cooldown(path: Path = DEFAULT_COOLDOWN_FILE, now: Optional[float] = None) -> Optional[dict]:
+    """冷却期内返回冷却记录，否则返回 None（只读一个小文件，供启动前快速检查）"""
+    data = _load(path)
+    until = data.get("until")
+    now = time.time() if now is None else now
+    if isinstance(until, (int, float)) and until > now:
+        return data
+    return None
+
+
+def format_cooldown(data: dict, now: Optional[float] = None) -> str:
+    now = time.time() if now is None else now
+    remaining_min = max(0, int((float(data.get("until") or now) - now) / 60))
+    until = time.strftime("%Y-%m-%d %H:%M", time.localtime(float(data.get("until") or now)))
+    return (
+        f"风控冷却中：截至 {until}（剩余约 {remaining_min} 分钟，第 {data.get('count', 1)} 次触发）"
+        f"，触发页面 {data.get('url') or ''}"
+    )
+
+
+class RiskGuard:
+    """风控检测器：挂在浏览器上下文上，触发后拒绝后续操作并写入冷却文件"""
+
+    def __init__(
+        self,
+        *,
+        cooldown_file: Path = DEFAULT_COOLDOWN_FILE,
+        cooldown_minutes: float = 120,
+        max_cooldown_hours: float = 24,
+        enabled: bool = True,
+    ):
+        self.cooldown_file = Path(cooldown_file)
+        self.cooldown_s = float(cooldown_minutes) * 60
+        self.max_cooldown_s = float(max_cooldown_hours) * 3600
+        self.enabled = enabled
+        self.tripped: Optional[Dict[str, Any]] = None
+        # 触发时的回调（发通知、更新指标等），回调异常不影响检测本身
+        self.listeners: List[Callable[[dict], None]] = []
+        self._paused = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "RiskGuard":
+        config = config or {}
+        return cls(
+            cooldown_file=Path(config.get("cooldown_file") or DEFAULT_COOLDOWN_FILE),
+            cooldown_minutes=float(config.get("cooldown_minutes", 120)),
+            max_cooldown_hours=float(config.get("max_cooldown_hours", 24)),
+            enabled=bool(config.get("enabled", True)),
+        )
+
+    # ---- 浏览器事件 ----
+    def attach(self, context) -> None:
+        context.on("response", self._on_response)
+        context.on("page", self._watch_page)
+        for page in context.pages:
+            self._watch_page(page)
+
+    def _watch_page(self, page) -> None:
+        def _on_navigated(frame) -> None:
+            if frame == page.main_frame:
+                self.check_url(frame.url, source="navigation")
+
+        page.on("framenavigated", _on_navigated)
+
+    def _on_response(self, response) -> None:
+        url = response.url or ""
+        if is_verification_url(url):
+            self.check_url(url, source="response")
+            return
+        # 接口被 302 到验证页时，响应本身的 URL 还是原接口
+        if 300 <= response.status < 400:
+            location = (response.headers or {}).get("location", "")
+            if is_verification_url(location):
+                self.check_url(location, source="redirect")
+
+    # ---- 判定 ----
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """有人值守的流程（扫码登录、手动过验证）里暂停检测，验证页只提示不触发冷却"""
+        self._paused += 1
+        try:
+            yield
+        finally:
+            self._paused -= 1
+
+    def check_url(self, url: Optional[str], *, source: str = "check") -> bool:
+        """url 是验证页时触发并返回 True"""
+        if not is_verification_url(url):
+            return False
+        if self._paused:
+            logger.warning("检测到安全验证/风控页面，请在打开的浏览器窗口完成验证后等待程序继续...")
+            return True
+        self.trip(url or "", source=source)
+        return True
+
+    def trip(self, url: str, *, source: str = "check", now: Optional[float] = None) -> None:
+        if self.tripped is not None:
+            return
+        if not self.enabled:
+            logger.warning(f"检测到安全验证页（{source}: {url}），风控检测已关闭，继续运行")
+            return
+        now = time.time() if now is None else now
+        previous = _load(self.cooldown_file)
+        # 上一次冷却结束后不久又触发，冷却时间翻倍
+        recent = isinstance(previous.get("until"), (int, float)) and now - previous["until"] < self.max_cooldown_s
+        count = int(previous.get("count") or 0) + 1 if recent else 1
+        cooldown_s = min(self.cooldown_s * (2 ** (count - 1)), self.max_cooldown_s)
+        self.tripped = {
+            "tripped_at": now,
+            "until": now + cooldown_s,
+            "count": count,
+            "url": url,
+            "source": source,
+        }
+        try:
+            tmp = self.cooldown_file.with_name(self.cooldown_file.name + ".tmp")
+            tmp.write_text(json.dumps(self.tripped, ensure_ascii=False, indent=2), encoding="utf-8")
+            tmp.replace(self.cooldown_file)
+        except OSError as e:
+            logger.error(f"写入风控冷却文件失败: {e}")
+        logger.error(
+            f"⚠️ 触发知乎安全验证（{source}: {url}），本次运行停止访问知乎，"
+            f"冷却 {int(cooldown_s / 60)} 分钟（第 {count} 次）"
+        )
+        for listener in self.listeners:
+            try:
+                listener(self.tripped)
+            except Exception:
+                pass
+
+    def raise_if_tripped(self) -> None:
+        if self.tripped is not None:
+            raise RiskControlTripped(f"risk control tripped: {self.tripped.get('url')}")
+
+    def clear(self) -> None:
+        """一次干净的运行结束后清除冷却记录（连续触发计数归零）"""
+        if self.tripped is None and self.cooldown_file.exists():
+            try:
+                self.cooldown_file.unlink()
+            except OSError:
+                pass
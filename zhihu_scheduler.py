@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+内置定时调度
+schedule 段里的 cron 规则（分 时 日 月 周，本地时间）决定每轮的触发时间，再加上随机抖动，
+避免每天固定在同一秒访问知乎。每轮运行前取得实例锁（非阻塞的排他文件锁）：
+持久化浏览器目录和状态文件（processed_invitations.json、状态库）同一时间只允许一个进程使用，
+上一轮（或手动启动的运行）还没结束时，本轮直接跳过而不是叠加运行。
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_FILE = Path("zhihu_bot.lock")
+
+# 字段名, 最小值, 最大值（周字段 0 和 7 都表示周日）
+_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_field(text: str, low: int, high: int, name: str) -> Set[int]:
+    values: Set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"invalid step in cron {name}: {text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron {name} out of range: {text}")
+        values.update(range(start, end + 1, step))
+    if name == "weekday":
+        values = {v % 7 for v in values}
+    return values
+
+
+@dataclass
+class CronRule:
+    """一条 cron 规则；options 为该规则触发时覆盖的运行参数（例如 max_questions）"""
+    expr: str
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        parts = self.expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron expression needs 5 fields (minute hour day month weekday): {self.expr!r}")
+        parsed = [_parse_field(p, low, high, name) for p, (name, low, high) in zip(parts, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        # 与 cron 相同：日和周都受限时，满足其一即可
+        self._day_any = parts[2] == "*"
+        self._weekday_any = parts[4] == "*"
+
+    def _day_matches(self, d: datetime) -> bool:
+        if d.month not in self.months:
+            return False
+        day_ok = d.day in self.days
+        # cron 的周日为 0，Python 的周一为 0
+        weekday_ok = (d.weekday() + 1) % 7 in self.weekdays
+        if self._day_any or self._weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """after 之后（不含）的下一次触发时间"""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"cron expression never fires: {self.expr!r}")
+
+
+class InstanceLock:
+    """
+    非阻塞的排他文件锁（POSIX 用 fcntl，Windows 用 msvcrt）。
+    锁随进程退出自动释放，不会因为崩溃留下需要手动删除的锁；文件内容只是持有者信息，便于排查
+    """
+
+    def __init__(self, path: Path = DEFAULT_LOCK_FILE):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._lock(fd)
+        except OSError:
+            os.close(fd)
+            return False
+        info = json.dumps({"pid": os.getpid(), "started_at": datetime.now().isoformat(timespec="seconds")})
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, info.encode("utf-8"))
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            os.ftruncate(self._fd, 0)
+            self._unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def holder(self) -> dict:
+        """当前持有者信息（pid / started_at），读不到时返回空字典"""
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8") or "{}")
+        except (OSError, ValueError):
+            return {}
+
+    def describe(self) -> str:
+        info = self.holder()
+        if not info:
+            return str(self.path)
+        return f"pid={info.get('pid')} started_at={info.get('started_at')}"
+
+    def __enter__(self) -> "InstanceLock":
+        if not self.acquire():
+            raise RuntimeError(f"another instance is running: {self.describe()}")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    @staticmethod
+    def _lock(fd: int) -> None:
+        if os.name == "nt":
+            import msvcrt
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    @staticmethod
+    def _unlock(fd: int) -> None:
+        if os.name == "nt":
+            import msvcrt
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def lock_file_from_config(config: Optional[dict]) -> Path:
+    return Path(((config or {}).get("schedule", {}) or {}).get("lock_file") or DEFAULT_LOCK_FILE)
+
+
+class Scheduler:
+    """按 cron 规则 + 随机抖动循环执行 job；job 运行期间错过的触发直接跳过，不补跑"""
+
+    def __init__(
+        self,
+        rules: List[CronRule],
+        *,
+        jitter_s: float = 0,
+        rng: Optional[random.Random] = None,
+        now_fn: Callable[[], datetime] = datetime.now,
+    ):
+        if not rules:
+            raise ValueError("schedule.rules is empty")
+        self.rules = rules
+        self.jitter_s = max(0.0, float(jitter_s))
+        self.rng = rng or random.Random()
+        self.now_fn = now_fn
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "Scheduler":
+        config = config or {}
+        rules = []
+        for item in config.get("rules") or []:
+            if isinstance(item, str):
+                rules.append(CronRule(item))
+            else:
+                item = dict(item)
+                rules.append(CronRule(str(item.pop("cron")), options=item))
+        return cls(rules, jitter_s=float(config.get("jitter_minutes", 10)) * 60)
+
+    def next_fire(self, after: datetime) -> Tuple[datetime, CronRule]:
+        """下一次触发的规则和时间（已加上抖动；抖动只往后推，不会早于规则时间）"""
+        fire, rule = min(((r.next_after(after), r) for r in self.rules), key=lambda x: x[0])
+        if self.jitter_s:
+            fire += timedelta(seconds=self.rng.uniform(0, self.jitter_s))
+        return fire, rule
+
+    def missed_between(self, start: datetime, end: datetime, limit: int = 1000) -> int:
+        """(start, end] 之间本应触发的次数（用于记录被跳过的轮次）"""
+        count = 0
+        for rule in self.rules:
+            t = rule.next_after(start)
+            while t <= end and count < limit:
+                count += 1
+                t = rule.next_after(t)
+        return count
+
+    async def run_forever(
+        self,
+        job: Callable[[CronRule], Awaitable[Any]],
+        *,
+        stop: Optional[asyncio.Event] = None,
+        max_cycles: Optional[int] = None,
+    ) -> int:
+        """循环执行，直到 stop 被设置或执行满 max_cycles 轮；返回执行的轮数"""
+        stop = stop or asyncio.Event()
+        cycles = 0
+        after = self.now_fn()
+        while not stop.is_set() and (max_cycles is None or cycles < max_cycles):
+            fire_at, rule = self.next_fire(after)
+            logger.info(f"⏰ 下一轮运行: {fire_at.isoformat(timespec='seconds')}（规则 {rule.expr}）")
+            delay = (fire_at - self.now_fn()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(stop.wait(), delay)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+            t0 = time.monotonic()
+            try:
+                await job(rule)
+            except Exception as e:
+                logger.error(f"定时运行失败: {type(e).__name__}: {e}")
+            cycles += 1
+            after = self.now_fn()
+            missed = self.missed_between(fire_at, after)
+            if missed:
+                logger.warning(
+                    f"本轮运行 {time.monotonic() - t0:.0f}s，期间错过 {missed} 次触发，已跳过（不补跑）"
+                )
+        return cycles
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+登录态校验
+快速路径：通过浏览器上下文的 request API 请求一次 /api/v4/me（共享上下文的 Cookie，不打开页面），
+最近一次成功的校验结果连同 z_c0 指纹缓存在会话文件里，TTL 内且 Cookie 未变化时不再发请求；
+只有接口结果不确定（网络错误、5xx、被重定向到验证页等）时，才回退到打开首页 + DOM 判定的慢路径。
+会话文件同时记录登录 Cookie（z_c0）的到期时间，提前提醒重新登录，剩余时间不够跑完一轮时拒绝开始运行。
+"""
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ME_API = "https://www.zhihu.com/api/v4/me"
+AUTH_COOKIE = "z_c0"
+# 扫码登录过程中会请求的接口（等待登录时收到这些响应才去看一眼 Cookie）
+LOGIN_RESPONSE_MARKERS = ("/api/v3/account/api/login", "/api/v3/oauth/sign_in", "/api/v4/me")
+
+VALID = "valid"
+INVALID = "invalid"
+INCONCLUSIVE = "inconclusive"
+
+
+@dataclass
+class SessionCheck:
+    """一次登录态校验的结果：status 为 valid / invalid / inconclusive"""
+    status: str
+    source: str
+    http_status: Optional[int] = None
+    user: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def valid(self) -> bool:
+        return self.status == VALID
+
+
+def cookie_fingerprint(cookies: List[dict], name: str = AUTH_COOKIE) -> Optional[str]:
+    """登录 Cookie 的指纹（不保存原值）；没有该 Cookie 时返回 None"""
+    for c in cookies or []:
+        if c.get("name") == name and c.get("value"):
+            return hashlib.sha256(str(c["value"]).encode("utf-8")).hexdigest()[:16]
+    return None
+
+
+async def probe_me(request, *, timeout_ms: int = 8000) -> SessionCheck:
+    """
+    请求一次 /api/v4/me。200 且返回用户信息 -> valid；401/403 -> invalid；
+    其余（网络错误、5xx、跳转到验证页、非 JSON）-> inconclusive
+    """
+    try:
+        resp = await request.get(
+            ME_API,
+            headers={"Accept": "application/json", "X-Requested-With": "fetch"},
+            timeout=timeout_ms,
+            max_redirects=0,
+        )
+    except Exception as e:
+        return SessionCheck(INCONCLUSIVE, "api", error=f"{type(e).__name__}: {e}"[:200])
+
+    status = resp.status
+    if status in (401, 403):
+        return SessionCheck(INVALID, "api", http_status=status)
+    if status != 200:
+        return SessionCheck(INCONCLUSIVE, "api", http_status=status, error=f"HTTP {status}")
+    try:
+        data = await resp.json()
+    except Exception as e:
+        return SessionCheck(INCONCLUSIVE, "api", http_status=status, error=f"non-json: {e}"[:200])
+    if not isinstance(data, dict) or not (data.get("id") or data.get("url_token")):
+        return SessionCheck(INCONCLUSIVE, "api", http_status=status, error="unexpected body")
+    user = {k: data.get(k) for k in ("id", "url_token", "name") if data.get(k)}
+    return SessionCheck(VALID, "api", http_status=status, user=user)
+
+
+class SessionFile:
+    """与 Cookie 一起保存的会话元数据（JSON）：最近一次成功校验的时间、用户、z_c0 指纹"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8")) or {}
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, **fields: Any) -> dict:
+        data = self.load()
+        data.update(fields)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+        return data
+
+    def cached_valid(self, fingerprint: Optional[str], ttl_s: float, now: Optional[float] = None) -> Optional[dict]:
+        """TTL 内且 z_c0 未变化时返回缓存的校验记录"""
+        if not fingerprint or ttl_s <= 0:
+            return None
+        data = self.load()
+        validated_at = data.get("validated_at")
+        if data.get("fingerprint") != fingerprint or not isinstance(validated_at, (int, float)):
+            return None
+        now = time.time() if now is None else now
+        if 0 <= now - validated_at <= ttl_s:
+            return data
+        return None
+
+    def record_valid(self, fingerprint: Optional[str], check: SessionCheck, now: Optional[float] = None) -> None:
+        self.update(
+            validated_at=time.time() if now is None else now,
+            fingerprint=fingerprint,
+            user=check.user,
+        )
+
+    def invalidate(self) -> None:
+        self.update(validated_at=None)
+
+
+# ---- 会话到期预测 ----
+def cookie_expiry(cookies: List[dict], names: List[str]) -> Optional[Dict[str, Any]]:
+    """names 中最早到期的登录 Cookie；会话 Cookie（expires=-1）不计入"""
+    earliest = None
+    for c in cookies or []:
+        if c.get("name") not in names or not c.get("value"):
+            continue
+        expires = c.get("expires")
+        if not isinstance(expires, (int, float)) or expires <= 0:
+            continue
+        if earliest is None or expires < earliest["expires_at"]:
+            earliest = {"cookie": c["name"], "expires_at": float(expires)}
+    return earliest
+
+
+def load_cookie_file(path: Path) -> List[dict]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+@dataclass
+class SessionHealth:
+    """会话健康状况：最近一次成功校验、预计到期时间，以及是否需要提醒 / 拒绝开始运行"""
+    expires_at: Optional[float]
+    cookie: Optional[str]
+    source: str
+    validated_at: Optional[float]
+    now: float
+    warn_before_s: float
+    min_remaining_s: float
+
+    @property
+    def remaining_s(self) -> Optional[float]:
+        return None if self.expires_at is None else self.expires_at - self.now
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_s is not None and self.remaining_s <= 0
+
+    @property
+    def expiring_soon(self) -> bool:
+        return self.remaining_s is not None and self.remaining_s <= self.warn_before_s
+
+    @property
+    def blocks_run(self) -> bool:
+        """剩余时间不够跑完一轮（会在运行中途过期），不应开始生成"""
+        return self.remaining_s is not None and self.remaining_s <= self.min_remaining_s
+
+    def as_dict(self) -> dict:
+        return {
+            "cookie": self.cookie,
+            "source": self.source,
+            "expires_at": _iso(self.expires_at),
+            "remaining_hours": None if self.remaining_s is None else round(self.remaining_s / 3600, 1),
+            "validated_at": _iso(self.validated_at),
+            "expiring_soon": self.expiring_soon,
+            "blocks_run": self.blocks_run,
+        }
+
+    def format(self) -> str:
+        d = self.as_dict()
+        if self.expires_at is None:
+            expiry = "未知（没有带过期时间的登录 Cookie）"
+        elif self.expired:
+            expiry = f"已于 {d['expires_at']} 过期"
+        else:
+            expiry = f"{d['expires_at']}（剩余 {d['remaining_hours']} 小时，来源 {self.source}:{self.cookie}）"
+        lines = [f"会话到期: {expiry}", f"最近一次校验通过: {d['validated_at'] or '无记录'}"]
+        if self.blocks_run:
+            lines.append(f"⚠️ 剩余时间不足 {self.min_remaining_s / 3600:g} 小时，运行会在中途失效，请重新登录: python main.py --login")
+        elif self.expiring_soon:
+            lines.append(f"⚠️ 会话将在 {self.warn_before_s / 86400:g} 天内过期，请尽快重新登录: python main.py --login")
+        return "\n".join(lines)
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+
+def forecast_session(
+    *,
+    context_cookies: Optional[List[dict]],
+    cookie_file: Path,
+    session_file: SessionFile,
+    config: Optional[dict] = None,
+    now: Optional[float] = None,
+) -> SessionHealth:
+    """优先使用浏览器上下文里的 Cookie（最新），没有时读取 Cookie 备份文件"""
+    config = config or {}
+    names = list(config.get("auth_cookies") or [AUTH_COOKIE])
+    now = time.time() if now is None else now
+    source = "context"
+    expiry = cookie_expiry(context_cookies or [], names)
+    if expiry is None:
+        source = "cookie_file"
+        expiry = cookie_expiry(load_cookie_file(cookie_file), names)
+    validated_at = session_file.load().get("validated_at")
+    return SessionHealth(
+        expires_at=expiry["expires_at"] if expiry else None,
+        cookie=expiry["cookie"] if expiry else None,
+        source=source if expiry else "none",
+        validated_at=validated_at if isinstance(validated_at, (int, float)) else None,
+        now=now,
+        warn_before_s=float(config.get("warn_before_days", 7)) * 86400,
+        min_remaining_s=float(config.get("min_remaining_hours", 6)) * 3600,
+    )
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+轻量计时 span
+记录运行里每个阶段/子步骤的耗时，run_id / qid / 父 span 通过 contextvars 传递，
+并发的 asyncio 任务各自继承创建时的上下文，嵌套 span 不需要手动传参。
+kind="stage" 的 span 是顶层阶段（写入 run summary 的 stage_events，供 --stats 查询），
+其余为子步骤，用于按问题拆解耗时；整次运行可导出为 Chrome trace-event JSON（Perfetto / chrome://tracing）
+"""
+import functools
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from zhihu_stats import percentile
+
+_run_id: ContextVar[Optional[str]] = ContextVar("zhihu_run_id", default=None)
+_qid: ContextVar[Optional[str]] = ContextVar("zhihu_qid", default=None)
+_parent: ContextVar[Optional["Span"]] = ContextVar("zhihu_parent_span", default=None)
+
+
+@dataclass
+class Span:
+    """一次计时：start 为墙钟时间（秒），duration_ms 在结束时填写"""
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    run_id: Optional[str]
+    qid: Optional[str]
+    kind: str = "step"
+    start: float = 0.0
+    duration_ms: Optional[int] = None
+    ok: Optional[bool] = None
+    error: Optional[str] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_event(self) -> dict:
+        """stage span -> run summary 里的 stage_events 条目"""
+        event = {"stage": self.name, "qid": self.qid, "ms": self.duration_ms, "ok": bool(self.ok)}
+        if self.error:
+            event["error"] = self.error
+        event.update(self.attrs)
+        return event
+
+
+class Tracer:
+    """收集一次运行的全部 span"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        # span 结束时的回调（例如更新 Prometheus 指标），回调异常不影响业务流程
+        self.listeners: List[Callable[[Span], None]] = []
+
+    def reset(self, run_id: Optional[str] = None) -> None:
+        """开始新的运行：清空已记录的 span，并设置当前上下文的 run_id"""
+        self.spans = []
+        _run_id.set(run_id)
+
+    @staticmethod
+    def set_run_id(run_id: Optional[str]) -> None:
+        _run_id.set(run_id)
+
+    @staticmethod
+    def current_run_id() -> Optional[str]:
+        return _run_id.get()
+
+    @staticmethod
+    def current_qid() -> Optional[str]:
+        return _qid.get()
+
+    @contextmanager
+    def bind(self, *, qid: Optional[str]) -> Iterator[None]:
+        """在代码块内把 qid 作为后续 span 的默认属性"""
+        token = _qid.set(qid)
+        try:
+            yield
+        finally:
+            _qid.reset(token)
+
+    @contextmanager
+    def span(self, name: str, *, qid: Optional[str] = None, kind: str = "step", **attrs: Any) -> Iterator[Span]:
+        """
+        计时一个代码块。异常会记为失败并继续抛出；
+        未显式设置 ok 时，正常结束即视为成功
+        """
+        parent = _parent.get()
+        qid = qid if qid is not None else _qid.get()
+        span = Span(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=parent.span_id if parent else None,
+            run_id=_run_id.get(),
+            qid=qid,
+            kind=kind,
+            start=time.time(),
+            attrs=dict(attrs),
+        )
+        parent_token = _parent.set(span)
+        qid_token = _qid.set(qid)
+        t0 = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.ok = False
+            span.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            span.duration_ms = int((time.perf_counter() - t0) * 1000)
+            if span.ok is None:
+                span.ok = True
+            _qid.reset(qid_token)
+            _parent.reset(parent_token)
+            self.spans.append(span)
+            for listener in self.listeners:
+                try:
+                    listener(span)
+                except Exception:
+                    pass
+
+    def record(
+        self,
+        name: str,
+        *,
+        start: float,
+        duration_ms: int,
+        qid: Optional[str] = None,
+        ok: bool = True,
+        **attrs: Any,
+    ) -> Span:
+        """记录一段在别处计时的事件（例如后台线程里的文件写入），可用 lane 属性指定时间线"""
+        span = Span(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=None,
+            run_id=_run_id.get(),
+            qid=qid,
+            start=start,
+            duration_ms=int(duration_ms),
+            ok=ok,
+            attrs=dict(attrs),
+        )
+        self.spans.append(span)
+        return span
+
+    # ---- 汇总 ----
+    def stage_events(self) -> List[dict]:
+        return [s.to_event() for s in self.spans if s.kind == "stage"]
+
+    def per_qid(self) -> Dict[str, Dict[str, int]]:
+        """每个问题各 span 名称的累计耗时（毫秒）"""
+        result: Dict[str, Dict[str, int]] = {}
+        for s in self.spans:
+            if not s.qid or s.duration_ms is None:
+                continue
+            bucket = result.setdefault(s.qid, {})
+            bucket[s.name] = bucket.get(s.name, 0) + s.duration_ms
+        return result
+
+    def percentiles(self) -> Dict[str, Dict[str, Any]]:
+        """按 span 名称聚合：次数 / 失败数 / p50 / p95 / max / 总耗时"""
+        grouped: Dict[str, List[Span]] = {}
+        for s in self.spans:
+            if s.duration_ms is not None:
+                grouped.setdefault(s.name, []).append(s)
+        result = {}
+        for name in sorted(grouped):
+            values = sorted(s.duration_ms for s in grouped[name])
+            result[name] = {
+                "count": len(values),
+                "failed": sum(1 for s in grouped[name] if not s.ok),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "max_ms": values[-1],
+                "total_ms": sum(values),
+            }
+        return result
+
+
+def traced(name: str, *, kind: str = "step", qid: Optional[Callable[..., Optional[str]]] = None):
+    """
+    给 ZhihuAutoAnswer 的异步方法加 span（要求实例有 tracer 属性）。
+    qid 为可选的取值函数，参数与被装饰方法相同（不含 self）
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            with self.tracer.span(name, kind=kind, qid=qid(*args, **kwargs) if qid else None):
+                return await fn(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def to_chrome_trace(spans: List[Span], *, run_id: Optional[str] = None) -> dict:
+    """
+    导出 Chrome trace-event JSON：每个 span 是一个完整事件（ph=X），
+    运行级别的 span 在 "run" 时间线，每个问题一条时间线，lane 属性指定的事件（如文件写入）单独一条
+    """
+    finished = [s for s in spans if s.duration_ms is not None]
+    if not finished:
+        return {"traceEvents": [], "displayTimeUnit": "ms", "otherData": {"run_id": run_id}}
+    origin = min(s.start for s in finished)
+    lanes: Dict[str, int] = {"run": 0}
+
+    def _tid(span: Span) -> int:
+        lane = span.attrs.get("lane") or (f"qid {span.qid}" if span.qid else "run")
+        if lane not in lanes:
+            lanes[lane] = len(lanes)
+        return lanes[lane]
+
+    events = []
+    for span in sorted(finished, key=lambda s: (s.start, -(s.duration_ms or 0))):
+        args = {k: v for k, v in span.attrs.items() if k != "lane"}
+        if span.qid:
+            args["qid"] = span.qid
+        if not span.ok:
+            args["ok"] = False
+        if span.error:
+            args["error"] = span.error
+        events.append(
+            {
+                "name": span.name,
+                "cat": span.kind,
+                "ph": "X",
+                "ts": int((span.start - origin) * 1_000_000),
+                "dur": int(span.duration_ms * 1000),
+                "pid": 1,
+                "tid": _tid(span),
+                "args": args,
+            }
+        )
+    meta = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": f"zhihu run {run_id or ''}".strip()}}]
+    meta += [
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}}
+        for lane, tid in lanes.items()
+    ]
+    meta += [
+        {"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid, "args": {"sort_index": tid}}
+        for tid in lanes.values()
+    ]
+    return {"traceEvents": meta + events, "displayTimeUnit": "ms", "otherData": {"run_id": run_id}}
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+运行状态存储（SQLite WAL）
+统一记录每个问题的处理状态、草稿指纹、运行检查点和每次运行的 summary，替代整文件重写的
+processed_invitations.json；多个进程同时写入也不会损坏状态
+
+问题状态机：discovered -> detailed -> generated -> drafted，任一阶段可转为 failed，
+failed 可以重新进入任一前序阶段重试；drafted 为终态
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+STATUS_DISCOVERED = "discovered"
+STATUS_DETAILED = "detailed"
+STATUS_GENERATED = "generated"
+STATUS_DRAFTED = "drafted"
+STATUS_FAILED = "failed"
+
+# 正常流程的先后顺序（failed 不参与排序）
+_STATUS_RANK = {
+    STATUS_DISCOVERED: 0,
+    STATUS_DETAILED: 1,
+    STATUS_GENERATED: 2,
+    STATUS_DRAFTED: 3,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    qid TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    failed_stage TEXT,
+    error TEXT,
+    answer_len INTEGER,
+    answer_artifact TEXT,
+    generated_at TEXT,
+    draft_hash TEXT,
+    draft_method TEXT,
+    drafted_at TEXT,
+    run_id TEXT,
+    timings TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_status ON questions(status);
+CREATE INDEX IF NOT EXISTS idx_questions_updated_at ON questions(updated_at);
+
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT,
+    ended_at TEXT,
+    mode TEXT,
+    selected INTEGER,
+    draft_saved_ok INTEGER,
+    failures INTEGER,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+
+-- 回答产物索引：resume 检查只读这里，不打开压缩 blob
+CREATE TABLE IF NOT EXISTS answers (
+    qid TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    status INTEGER,
+    answer_len INTEGER NOT NULL DEFAULT 0,
+    answer_hash TEXT,
+    raw_hash TEXT,
+    generated_at TEXT,
+    text_prefix TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_answers_ok ON answers(ok);
+
+-- 运行检查点：本次运行选中的问题及顺序，以及每个问题在本次运行里完成到哪个阶段
+CREATE TABLE IF NOT EXISTS run_checkpoints (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    finished_at TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_checkpoints_finished ON run_checkpoints(finished_at, started_at);
+
+CREATE TABLE IF NOT EXISTS run_plan (
+    run_id TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    qid TEXT NOT NULL,
+    stage TEXT NOT NULL DEFAULT 'planned',
+    updated_at TEXT,
+    PRIMARY KEY (run_id, pos)
+);
+CREATE INDEX IF NOT EXISTS idx_run_plan_qid ON run_plan(run_id, qid);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# 检查点里单个问题的阶段顺序
+_PLAN_STAGE_RANK = {
+    "planned": 0,
+    STATUS_DETAILED: 1,
+    STATUS_GENERATED: 2,
+    STATUS_DRAFTED: 3,
+}
+
+
+def can_transition(current: Optional[str], new: str) -> bool:
+    """状态机校验：只允许前进（或进入/离开 failed），drafted 之后不再变化"""
+    if current is None or current == STATUS_FAILED:
+        return True
+    if current == STATUS_DRAFTED:
+        return False
+    if new == STATUS_FAILED:
+        return True
+    return _STATUS_RANK[new] >= _STATUS_RANK[current]
+
+
+class StateStore:
+    """SQLite（WAL 模式）状态存储"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # isolation_level=None：自动提交，事务显式 BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self) -> None:
+        """旧版数据库补齐后来新增的列"""
+        added = {"questions": {"timings": "TEXT"}}
+        for table, columns in added.items():
+            existing = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+            for name, decl in columns.items():
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---- 事务 ----
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ---- meta ----
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    # ---- 问题状态 ----
+    def _transition(self, conn, qid: str, status: str, fields: Dict[str, Any]) -> bool:
+        now = datetime.now().isoformat()
+        row = conn.execute("SELECT status FROM questions WHERE qid = ?", (qid,)).fetchone()
+        current = row["status"] if row else None
+        if not can_transition(current, status):
+            # 不允许回退状态，但补充的字段（如标题、内容）仍然更新
+            status = current
+        if status != STATUS_FAILED:
+            fields = dict(fields, failed_stage=None, error=None) if current == STATUS_FAILED else fields
+        if row is None:
+            cols = ["qid", "status", "created_at", "updated_at"] + list(fields)
+            values = [qid, status, now, now] + list(fields.values())
+            conn.execute(
+                f"INSERT INTO questions({', '.join(cols)}) VALUES({', '.join('?' * len(cols))})",
+                values,
+            )
+        else:
+            sets = ["status = ?", "updated_at = ?"] + [f"{k} = ?" for k in fields]
+            conn.execute(
+                f"UPDATE questions SET {', '.join(sets)} WHERE qid = ?",
+                [status, now] + list(fields.values()) + [qid],
+            )
+        return status != current
+
+    def advance(self, qid: str, status: str, **fields: Any) -> bool:
+        """推进单个问题的状态（单行事务更新），返回状态是否发生变化"""
+        if status not in _STATUS_RANK and status != STATUS_FAILED:
+            raise ValueError(f"unknown status: {status}")
+        fields = {k: v for k, v in fields.items() if v is not None}
+        with self._transaction() as conn:
+            return self._transition(conn, qid, status, fields)
+
+    def mark_discovered(self, items: Iterable[Dict[str, str]], run_id: Optional[str] = None) -> None:
+        """批量登记新发现的问题（已存在的问题只更新标题/链接）"""
+        with self._transaction() as conn:
+            for item in items:
+                self._transition(conn, item["qid"], STATUS_DISCOVERED, {
+                    "title": item.get("title") or "",
+                    "url": item.get("url") or "",
+                    **({"run_id": run_id} if run_id else {}),
+                })
+
+    def mark_detailed(self, qid: str, content: str) -> bool:
+        return self.advance(qid, STATUS_DETAILED, content=content or "")
+
+    def mark_generated(self, qid: str, *, answer_len: int, answer_artifact: str = "", generated_at: str = "") -> bool:
+        return self.advance(
+            qid, STATUS_GENERATED,
+            answer_len=answer_len, answer_artifact=answer_artifact, generated_at=generated_at or None,
+        )
+
+    def mark_failed(self, qid: str, stage: str, error: str = "") -> bool:
+        return self.advance(qid, STATUS_FAILED, failed_stage=stage, error=(error or "")[:2000])
+
+    def mark_drafted(self, qid: str) -> bool:
+        return self.advance(qid, STATUS_DRAFTED, drafted_at=datetime.now().isoformat())
+
+    def record_draft_hash(self, qid: str, content_hash: str, method: Optional[str] = None) -> None:
+        """记录草稿内容指纹（不改变状态）"""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE questions SET draft_hash = ?, draft_method = ?, updated_at = ? WHERE qid = ?",
+                (content_hash, method, now, qid),
+            )
+            if cur.rowcount == 0:
+                conn.execute(
+                    "INSERT INTO questions(qid, status, draft_hash, draft_method, created_at, updated_at) "
+                    "VALUES(?, ?, ?, ?, ?, ?)",
+                    (qid, STATUS_DISCOVERED, content_hash, method, now, now),
+                )
+
+    def get(self, qid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM questions WHERE qid = ?", (qid,)).fetchone()
+        return dict(row) if row else None
+
+    def get_draft_hash(self, qid: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT draft_hash FROM questions WHERE qid = ?", (qid,)).fetchone()
+        return row["draft_hash"] if row else None
+
+    def ids_with_status(self, status: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT qid FROM questions WHERE status = ?", (status,)).fetchall()
+        return {r["qid"] for r in rows}
+
+    def drafted_ids(self) -> Set[str]:
+        return self.ids_with_status(STATUS_DRAFTED)
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM questions GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    # ---- 回答产物索引 ----
+    def upsert_answer(
+        self,
+        qid: str,
+        *,
+        ok: bool,
+        status: Optional[int],
+        answer_len: int,
+        answer_hash: Optional[str],
+        raw_hash: Optional[str],
+        generated_at: Optional[str],
+        text_prefix: Optional[str] = None,
+    ) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO answers(qid, ok, status, answer_len, answer_hash, raw_hash, generated_at, text_prefix) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(qid) DO UPDATE SET ok = excluded.ok, status = excluded.status, "
+                "answer_len = excluded.answer_len, answer_hash = excluded.answer_hash, "
+                "raw_hash = excluded.raw_hash, generated_at = excluded.generated_at, "
+                "text_prefix = excluded.text_prefix",
+                (qid, int(bool(ok)), status, answer_len, answer_hash, raw_hash, generated_at, text_prefix),
+            )
+
+    def get_answer(self, qid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM answers WHERE qid = ?", (qid,)).fetchone()
+        return dict(row) if row else None
+
+    def answers_for(self, qids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """批量读取回答索引（分批 IN 查询）"""
+        qids = list(qids)
+        result: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(qids), 500):
+            chunk = qids[i:i + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM answers WHERE qid IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            result.update({r["qid"]: dict(r) for r in rows})
+        return result
+
+    def referenced_hashes(self) -> Set[str]:
+        """回答索引引用到的全部 blob 哈希（供垃圾回收使用）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT answer_hash, raw_hash FROM answers").fetchall()
+        return {h for r in rows for h in (r["answer_hash"], r["raw_hash"]) if h}
+
+    # ---- 运行记录 ----
+    def record_run(self, summary: Dict[str, Any]) -> None:
+        run_id = summary.get("run_id")
+        if not run_id:
+            return
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO runs(run_id, started_at, ended_at, mode, selected, draft_saved_ok, failures, summary) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET started_at = excluded.started_at, "
+                "ended_at = excluded.ended_at, mode = excluded.mode, selected = excluded.selected, "
+                "draft_saved_ok = excluded.draft_saved_ok, failures = excluded.failures, "
+                "summary = excluded.summary",
+                (
+                    run_id,
+                    summary.get("started_at"),
+                    summary.get("ended_at"),
+                    summary.get("mode"),
+                    summary.get("selected"),
+                    summary.get("draft_saved_ok"),
+                    len(summary.get("failures") or []),
+                    json.dumps(summary, ensure_ascii=False),
+                ),
+            )
+
+    def record_timings(self, run_id: str, timings_by_qid: Dict[str, Dict[str, int]]) -> None:
+        """记录每个问题最近一次运行的耗时拆解（span 名称 -> 毫秒）"""
+        if not timings_by_qid:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE questions SET timings = ? WHERE qid = ?",
+                [
+                    (json.dumps({"run_id": run_id, "ms": timings}, ensure_ascii=False), qid)
+                    for qid, timings in timings_by_qid.items()
+                ],
+            )
+
+    def get_timings(self, qid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT timings FROM questions WHERE qid = ?", (qid,)).fetchone()
+        return json.loads(row["timings"]) if row and row["timings"] else None
+
+    def recent_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT summary FROM runs ORDER BY started_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(r["summary"]) for r in rows]
+
+    # ---- 运行检查点 ----
+    def save_run_plan(
+        self, run_id: str, qids: List[str], *, started_at: str, options: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """发现阶段结束后记录本次运行的计划（选中的问题及顺序）"""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO run_checkpoints(run_id, started_at, options, finished_at, updated_at) "
+                "VALUES(?, ?, ?, NULL, ?)",
+                (run_id, started_at, json.dumps(options or {}, ensure_ascii=False), now),
+            )
+            conn.execute("DELETE FROM run_plan WHERE run_id = ?", (run_id,))
+            conn.executemany(
+                "INSERT INTO run_plan(run_id, pos, qid, stage, updated_at) VALUES(?, ?, ?, 'planned', ?)",
+                [(run_id, i, qid, now) for i, qid in enumerate(qids)],
+            )
+
+    def checkpoint_stage(self, run_id: str, qid: str, stage: str) -> None:
+        """记录问题在本次运行中完成的阶段（只前进不回退）"""
+        rank = _PLAN_STAGE_RANK[stage]
+        lower = [s for s, r in _PLAN_STAGE_RANK.items() if r < rank]
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute(
+                f"UPDATE run_plan SET stage = ?, updated_at = ? "
+                f"WHERE run_id = ? AND qid = ? AND stage IN ({', '.join('?' * len(lower))})",
+                [stage, now, run_id, qid] + lower,
+            )
+            conn.execute("UPDATE run_checkpoints SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def finish_run_plan(self, run_id: str) -> bool:
+        """
+        计划里的每个问题都到了终态（草稿已写入，或已标记失败）时才标记运行完成；
+        中途停止（例如触发风控）的运行保持未完成，--resume 仍能找到它。返回是否已完成
+        """
+        with self._transaction() as conn:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM run_plan p LEFT JOIN questions q ON q.qid = p.qid "
+                "WHERE p.run_id = ? AND p.stage != ? AND COALESCE(q.status, '') NOT IN (?, ?)",
+                (run_id, STATUS_DRAFTED, STATUS_DRAFTED, STATUS_FAILED),
+            ).fetchone()[0]
+            if pending:
+                return False
+            conn.execute(
+                "UPDATE run_checkpoints SET finished_at = ?, updated_at = ? WHERE run_id = ?",
+                (datetime.now().isoformat(),) * 2 + (run_id,),
+            )
+        return True
+
+    def load_run_plan(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """读取运行计划：按原顺序返回每个问题的阶段及已保存的标题/链接/详情"""
+        with self._lock:
+            head = self._conn.execute("SELECT * FROM run_checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+            if head is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT p.qid, p.stage, q.title, q.url, q.content FROM run_plan p "
+                "LEFT JOIN questions q ON q.qid = p.qid WHERE p.run_id = ? ORDER BY p.pos",
+                (run_id,),
+            ).fetchall()
+        plan = dict(head)
+        plan["options"] = json.loads(plan.get("options") or "{}")
+        plan["items"] = [dict(r) for r in rows]
+        return plan
+
+    def latest_unfinished_run(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM run_checkpoints WHERE finished_at IS NULL ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+        return row["run_id"] if row else None
+
+    # ---- 旧 JSON 状态迁移 ----
+    def migrate_legacy(
+        self,
+        *,
+        processed_file: Path,
+        draft_hash_file: Path,
+        artifact_dir: Path,
+    ) -> bool:
+        """
+        首次启动时把旧的 JSON 状态导入数据库（只执行一次）：
+        invitations_*.json -> discovered/generated/drafted
+        answers_by_qid/*.json -> generated/failed
+        processed_invitations.json -> drafted
+        draft_hashes.json -> draft_hash
+        runs/run_*.json -> runs
+        """
+        if self.get_meta("legacy_migrated_at"):
+            return False
+
+        def _read(path: Path) -> Any:
+            try:
+                return json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                return None
+
+        with self._transaction() as conn:
+            inv_files = sorted(artifact_dir.glob("invitations_*.json"))
+            for path in inv_files:
+                for item in _read(path) or []:
+                    if not isinstance(item, dict) or not item.get("id"):
+                        continue
+                    qid = str(item["id"])
+                    status = STATUS_DETAILED if item.get("content") else STATUS_DISCOVERED
+                    self._transition(conn, qid, status, {
+                        "title": item.get("title") or "",
+                        "url": item.get("url") or "",
+                        "content": item.get("content") or "",
+                    })
+
+            for path in sorted((artifact_dir / "answers_by_qid").glob("*.json")):
+                data = _read(path)
+                if not isinstance(data, dict) or not data.get("question_id"):
+                    continue
+                qid = str(data["question_id"])
+                if data.get("ok") and (data.get("answer_text") or "").strip():
+                    self._transition(conn, qid, STATUS_GENERATED, {
+                        "title": data.get("title") or "",
+                        "url": data.get("url") or "",
+                        "answer_len": len((data.get("answer_text") or "").strip()),
+                        "answer_artifact": path.as_posix(),
+                        "generated_at": data.get("generated_at"),
+                    })
+                else:
+                    self._transition(conn, qid, STATUS_FAILED, {
+                        "failed_stage": "deep_research",
+                        "error": str(data.get("status")),
+                    })
+
+            processed = _read(processed_file) if processed_file.exists() else None
+            for qid in (processed or {}).get("processed_ids", []):
+                self._transition(conn, str(qid), STATUS_DRAFTED, {})
+
+            hashes = _read(draft_hash_file) if draft_hash_file.exists() else None
+            for qid, rec in ((hashes or {}).get("drafts") or {}).items():
+                if isinstance(rec, dict) and rec.get("hash"):
+                    self._transition(conn, str(qid), STATUS_DISCOVERED, {
+                        "draft_hash": rec["hash"],
+                        "draft_method": rec.get("method"),
+                    })
+
+            for path in sorted((artifact_dir / "runs").glob("run_*.json")):
+                if path.name == "run_latest.json":
+                    continue
+                summary = _read(path)
+                if isinstance(summary, dict) and summary.get("run_id"):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO runs(run_id, started_at, ended_at, mode, selected, "
+                        "draft_saved_ok, failures, summary) VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            summary["run_id"],
+                            summary.get("started_at"),
+                            summary.get("ended_at"),
+                            summary.get("mode"),
+                            summary.get("selected"),
+                            summary.get("draft_saved_ok"),
+                            len(summary.get("failures") or []),
+                            json.dumps(summary, ensure_ascii=False),
+                        ),
+                    )
+
+            conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES('legacy_migrated_at', ?)",
+                (datetime.now().isoformat(),),
+            )
+        return True
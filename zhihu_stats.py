@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+运行历史统计
+把状态库 runs 表里的运行 summary 增量展开成带索引的明细表（stat_runs / stage_events），
+聚合查询（每日吞吐、各阶段 p50/p95、按阶段+选择器的失败分布）直接走索引，不再逐个解析 run_*.json
+"""
+import csv
+import json
+import math
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stat_runs (
+    run_id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    mode TEXT,
+    selected INTEGER NOT NULL DEFAULT 0,
+    drafted INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER,
+    ended_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stat_runs_day ON stat_runs(day);
+
+CREATE TABLE IF NOT EXISTS stage_events (
+    run_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    qid TEXT,
+    stage TEXT NOT NULL,
+    ms INTEGER,
+    ok INTEGER NOT NULL,
+    method TEXT,
+    selector TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stage_events_stage_day ON stage_events(stage, day, ms);
+CREATE INDEX IF NOT EXISTS idx_stage_events_failed ON stage_events(ok, stage, selector);
+CREATE INDEX IF NOT EXISTS idx_stage_events_run ON stage_events(run_id);
+"""
+
+QUERIES = ("throughput", "stages", "failures")
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> Optional[float]:
+    """nearest-rank 百分位（输入需已排序）"""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _run_day(run_id: str, summary: dict) -> str:
+    started = _parse_time(summary.get("started_at"))
+    if started:
+        return started.strftime("%Y-%m-%d")
+    try:
+        return datetime.strptime(run_id[:8], "%Y%m%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return ""
+
+
+class RunStats:
+    """基于状态库的运行历史统计（与 StateStore 共用同一个 SQLite 文件）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ---- 增量导入 ----
+    def ingest(self) -> int:
+        """导入 runs 表里尚未展开（或 ended_at 有变化）的运行，返回导入的运行数"""
+        has_runs = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'runs'"
+        ).fetchone()
+        if not has_runs:
+            return 0
+        rows = self._conn.execute(
+            "SELECT r.run_id, r.summary FROM runs r LEFT JOIN stat_runs s ON s.run_id = r.run_id "
+            "WHERE s.run_id IS NULL OR IFNULL(s.ended_at, '') != IFNULL(r.ended_at, '')"
+        ).fetchall()
+        if not rows:
+            return 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                try:
+                    summary = json.loads(row["summary"] or "{}")
+                except ValueError:
+                    summary = {}
+                self._ingest_run(row["run_id"], summary)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def _ingest_run(self, run_id: str, summary: dict) -> None:
+        day = _run_day(run_id, summary)
+        started = _parse_time(summary.get("started_at"))
+        ended = _parse_time(summary.get("ended_at"))
+        duration_ms = int((ended - started).total_seconds() * 1000) if started and ended else None
+        failures = summary.get("failures") or []
+        self._conn.execute("DELETE FROM stage_events WHERE run_id = ?", (run_id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO stat_runs(run_id, day, mode, selected, drafted, failures, duration_ms, ended_at) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                day,
+                summary.get("mode"),
+                int(summary.get("selected") or 0),
+                int(summary.get("draft_saved_ok") or 0),
+                len(failures),
+                duration_ms,
+                summary.get("ended_at"),
+            ),
+        )
+        events = summary.get("stage_events")
+        if events is None:
+            # 旧版 summary 没有计时，只能从 failures 里还原失败分布
+            events = [
+                {"qid": f.get("question_id"), "stage": f.get("stage") or "unknown", "ok": False,
+                 "selector": f.get("selector"), "error": f.get("error")}
+                for f in failures
+            ]
+        self._conn.executemany(
+            "INSERT INTO stage_events(run_id, day, qid, stage, ms, ok, method, selector, error) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    day,
+                    e.get("qid"),
+                    e.get("stage") or "unknown",
+                    e.get("ms"),
+                    1 if e.get("ok") else 0,
+                    e.get("method"),
+                    e.get("selector"),
+                    (str(e["error"])[:200] if e.get("error") else None),
+                )
+                for e in events
+            ],
+        )
+
+    # ---- 查询 ----
+    def throughput(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """每日运行数 / 选中数 / 写入草稿数 / 失败数 / 总耗时"""
+        rows = self._conn.execute(
+            "SELECT day, COUNT(*) AS runs, SUM(selected) AS selected, SUM(drafted) AS drafted, "
+            "SUM(failures) AS failures, SUM(duration_ms) AS duration_ms "
+            "FROM stat_runs WHERE day >= ? GROUP BY day ORDER BY day",
+            (since or "",),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def stages(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """各阶段耗时分布（只统计有计时的事件）：count / 失败率 / p50 / p95 / max"""
+        result = []
+        stage_rows = self._conn.execute(
+            "SELECT stage, COUNT(*) AS n, SUM(1 - ok) AS failed FROM stage_events "
+            "WHERE day >= ? GROUP BY stage ORDER BY stage",
+            (since or "",),
+        ).fetchall()
+        for row in stage_rows:
+            values = [
+                r[0]
+                for r in self._conn.execute(
+                    "SELECT ms FROM stage_events WHERE stage = ? AND day >= ? AND ms IS NOT NULL ORDER BY ms",
+                    (row["stage"], since or ""),
+                )
+            ]
+            result.append(
+                {
+                    "stage": row["stage"],
+                    "count": row["n"],
+                    "failed": row["failed"],
+                    "p50_ms": percentile(values, 50),
+                    "p95_ms": percentile(values, 95),
+                    "max_ms": values[-1] if values else None,
+                }
+            )
+        return result
+
+    def failures(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按 阶段 + 未命中的选择器（page_type）统计失败次数"""
+        rows = self._conn.execute(
+            "SELECT stage, IFNULL(selector, '') AS selector, COUNT(*) AS failures, MAX(day) AS last_day "
+            "FROM stage_events WHERE ok = 0 AND day >= ? GROUP BY stage, selector ORDER BY failures DESC",
+            (since or "",),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def query(self, name: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        if name not in QUERIES:
+            raise ValueError(f"unknown stats query: {name} (choose from {', '.join(QUERIES)})")
+        return getattr(self, name)(since)
+
+
+def export_csv(rows: List[Dict[str, Any]], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        if not rows:
+            return
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    """简单的定宽文本表格（终端输出用）"""
+    if not rows:
+        return "(无数据)"
+    headers = list(rows[0])
+    cells = [["" if r.get(h) is None else str(r.get(h)) for h in headers] for r in rows]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines += ["  ".join(c.ljust(w) for c, w in zip(row, widths)) for row in cells]
+    return "\n".join(lines)
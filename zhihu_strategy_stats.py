@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+选择器 / 编辑器输入策略的命中统计
+按页面类型记录哪个选择器、哪种输入方式成功过（命中率 + 耗时），持久化到 JSON，
+解析时优先尝试历史上最好的选项，并可输出“已失效”选择器报告
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# kind: selector / input
+KINDS = ("selector", "input")
+
+
+def _new_record() -> dict:
+    return {
+        "hits": 0,
+        "misses": 0,
+        "total_ms": 0,
+        "consecutive_misses": 0,
+        "last_hit_at": None,
+        "last_miss_at": None,
+    }
+
+
+class StrategyStats:
+    """策略命中统计（kind -> page_type -> option -> record）"""
+
+    def __init__(self, path: Path, *, stale_after: int = 5):
+        self.path = Path(path)
+        self.stale_after = max(1, int(stale_after))
+        self.data: Dict[str, Dict[str, Dict[str, dict]]] = {k: {} for k in KINDS}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for kind in KINDS:
+            if isinstance(raw.get(kind), dict):
+                self.data[kind] = raw[kind]
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        payload = dict(self.data, updated_at=datetime.now().isoformat())
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def _record(self, kind: str, page_type: str, option: str) -> dict:
+        return self.data.setdefault(kind, {}).setdefault(page_type, {}).setdefault(option, _new_record())
+
+    def record(self, kind: str, page_type: str, option: str, ok: bool, elapsed_ms: int = 0) -> None:
+        rec = self._record(kind, page_type, option)
+        now = datetime.now().isoformat()
+        if ok:
+            rec["hits"] += 1
+            rec["total_ms"] += max(0, int(elapsed_ms))
+            rec["consecutive_misses"] = 0
+            rec["last_hit_at"] = now
+        else:
+            rec["misses"] += 1
+            rec["consecutive_misses"] += 1
+            rec["last_miss_at"] = now
+        self._dirty = True
+
+    def has_hits(self, kind: str, page_type: str, option: str) -> bool:
+        rec = (self.data.get(kind, {}).get(page_type, {}) or {}).get(option)
+        return bool(rec and rec.get("hits"))
+
+    def rank(self, kind: str, page_type: str, candidates: Sequence[str]) -> List[str]:
+        """按历史命中率（拉普拉斯平滑，未尝试过的视为 0.5）降序、平均耗时升序排列，平局保持原顺序"""
+        records = self.data.get(kind, {}).get(page_type, {}) or {}
+
+        def _key(item):
+            idx, option = item
+            rec = records.get(option)
+            if not rec:
+                return (-0.5, float("inf"), idx)
+            hits, misses = rec.get("hits", 0), rec.get("misses", 0)
+            rate = (hits + 1) / (hits + misses + 2)
+            avg_ms = rec.get("total_ms", 0) / hits if hits else float("inf")
+            return (-rate, avg_ms, idx)
+
+        return [option for _, option in sorted(enumerate(candidates), key=_key)]
+
+    def best(self, kind: str, page_type: str, candidates: Sequence[str]) -> Optional[str]:
+        """历史最好的候选（必须真实命中过），没有则返回 None"""
+        ranked = self.rank(kind, page_type, candidates)
+        if ranked and self.has_hits(kind, page_type, ranked[0]):
+            return ranked[0]
+        return None
+
+    def stale(self) -> List[dict]:
+        """曾经命中、但最近连续 stale_after 次未命中的选项"""
+        items = []
+        for kind, pages in self.data.items():
+            for page_type, options in (pages or {}).items():
+                for option, rec in (options or {}).items():
+                    if rec.get("hits") and rec.get("consecutive_misses", 0) >= self.stale_after:
+                        items.append({"kind": kind, "page_type": page_type, "option": option, **rec})
+        return items
+
+    def report(self) -> str:
+        lines = []
+        for kind in KINDS:
+            for page_type, options in sorted((self.data.get(kind) or {}).items()):
+                lines.append(f"[{kind}] {page_type}")
+                for option in self.rank(kind, page_type, list(options)):
+                    rec = options[option]
+                    total = rec.get("hits", 0) + rec.get("misses", 0)
+                    rate = rec.get("hits", 0) / total if total else 0.0
+                    avg_ms = rec.get("total_ms", 0) // rec["hits"] if rec.get("hits") else 0
+                    flag = "  ⚠️ 可能已失效" if (
+                        rec.get("hits") and rec.get("consecutive_misses", 0) >= self.stale_after
+                    ) else ""
+                    lines.append(
+                        f"  {option}: hit_rate={rate:.0%} hits={rec.get('hits', 0)} "
+                        f"misses={rec.get('misses', 0)} avg_ms={avg_ms} "
+                        f"last_hit={rec.get('last_hit_at') or '-'}{flag}"
+                    )
+        if not lines:
+            return "暂无选择器/输入策略统计"
+        return "\n".join(lines)